@@ -2,13 +2,16 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import os
-import random
 from PIL import Image
 import base64
 import io
 import time
-import hashlib
-import json
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'core'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'processors'))
+from user_store import UserStore
+from job_queue import open_batch_backend
+from trained_precision_omr import TrainedPrecisionOMRProcessor
 
 # Configure page for production
 st.set_page_config(
@@ -18,48 +21,26 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Authentication functions
-def hash_password(password):
-    """Hash password using SHA-256"""
-    return hashlib.sha256(password.encode()).hexdigest()
-
-def load_users():
-    """Load users from JSON file"""
-    users_file = "users.json"
-    if os.path.exists(users_file):
-        try:
-            with open(users_file, 'r') as f:
-                return json.load(f)
-        except:
-            return {}
-    return {}
+@st.cache_resource
+def get_batch_executor():
+    """Batch backend shared by all sessions of this server process ([jobs] backend in config.ini)"""
+    config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.ini')
+    return open_batch_backend(TrainedPrecisionOMRProcessor, config_path)
 
-def save_users(users):
-    """Save users to JSON file"""
-    users_file = "users.json"
-    with open(users_file, 'w') as f:
-        json.dump(users, f, indent=2)
+# Authentication functions
+@st.cache_resource
+def get_user_store():
+    """User database shared by all sessions (users.json is imported on first use)"""
+    return UserStore()
 
 def create_user(username, password, email):
     """Create a new user"""
-    users = load_users()
-    if username in users:
-        return False, "Username already exists"
-    
-    users[username] = {
-        "password": hash_password(password),
-        "email": email,
-        "created_at": time.time()
-    }
-    save_users(users)
-    return True, "Account created successfully"
+    success, message = get_user_store().create(username, password, email)
+    return success, "Account created successfully" if success else message
 
 def verify_user(username, password):
     """Verify user credentials"""
-    users = load_users()
-    if username in users:
-        return users[username]["password"] == hash_password(password)
-    return False
+    return get_user_store().authenticate(username, password)
 
 def show_auth_page():
     """Display authentication page"""
@@ -345,27 +326,35 @@ def create_batch_upload_zone():
     return uploaded_files
 
 def process_batch_files(uploaded_files, answer_set):
-    """Process uploaded files (placeholder for actual processing)"""
-    results = []
+    """Process uploaded files in the batch backend, showing progress until every sheet is done"""
+    executor = get_batch_executor()
+    batch_id = executor.submit([(file.name, file.getvalue()) for file in uploaded_files],
+                               answer_set.replace(' ', '_'))
     progress_bar = st.progress(0)
     status_text = st.empty()
     
-    for i, file in enumerate(uploaded_files):
-        # Simulate processing
-        progress = (i + 1) / len(uploaded_files)
-        progress_bar.progress(progress)
-        status_text.text(f"Processing {file.name}...")
-        
-        # Simulate processing time
+    while True:
+        batch = executor.get(batch_id)
+        if batch is None:
+            st.error("This batch is no longer available; results are kept for an hour after it finishes.")
+            return []
+        progress_bar.progress(batch.completed / max(batch.total, 1))
+        status_text.text(f"Processed {batch.completed}/{batch.total} sheets...")
+        if batch.finished:
+            break
         time.sleep(0.5)
-        
-        # Simulate results
-        accuracy = random.uniform(85, 98)
+    
+    results = []
+    for result in batch.results():
+        if result.get("success"):
+            score, status = f"{result['score']:.1f}%", "✅ Completed"
+        else:
+            score, status = "-", f"❌ {result.get('error', 'Unknown error')}"
         results.append({
-            "File": file.name,
+            "File": result['uploaded_filename'],
             "Answer Set": answer_set,
-            "Accuracy": f"{accuracy:.1f}%",
-            "Status": "✅ Completed"
+            "Score": score,
+            "Status": status
         })
     
     status_text.text("Processing complete!")
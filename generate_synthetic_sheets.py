@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Synthetic OMR Sheet Generator for benchmarks
+Renders filled 5-subject x 20-question sheets with known answers (see src/core/synthetic_sheets.py).
+The output folder has DataSets/ and AnswerKey/ like the repository root, plus ground_truth.npz,
+so it can be used directly as the base path of the data handler, trainer and tuner.
+
+Usage:
+    python generate_synthetic_sheets.py --count 20000 --output synthetic --seed 0
+"""
+
+import os
+import sys
+import time
+import argparse
+
+# Add the src directory to path
+sys.path.append('src/core')
+
+from synthetic_sheets import generate_dataset, GROUND_TRUTH_FILE
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic filled OMR sheets with ground truth")
+    parser.add_argument('--count', type=int, default=1000, help="Number of sheets")
+    parser.add_argument('--output', default="synthetic", help="Output folder")
+    parser.add_argument('--seed', type=int, default=0, help="Same seed, same sheets")
+    parser.add_argument('--scale', type=float, default=1.5, help="Resolution relative to 600x800")
+    parser.add_argument('--workers', type=int, default=None, help="Parallel processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    start = time.time()
+    ground_truth = generate_dataset(args.output, args.count, args.seed, scale=args.scale, workers=args.workers)
+    elapsed = time.time() - start
+
+    print(f"Generated {len(ground_truth['paths'])} sheets in {elapsed:.1f}s "
+          f"({len(ground_truth['paths']) / max(elapsed, 1e-9):.0f} sheets/s)")
+    print(f"Ground truth: {os.path.join(args.output, GROUND_TRUTH_FILE)}")
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,7 @@ It provides a simple interface to start the web application or run command-line
 Usage:
     python main.py              # Start web application
     python main.py --test       # Run system tests
+    python main.py --worker     # Process queued batch jobs (see [jobs] in config.ini)
     python main.py --help       # Show help
 """
 
@@ -51,6 +52,26 @@ def run_tests():
     else:
         print("❌ Test file not found")
 
+def run_worker(max_jobs=None):
+    """Process jobs of the persistent job queue until interrupted"""
+    sys.path.insert(0, os.path.join(src_dir, 'core'))
+    sys.path.insert(0, os.path.join(src_dir, 'processors'))
+    from job_queue import JobQueue, load_job_settings, run_worker as run_queue_worker
+    from trained_precision_omr import TrainedPrecisionOMRProcessor
+
+    settings = load_job_settings(os.path.join(current_dir, 'config.ini'))
+    queue_path = os.path.join(current_dir, settings['queue_path'])
+    queue = JobQueue(queue_path, settings['visibility_timeout'], settings['retry_delay'])
+    print(f"👷 OMR worker {os.getpid()} waiting for jobs in {queue_path}")
+
+    try:
+        jobs_run = run_queue_worker(queue, TrainedPrecisionOMRProcessor,
+                                    poll_interval=settings['poll_interval'], max_jobs=max_jobs)
+        print(f"✅ Processed {jobs_run} jobs")
+    except KeyboardInterrupt:
+        # The interrupted job is picked up again once its visibility timeout expires
+        print("\n🛑 Worker stopped by user")
+
 def show_help():
     """Show help information"""
     print("""
@@ -63,6 +84,7 @@ A comprehensive system for processing Optical Mark Recognition (OMR) answer shee
     python main.py              Start web application (default)
     python main.py --test       Run system tests
     python main.py --web        Start web application
+    python main.py --worker     Process queued batch jobs (run as many as needed)
     python main.py --help       Show this help
 
 🌐 Web Application:
@@ -106,6 +128,8 @@ def main():
     
     parser.add_argument('--web', action='store_true', help='Start web application')
     parser.add_argument('--test', action='store_true', help='Run system tests')
+    parser.add_argument('--worker', action='store_true', help='Process jobs of the batch job queue')
+    parser.add_argument('--max-jobs', type=int, default=None, help='Stop the worker after this many jobs')
     parser.add_argument('--help-detailed', action='store_true', help='Show detailed help')
     
     args = parser.parse_args()
@@ -114,6 +138,8 @@ def main():
         show_help()
     elif args.test:
         run_tests()
+    elif args.worker:
+        run_worker(args.max_jobs)
     elif args.web:
         start_web_app()
     else:
@@ -1,7 +1,12 @@
 import cv2
 import numpy as np
-import utlis
+import os
+import sys
 import time
+import argparse
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'core'))
+import utlis
+from sheet_tracker import SheetTracker
 
 ########################################################################
 pathImage = "a.jpg"
@@ -10,122 +15,205 @@ widthImg = 700
 questions = 5
 choices = 5
 ans = [1, 2, 0, 2, 4]
+targetFps = 25  # FRAME RATE THE VIDEO MODE TRIES TO HOLD
+detectScale = 0.5  # CORNER DETECTION / TRACKING RUNS AT THIS FRACTION OF THE WORKING SIZE
+gradeSize = (325, 150)  # WIDTH, HEIGHT OF THE WARPED GRADE BOX
 ########################################################################
 
-while True:
+ptsSheet = np.float32([[0, 0], [widthImg, 0], [0, heightImg], [widthImg, heightImg]])
+ptsGrade = np.float32([[0, 0], [gradeSize[0], 0], [0, gradeSize[1]], [gradeSize[0], gradeSize[1]]])
+
+
+def findSheetCorners(imgGray):
+    """Find the reordered corner points of the answer area and the grade box, or (None, None)"""
+    imgBlur = cv2.GaussianBlur(imgGray, (7, 7), 1)  # ADD GAUSSIAN BLUR
+    imgCanny = cv2.Canny(imgBlur, 10, 70)  # APPLY CANNY
+    contours, hierarchy = cv2.findContours(imgCanny, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)  # FIND ALL CONTOURS
+    rectCon = utlis.rectContour(contours)  # FILTER FOR RECTANGLE CONTOURS
+    if len(rectCon) < 2:
+        return None, None
+    biggestPoints = utlis.getCornerPoints(rectCon[0])  # GET CORNER POINTS OF THE BIGGEST RECTANGLE
+    gradePoints = utlis.getCornerPoints(rectCon[1])  # GET CORNER POINTS OF THE SECOND BIGGEST RECTANGLE
+    if biggestPoints.size != 8 or gradePoints.size != 8:
+        return None, None
+    return utlis.reorder(biggestPoints).reshape(4, 2), utlis.reorder(gradePoints).reshape(4, 2)
+
+
+def readAnswers(img, biggestPoints):
+    """Warp the answer area and read the marked choice of every question"""
+    matrix = cv2.getPerspectiveTransform(np.float32(biggestPoints), ptsSheet)  # GET TRANSFORMATION MATRIX
+    imgWarpColored = cv2.warpPerspective(img, matrix, (widthImg, heightImg))  # APPLY WARP PERSPECTIVE
+
+    # APPLY THRESHOLD
+    imgWarpGray = cv2.cvtColor(imgWarpColored, cv2.COLOR_BGR2GRAY)  # CONVERT TO GRAYSCALE
+    imgThresh = cv2.threshold(imgWarpGray, 170, 255, cv2.THRESH_BINARY_INV)[1]  # APPLY THRESHOLD AND INVERSE
+
+    # OBTAINING THE NUMBER OF NON-ZERO PIXELS FOR EACH BOX
+    boxes = utlis.splitBoxes(imgThresh, questions, choices)
+    myPixelVal = np.array([cv2.countNonZero(box) for box in boxes]).reshape(questions, choices)
+
+    # FIND THE USER ANSWERS AND COMPARE THEM WITH THE CORRECT ANSWERS
+    myIndex = np.argmax(myPixelVal, axis=1)
+    grading = (myIndex == np.array(ans)).astype(int)
+    score = (grading.sum() / questions) * 100  # FINAL GRADE
+    return myIndex, grading, score, imgWarpColored, imgThresh
+
+
+def renderOverlays(myIndex, grading, score):
+    """Draw the answers and the grade on blank canvases in sheet / grade-box coordinates"""
+    imgRawDrawings = np.zeros((heightImg, widthImg, 3), np.uint8)
+    utlis.showAnswers(imgRawDrawings, myIndex, grading, ans, questions, choices)  # DRAW ON NEW IMAGE
+    imgRawGrade = np.zeros((gradeSize[1], gradeSize[0], 3), np.uint8)
+    cv2.putText(imgRawGrade, str(int(score)) + "%", (70, 100)
+                , cv2.FONT_HERSHEY_COMPLEX, 3, (0, 255, 255), 3)  # ADD THE GRADE TO NEW IMAGE
+    return imgRawDrawings, imgRawGrade
+
+
+def projectOverlays(img, biggestPoints, gradePoints, imgRawDrawings, imgRawGrade):
+    """Warp pre-rendered overlays back onto the frame at the current corner positions"""
+    invMatrix = cv2.getPerspectiveTransform(ptsSheet, np.float32(biggestPoints))  # INVERSE TRANSFORMATION MATRIX
+    imgInvWarp = cv2.warpPerspective(imgRawDrawings, invMatrix, (widthImg, heightImg))  # INV IMAGE WARP
+    invMatrixG = cv2.getPerspectiveTransform(ptsGrade, np.float32(gradePoints))  # INVERSE TRANSFORMATION MATRIX
+    imgInvGradeDisplay = cv2.warpPerspective(imgRawGrade, invMatrixG, (widthImg, heightImg))  # INV IMAGE WARP
+    imgFinal = cv2.add(img, imgInvWarp)
+    return cv2.add(imgFinal, imgInvGradeDisplay)
+
+
+def runImage(path):
+    """Process a single still image once and show every intermediate stage"""
     start = time.time()
-    img = cv2.imread(pathImage)
+    img = cv2.imread(path)
+    if img is None:
+        print("Image cannot be read:", path)
+        return
 
     img = cv2.resize(img, (widthImg, heightImg))  # RESIZE IMAGE
-    imgFinal = img.copy()
     imgBlank = np.zeros((heightImg, widthImg, 3), np.uint8)  # CREATE A BLANK IMAGE FOR TESTING DEBUGGING IF REQUIRED
     imgGray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)  # CONVERT IMAGE TO GRAY SCALE
-    imgBlur = cv2.GaussianBlur(imgGray, (7, 7), 1)  # ADD GAUSSIAN BLUR
-    imgCanny = cv2.Canny(imgBlur, 10, 70)  # APPLY CANNY
+    imgCanny = cv2.Canny(cv2.GaussianBlur(imgGray, (7, 7), 1), 10, 70)  # APPLY CANNY
+    imgContours = img.copy()  # COPY IMAGE FOR DISPLAY PURPOSES
+    contours, hierarchy = cv2.findContours(imgCanny, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+    cv2.drawContours(imgContours, contours, -1, (0, 255, 0), 10)  # DRAW ALL DETECTED CONTOURS
 
-    try:
-        # FIND ALL COUNTOURS
-        imgContours = img.copy()  # COPY IMAGE FOR DISPLAY PURPOSES
+    biggestPoints, gradePoints = findSheetCorners(imgGray)
+    if biggestPoints is not None:
         imgBigContour = img.copy()  # COPY IMAGE FOR DISPLAY PURPOSES
-        contours, hierarchy = cv2.findContours(imgCanny, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)  # FIND ALL CONTOURS
-        cv2.drawContours(imgContours, contours, -1, (0, 255, 0), 10)  # DRAW ALL DETECTED CONTOURS
-        rectCon = utlis.rectContour(contours)  # FILTER FOR RECTANGLE CONTOURS
-        biggestPoints = utlis.getCornerPoints(rectCon[0])  # GET CORNER POINTS OF THE BIGGEST RECTANGLE
-        gradePoints = utlis.getCornerPoints(rectCon[1])  # GET CORNER POINTS OF THE SECOND BIGGEST RECTANGLE
-
-        if biggestPoints.size != 0 and gradePoints.size != 0:
-            # BIGGEST RECTANGLE WARPING
-            biggestPoints = utlis.reorder(biggestPoints)  # REORDER FOR WARPING
-            cv2.drawContours(imgBigContour, biggestPoints, -1, (0, 255, 0), 20)  # DRAW THE BIGGEST CONTOUR
-            pts1 = np.float32(biggestPoints)  # PREPARE POINTS FOR WARP
-            pts2 = np.float32([[0, 0], [widthImg, 0], [0, heightImg], [widthImg, heightImg]])  # PREPARE POINTS FOR WARP
-            matrix = cv2.getPerspectiveTransform(pts1, pts2)  # GET TRANSFORMATION MATRIX
-            imgWarpColored = cv2.warpPerspective(img, matrix, (widthImg, heightImg))  # APPLY WARP PERSPECTIVE
-
-            # SECOND BIGGEST RECTANGLE WARPING
-            cv2.drawContours(imgBigContour, gradePoints, -1, (255, 0, 0), 20)  # DRAW THE BIGGEST CONTOUR
-            gradePoints = utlis.reorder(gradePoints)  # REORDER FOR WARPING
-            ptsG1 = np.float32(gradePoints)  # PREPARE POINTS FOR WARP
-            ptsG2 = np.float32([[0, 0], [325, 0], [0, 150], [325, 150]])  # PREPARE POINTS FOR WARP
-            matrixG = cv2.getPerspectiveTransform(ptsG1, ptsG2)  # GET TRANSFORMATION MATRIX
-            imgGradeDisplay = cv2.warpPerspective(img, matrixG, (325, 150))  # APPLY WARP PERSPECTIVE
-
-            # APPLY THRESHOLD
-            imgWarpGray = cv2.cvtColor(imgWarpColored, cv2.COLOR_BGR2GRAY)  # CONVERT TO GRAYSCALE
-            imgThresh = cv2.threshold(imgWarpGray, 170, 255, cv2.THRESH_BINARY_INV)[1]  # APPLY THRESHOLD AND INVERSE
-
-            # GET INDIVIDUAL BOXES
-            boxes = utlis.splitBoxes(imgThresh)
-            # cv2.imshow("Split Test ", boxes[3])
-
-            # OBTAINING THE NUMBER OF NON-ZERO PIXELS FOR EACH BOX
-            countR = 0
-            countC = 0
-            myPixelVal = np.zeros((questions, choices))  # TO STORE THE NON ZERO VALUES OF EACH BOX
-            for image in boxes:
-                # cv2.imshow(str(countR)+str(countC),image)
-                totalPixels = cv2.countNonZero(image)
-                myPixelVal[countR][countC] = totalPixels
-                countC += 1
-                if (countC == choices):
-                    countC = 0
-                    countR += 1
-
-            # FIND THE USER ANSWERS AND PUT THEM IN A LIST
-            myIndex = []
-            for x in range(0, questions):
-                arr = myPixelVal[x]
-                myIndexVal = np.where(arr == np.amax(arr))
-                myIndex.append(myIndexVal[0][0])
-            # print("USER ANSWERS",myIndex)
-
-            # COMPARE THE VALUES TO FIND THE CORRECT ANSWERS
-            grading = []
-            for x in range(0, questions):
-                if ans[x] == myIndex[x]:
-                    grading.append(1)
-                else:
-                    grading.append(0)
-            # print("GRADING",grading)
-            score = (sum(grading) / questions) * 100  # FINAL GRADE
-            print("SCORE",score)
-
-            # DISPLAYING ANSWERS
-            utlis.showAnswers(imgWarpColored, myIndex, grading, ans)  # DRAW DETECTED ANSWERS
-            utlis.drawGrid(imgWarpColored)  # DRAW GRID
-            imgRawDrawings = np.zeros_like(imgWarpColored)  # NEW BLANK IMAGE WITH WARP IMAGE SIZE
-            utlis.showAnswers(imgRawDrawings, myIndex, grading, ans)  # DRAW ON NEW IMAGE
-            invMatrix = cv2.getPerspectiveTransform(pts2, pts1)  # INVERSE TRANSFORMATION MATRIX
-            imgInvWarp = cv2.warpPerspective(imgRawDrawings, invMatrix, (widthImg, heightImg))  # INV IMAGE WARP
-
-            # DISPLAY GRADE
-            imgRawGrade = np.zeros_like(imgGradeDisplay, np.uint8)  # NEW BLANK IMAGE WITH GRADE AREA SIZE
-            cv2.putText(imgRawGrade, str(int(score)) + "%", (70, 100)
-                        , cv2.FONT_HERSHEY_COMPLEX, 3, (0, 255, 255), 3)  # ADD THE GRADE TO NEW IMAGE
-            invMatrixG = cv2.getPerspectiveTransform(ptsG2, ptsG1)  # INVERSE TRANSFORMATION MATRIX
-            imgInvGradeDisplay = cv2.warpPerspective(imgRawGrade, invMatrixG, (widthImg, heightImg))  # INV IMAGE WARP
-
-            # SHOW ANSWERS AND GRADE ON FINAL IMAGE
-            imgFinal = cv2.addWeighted(imgFinal, 1, imgInvWarp, 1, 0)
-            imgFinal = cv2.addWeighted(imgFinal, 1, imgInvGradeDisplay, 1, 0)
-
-            # IMAGE ARRAY FOR DISPLAY
-            imageArray = ([img, imgGray, imgCanny, imgContours],
-                          [imgBigContour, imgThresh, imgWarpColored, imgFinal])
-            cv2.imshow("Final Result", imgFinal)
+        cv2.drawContours(imgBigContour, biggestPoints.reshape(-1, 1, 2), -1, (0, 255, 0), 20)  # DRAW THE BIGGEST CONTOUR
+        cv2.drawContours(imgBigContour, gradePoints.reshape(-1, 1, 2), -1, (255, 0, 0), 20)  # DRAW THE GRADE CONTOUR
 
-    except:
+        myIndex, grading, score, imgWarpColored, imgThresh = readAnswers(img, biggestPoints)
+        print("SCORE", score)
+        imgRawDrawings, imgRawGrade = renderOverlays(myIndex, grading, score)
+        imgFinal = projectOverlays(img, biggestPoints, gradePoints, imgRawDrawings, imgRawGrade)
+        utlis.showAnswers(imgWarpColored, myIndex, grading, ans, questions, choices)  # DRAW DETECTED ANSWERS
+        utlis.drawGrid(imgWarpColored)  # DRAW GRID
+
+        # IMAGE ARRAY FOR DISPLAY
+        imageArray = ([img, imgGray, imgCanny, imgContours],
+                      [imgBigContour, imgThresh, imgWarpColored, imgFinal])
+        cv2.imshow("Final Result", imgFinal)
+    else:
         print("Image cannot be processed.")
         imageArray = ([img, imgGray, imgCanny, imgContours],
                       [imgBlank, imgBlank, imgBlank, imgBlank])
 
-    end = time.time()
-    print("Time Taken: ", end-start)
+    print("Time Taken: ", time.time() - start)
     # LABELS FOR DISPLAY
     lables = [["Original", "Gray", "Edges", "Contours"],
               ["Biggest Contour", "Threshold", "Warpped", "Final"]]
-
     stackedImage = utlis.stackImages(imageArray, 0.5, lables)
-
     cv2.imshow('Result', stackedImage)
-    cv2.waitKey(5000)
\ No newline at end of file
+    cv2.waitKey(0)
+
+
+def runVideo(source, fps=targetFps, display=True):
+    """
+    Real-time mode for a camera index or a recorded file.
+    Corners are found by a full detection, then followed with optical flow; bubbles are only
+    read once the sheet has been still for a few frames, and frames are dropped whenever
+    processing falls behind the target frame rate.
+    """
+    cap = cv2.VideoCapture(int(source) if str(source).isdigit() else source)
+    if not cap.isOpened():
+        print("Video source cannot be opened:", source)
+        return
+    sourceFps = cap.get(cv2.CAP_PROP_FPS) or fps
+    frameBudget = 1.0 / fps
+
+    tracker = SheetTracker()
+    overlays = None  # PRE-RENDERED ANSWERS OF THE CURRENTLY STABLE SHEET
+    skip = 0
+    frames = 0
+    runStart = time.time()
+
+    while True:
+        # ADAPTIVE FRAME SKIPPING: DROP FRAMES WE HAVE NO TIME FOR
+        for _ in range(skip):
+            if not cap.grab():
+                break
+        success, frame = cap.read()
+        if not success:
+            break
+        start = time.time()
+
+        img = cv2.resize(frame, (widthImg, heightImg))  # RESIZE IMAGE
+        imgGraySmall = cv2.cvtColor(cv2.resize(img, (0, 0), None, detectScale, detectScale), cv2.COLOR_BGR2GRAY)
+
+        # FULL DETECTION ONLY WHEN NOTHING IS TRACKED OR A RE-CHECK IS DUE, OTHERWISE FOLLOW THE CORNERS
+        corners = None
+        if not tracker.needs_detection:
+            corners = tracker.track(imgGraySmall)
+        if corners is None:
+            biggestPoints, gradePoints = findSheetCorners(imgGraySmall)
+            if biggestPoints is not None:
+                tracker.start(imgGraySmall, np.vstack([biggestPoints, gradePoints]))
+                corners = tracker.points.reshape(-1, 2)
+            else:
+                tracker.reset()
+
+        imgFinal = img
+        if corners is None:
+            overlays = None
+        else:
+            corners = corners / detectScale  # BACK TO WORKING RESOLUTION
+            biggestPoints, gradePoints = corners[:4], corners[4:]
+            if not tracker.is_stable:
+                overlays = None  # SHEET IS MOVING: READ AGAIN ONCE IT SETTLES
+                cv2.polylines(imgFinal, [np.int32(biggestPoints[[0, 1, 3, 2]])], True, (0, 255, 255), 2)
+            else:
+                if overlays is None:
+                    myIndex, grading, score, _, _ = readAnswers(img, biggestPoints)
+                    print("SCORE", score)
+                    overlays = renderOverlays(myIndex, grading, score)
+                imgFinal = projectOverlays(img, biggestPoints, gradePoints, *overlays)
+
+        frames += 1
+        elapsed = time.time() - start
+        if display:
+            cv2.putText(imgFinal, f"{frames / max(time.time() - runStart, 1e-6):.1f} fps", (10, 30),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+            cv2.imshow("Final Result", imgFinal)
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+        # HOW MANY SOURCE FRAMES WENT BY WHILE WE WERE BUSY BEYOND OUR FRAME BUDGET
+        skip = int(max(0.0, elapsed - frameBudget) * sourceFps)
+
+    cap.release()
+    if display:
+        cv2.destroyAllWindows()
+    totalTime = time.time() - runStart
+    print(f"Processed {frames} frames in {totalTime:.2f}s ({frames / max(totalTime, 1e-6):.1f} fps)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Grade a simple OMR sheet from an image or a video stream")
+    parser.add_argument('--image', default=pathImage, help='Still image to process once')
+    parser.add_argument('--video', help='Camera index (e.g. 0) or recorded video file for real-time mode')
+    parser.add_argument('--fps', type=float, default=targetFps, help='Target frame rate in video mode')
+    parser.add_argument('--no-display', action='store_true', help='Run video mode without opening windows')
+    args = parser.parse_args()
+
+    if args.video is not None:
+        runVideo(args.video, args.fps, display=not args.no_display)
+    else:
+        runImage(args.image)
@@ -0,0 +1,188 @@
+"""
+Streaming import of answer keys from Excel workbooks.
+
+Sheets are read with openpyxl in read-only mode, one row at a time, and every cell is
+validated as it streams past; the result is the compiled int8 key (A=0 ... D=3, -1 for a
+question without an answer), so even large multi-variant workbooks import in bounded
+memory without going through pandas.
+
+Two layouts are understood:
+- answer grids like the AnswerKey/ workbooks: cells such as "1 - a", "81. a" or "Q5: C",
+  one subject per column. Numbered cells are placed by their question number; grids of bare
+  letters fall back to column-major order (all of column 1, then column 2, ...).
+- tables with one answer key per row under Q1, Q2, ... headers (see import_answer_key_row).
+"""
+import re
+import numpy as np
+import openpyxl
+from itertools import groupby, islice
+from operator import itemgetter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+CHOICES = "abcd"
+# "1 - a", "81. a", "Q5: C", "16 - a,b,c,d" (first letter wins, like the original parser), or a bare "b"
+_NUMBERED_CELL = re.compile(r'^\s*q?\s*(\d+)\s*[-.:)]\s*([abcd])\b', re.IGNORECASE)
+_LETTER_CELL = re.compile(r'^\s*([abcd])\s*(?:[,/]\s*[abcd]\s*)*$', re.IGNORECASE)
+_QUESTION_HEADER = re.compile(r'^\s*q\s*(\d+)\s*$', re.IGNORECASE)
+
+class AnswerKeyImportError(ValueError):
+    """Raised when a sheet does not contain a usable answer key"""
+
+class AnswerKeyImport:
+    """Result of importing one answer key: the compiled key plus validation messages"""
+
+    def __init__(self, key: np.ndarray, sheet_name: str, errors: List[str]):
+        self.key = key
+        self.sheet_name = sheet_name
+        self.errors = errors
+
+    @property
+    def valid(self) -> bool:
+        return not self.errors
+
+    def as_letters(self) -> Dict[str, str]:
+        """{'Q1': 'A', ...} form used by the neural app's answer_keys.json"""
+        return {f'Q{i + 1}': CHOICES[answer].upper() for i, answer in enumerate(self.key) if answer >= 0}
+
+def parse_answer_cell(value) -> Tuple[Optional[int], Optional[int]]:
+    """Parse one cell into (question number or None, choice index or None)"""
+    if value is None:
+        return None, None
+    text = str(value)
+    match = _NUMBERED_CELL.match(text)
+    if match:
+        return int(match.group(1)), CHOICES.index(match.group(2).lower())
+    match = _LETTER_CELL.match(text)
+    if match:
+        return None, CHOICES.index(match.group(1).lower())
+    return None, None
+
+def iter_sheet_rows(source, sheet: Optional[str] = None) -> Iterator[Tuple[str, Tuple]]:
+    """Stream (sheet name, row values) from one sheet (default: the active one) or all sheets (sheet='*')"""
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        if sheet == '*':
+            worksheets = workbook.worksheets
+        else:
+            worksheets = [workbook[sheet] if sheet else workbook.active]
+        for worksheet in worksheets:
+            for row in worksheet.iter_rows(values_only=True):
+                yield worksheet.title, row
+    finally:
+        workbook.close()
+
+def preview_sheet(source, rows: int = 5, sheet: Optional[str] = None) -> Tuple[List, List[Tuple]]:
+    """Header and the first few rows of a sheet, without reading the rest of it"""
+    head = [row for _, row in islice(iter_sheet_rows(source, sheet), rows + 1)]
+    if not head:
+        return [], []
+    return list(head[0]), head[1:]
+
+def _compile_grid(sheet_name: str, rows: Iterator[Tuple]) -> AnswerKeyImport:
+    """Validate and compile one answer grid streamed row by row"""
+    numbered: Dict[int, int] = {}
+    columns: List[bytearray] = []  # column-major fallback for bare letters
+    errors: List[str] = []
+    seen_data = False
+
+    for row_number, row in enumerate(rows, start=1):
+        parsed_row = [parse_answer_cell(value) for value in row]
+        if not seen_data and not any(choice is not None for _, choice in parsed_row):
+            continue  # header rows (subject names) before the first answer
+        seen_data = True
+
+        for column, (value, (question, choice)) in enumerate(zip(row, parsed_row)):
+            if value is None or str(value).strip() == '':
+                continue
+            if choice is None:
+                errors.append(f"Row {row_number}, column {column + 1}: cannot read answer {value!r}")
+            elif question is not None:
+                if question in numbered:
+                    errors.append(f"Row {row_number}, column {column + 1}: question {question} appears twice")
+                numbered[question] = choice
+            else:
+                while len(columns) <= column:
+                    columns.append(bytearray())
+                columns[column].append(choice)
+
+    if numbered and any(columns):
+        errors.append("Mixes numbered cells (e.g. '1 - a') with bare letters")
+
+    if numbered:
+        key = np.full(max(numbered), -1, dtype=np.int8)
+        key[np.fromiter(numbered.keys(), dtype=np.int64, count=len(numbered)) - 1] = \
+            np.fromiter(numbered.values(), dtype=np.int8, count=len(numbered))
+        missing = np.flatnonzero(key < 0) + 1
+        if len(missing):
+            errors.append(f"No answer for question(s) {', '.join(map(str, missing[:10]))}"
+                          f"{'...' if len(missing) > 10 else ''}")
+    else:
+        key = np.frombuffer(b''.join(columns), dtype=np.int8).copy()
+
+    if len(key) == 0:
+        errors.append("No answers found")
+    return AnswerKeyImport(key, sheet_name, errors)
+
+def import_answer_key(source, sheet: Optional[str] = None) -> AnswerKeyImport:
+    """Import the answer grid of one sheet (default: the active sheet)"""
+    sheet_rows = iter_sheet_rows(source, sheet)
+    try:
+        for sheet_name, rows in groupby(sheet_rows, key=itemgetter(0)):
+            return _compile_grid(sheet_name, (row for _, row in rows))
+        raise AnswerKeyImportError("The workbook is empty")
+    finally:
+        sheet_rows.close()
+
+def import_answer_key_workbook(source) -> Dict[str, AnswerKeyImport]:
+    """Import every sheet of a multi-variant workbook, one key per sheet, in a single streaming pass"""
+    return {sheet_name: _compile_grid(sheet_name, (row for _, row in rows))
+            for sheet_name, rows in groupby(iter_sheet_rows(source, '*'), key=itemgetter(0))}
+
+def import_answer_key_row(source, row_index: int, start_column: Optional[int] = None,
+                          num_questions: Optional[int] = None, sheet: Optional[str] = None) -> AnswerKeyImport:
+    """
+    Import one answer key from a table with a header row and one key per data row
+    By default the question numbers come from Q1, Q2, ... headers; with start_column the
+    next num_questions columns are read as Q1, Q2, ... instead.
+    row_index is 0-based and counts data rows (the header is not a data row).
+    """
+    rows = iter_sheet_rows(source, sheet)
+    try:
+        return _compile_row(rows, row_index, start_column, num_questions)
+    finally:
+        rows.close()
+
+def _compile_row(rows: Iterator[Tuple[str, Tuple]], row_index: int, start_column: Optional[int],
+                 num_questions: Optional[int]) -> AnswerKeyImport:
+    first = next(rows, None)
+    if first is None:
+        raise AnswerKeyImportError("The workbook is empty")
+    sheet_name, header = first
+
+    if start_column is None:
+        positions = {}
+        for column, name in enumerate(header):
+            match = _QUESTION_HEADER.match(str(name)) if name is not None else None
+            if match:
+                positions[column] = int(match.group(1))
+        if not positions:
+            raise AnswerKeyImportError("No Q1, Q2, Q3... columns found")
+    else:
+        count = num_questions or len(header) - start_column
+        positions = {start_column + i: i + 1 for i in range(count)}
+
+    # Stream up to the requested row only
+    data_row = next(islice((row for _, row in rows), row_index, None), None)
+    if data_row is None:
+        raise AnswerKeyImportError(f"Row {row_index} does not exist")
+
+    key = np.full(max(positions.values()), -1, dtype=np.int8)
+    errors = []
+    for column, question in positions.items():
+        value = data_row[column] if column < len(data_row) else None
+        _, choice = parse_answer_cell(value)
+        if choice is None:
+            errors.append(f"Invalid answer {value!r} for Q{question}")
+        else:
+            key[question - 1] = choice
+    return AnswerKeyImport(key, sheet_name, errors)
@@ -0,0 +1,118 @@
+import os
+import threading
+import numpy as np
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Dict, Tuple
+from data_handler import OMRDataHandler
+
+class AnswerKeySnapshot:
+    """One immutable version of all answer keys"""
+
+    def __init__(self, version: int, keys: Dict[str, np.ndarray], signature: Tuple):
+        frozen = {}
+        for set_name, answers in keys.items():
+            answers = np.array(answers, dtype=np.int8)
+            answers.setflags(write=False)
+            frozen[set_name] = answers
+        self.version = version
+        self.keys = MappingProxyType(frozen)
+        self.signature = signature
+
+class AnswerKeyRegistry(Mapping):
+    """
+    Process-wide, read-only answer keys shared by every processor, session and thread.
+    Readers always see a complete snapshot: a reload builds a new snapshot and swaps it in
+    with a single reference assignment, so nothing is ever mutated in place.
+    Per-request keys (e.g. an uploaded custom key) are passed to the processor per call
+    instead of being added here.
+    """
+
+    def __init__(self, base_path: str = ".", poll_interval: float = 2.0):
+        self.base_path = base_path
+        self.answer_key_path = os.path.join(base_path, "AnswerKey")
+        self.poll_interval = poll_interval
+        self._reload_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._watcher = None
+        self._snapshot = AnswerKeySnapshot(0, {}, ())
+        self.reload(force=True)
+
+    @property
+    def snapshot(self) -> AnswerKeySnapshot:
+        """Current snapshot (keep a reference to it to read several keys consistently)"""
+        return self._snapshot
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version
+
+    def __getitem__(self, set_name: str) -> np.ndarray:
+        return self._snapshot.keys[set_name]
+
+    def __iter__(self):
+        return iter(self._snapshot.keys)
+
+    def __len__(self) -> int:
+        return len(self._snapshot.keys)
+
+    def _signature(self) -> Tuple:
+        """Cheap fingerprint of the answer key folder (names, sizes and mtimes)"""
+        try:
+            entries = []
+            for file_name in sorted(os.listdir(self.answer_key_path)):
+                if file_name.endswith('.xlsx') and not file_name.startswith('~'):
+                    stat = os.stat(os.path.join(self.answer_key_path, file_name))
+                    entries.append((file_name, stat.st_size, stat.st_mtime_ns))
+            return tuple(entries)
+        except OSError:
+            return ()
+
+    def reload(self, force: bool = False) -> bool:
+        """Rebuild the keys if the workbooks changed; returns True when a new version was swapped in"""
+        with self._reload_lock:
+            signature = self._signature()
+            if not force and signature == self._snapshot.signature:
+                return False
+            keys = OMRDataHandler(self.base_path).compile_answer_keys()
+            self._snapshot = AnswerKeySnapshot(self._snapshot.version + 1, keys, signature)
+            return True
+
+    def start_watcher(self):
+        """Start a daemon thread that hot-reloads the keys when AnswerKey/ changes"""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop_event.clear()
+        self._watcher = threading.Thread(target=self._watch, name="answer-key-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        """Stop the hot-reload thread"""
+        self._stop_event.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def _watch(self):
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                if self.reload():
+                    print(f"Answer keys reloaded (version {self.version})")
+            except Exception as e:
+                # Keep serving the previous version if a workbook is half-written
+                print(f"Answer key reload failed: {e}")
+
+_registries: Dict[str, AnswerKeyRegistry] = {}
+_registries_lock = threading.Lock()
+
+def get_answer_key_registry(base_path: str = ".", watch: bool = True) -> AnswerKeyRegistry:
+    """Get the shared registry for a project folder, creating it on first use"""
+    registry_key = os.path.realpath(base_path)
+    with _registries_lock:
+        registry = _registries.get(registry_key)
+        if registry is None:
+            registry = AnswerKeyRegistry(base_path)
+            _registries[registry_key] = registry
+    if watch:
+        registry.start_watcher()
+    return registry
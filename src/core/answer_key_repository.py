@@ -0,0 +1,95 @@
+import os
+import json
+import threading
+from types import MappingProxyType
+from typing import Dict, Mapping, NamedTuple, Optional, Tuple
+
+class KeySnapshot(NamedTuple):
+    """One immutable version of the letter answer keys ({set name: {'Q1': 'A', ...}})"""
+    version: int
+    keys: Mapping[str, Mapping[str, str]]
+    signature: Tuple
+
+def _freeze(keys: Dict) -> Mapping[str, Mapping[str, str]]:
+    return MappingProxyType({set_name: MappingProxyType(dict(answers)) for set_name, answers in keys.items()})
+
+class AnswerKeyRepository:
+    """
+    Letter answer keys of the web apps, persisted in one JSON file (e.g. answer_keys.json).
+    Reads are served from an in-memory snapshot; the file is only parsed again when its
+    size or mtime changes (e.g. another server process wrote it), which bumps the version.
+    Updates touch one key at a time and replace the file atomically (write + rename), so
+    readers never see a half-written file and other keys are carried over unchanged.
+    """
+
+    def __init__(self, path: str, defaults: Optional[Dict[str, Dict[str, str]]] = None):
+        self.path = path
+        self.defaults = dict(defaults or {})
+        self._lock = threading.Lock()
+        self._snapshot = KeySnapshot(0, _freeze({}), None)
+
+    def _signature(self) -> Tuple:
+        try:
+            stat = os.stat(self.path)
+            return stat.st_size, stat.st_mtime_ns
+        except OSError:
+            return ()
+
+    def _read(self) -> Dict[str, Dict[str, str]]:
+        """Keys in the file, the defaults if it is missing or unreadable"""
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return dict(self.defaults)
+
+    def snapshot(self) -> KeySnapshot:
+        """Current keys, reloaded first if the file changed (keep it to read several keys consistently)"""
+        snapshot = self._snapshot
+        if snapshot.signature == self._signature():
+            return snapshot
+        with self._lock:
+            signature = self._signature()
+            if self._snapshot.signature != signature:
+                self._snapshot = KeySnapshot(self._snapshot.version + 1, _freeze(self._read()), signature)
+            return self._snapshot
+
+    @property
+    def version(self) -> int:
+        return self.snapshot().version
+
+    @property
+    def keys(self) -> Mapping[str, Mapping[str, str]]:
+        """Read-only {set name: {'Q1': 'A', ...}} of the current version"""
+        return self.snapshot().keys
+
+    def get(self, set_name: str) -> Mapping[str, str]:
+        """One key, empty if the set does not exist"""
+        return self.snapshot().keys.get(set_name, MappingProxyType({}))
+
+    def put(self, set_name: str, answers: Mapping[str, str]) -> int:
+        """Add or replace one key; returns the new version"""
+        return self._update(set_name, dict(answers))
+
+    def delete(self, set_name: str) -> bool:
+        """Remove one key; False if it does not exist"""
+        if set_name not in self.snapshot().keys:
+            return False
+        self._update(set_name, None)
+        return True
+
+    def _update(self, set_name: str, answers: Optional[Dict[str, str]]) -> int:
+        with self._lock:
+            # Start from the file as it is now, so keys written meanwhile are not lost
+            keys = self._read() if self._snapshot.signature != self._signature() else dict(self._snapshot.keys)
+            if answers is None:
+                keys.pop(set_name, None)
+            else:
+                keys[set_name] = answers
+
+            tmp_path = f"{self.path}.tmp{os.getpid()}"
+            with open(tmp_path, 'w') as f:
+                json.dump({name: dict(key) for name, key in keys.items()}, f, indent=2)
+            os.replace(tmp_path, self.path)
+            self._snapshot = KeySnapshot(self._snapshot.version + 1, _freeze(keys), self._signature())
+            return self._snapshot.version
@@ -0,0 +1,146 @@
+"""
+Background execution of OMR batches, owned by the server process instead of a page run.
+
+A BatchExecutor keeps a pool of worker processes, each with its own processor. Submitting a
+batch writes the uploads to a work folder and queues one task per sheet; the caller gets a
+batch id back immediately and polls the BatchJob for progress and results. Nothing depends
+on the page that submitted the batch, so reruns and browser refreshes neither abort nor
+restart it: the page only has to remember the batch id (e.g. in the URL).
+"""
+import os
+import time
+import uuid
+import shutil
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Finished batches are forgotten after this many seconds (their results must be collected by then)
+BATCH_RETENTION_SECONDS = 3600
+
+# Processor of a batch worker process, created once per worker
+_worker_processor = None
+
+def _init_worker(processor_factory: Callable):
+    global _worker_processor
+    _worker_processor = processor_factory()
+
+def _process_upload(image_path: str, set_type: Optional[str], answer_key: Optional[Sequence[int]]) -> Dict:
+    """
+    Process one uploaded sheet in a worker, timed in 'processing_time' and stamped with its
+    wall-clock 'completed_at'; the upload is deleted afterwards
+    """
+    start = time.perf_counter()
+    try:
+        result = _worker_processor.process_omr_sheet(image_path, set_type, answer_key=answer_key)
+    except Exception as e:
+        result = {'success': False, 'error': str(e)}
+    finally:
+        if os.path.exists(image_path):
+            os.unlink(image_path)
+    result['processing_time'] = time.perf_counter() - start
+    result['completed_at'] = time.time()
+    return result
+
+class BatchJob:
+    """Progress and results of one submitted batch"""
+
+    def __init__(self, batch_id: str, filenames: List[str], futures: List[Future], work_dir: str,
+                 created_at: Optional[float] = None):
+        self.batch_id = batch_id
+        self.filenames = filenames
+        self.futures = futures
+        self.work_dir = work_dir
+        self.created_at = created_at or time.time()
+        self.finished_at = None
+
+    @property
+    def completed_at(self) -> Optional[float]:
+        """
+        When the last sheet finished, None while sheets are pending
+        Taken from the results, so it is known as soon as the batch counts as finished; a batch
+        whose workers all died has no timestamps and reports its creation time.
+        """
+        if not self.finished:
+            return None
+        return max((result['completed_at'] for result in self.results() if 'completed_at' in result),
+                   default=self.created_at)
+
+    @property
+    def total(self) -> int:
+        return len(self.futures)
+
+    @property
+    def completed(self) -> int:
+        return sum(future.done() for future in self.futures)
+
+    @property
+    def finished(self) -> bool:
+        return self.completed == self.total
+
+    def results(self) -> List[Dict]:
+        """Results of the sheets finished so far, in upload order, tagged with 'uploaded_filename'"""
+        results = []
+        for filename, future in zip(self.filenames, self.futures):
+            if not future.done():
+                continue
+            try:
+                result = dict(future.result())
+            except Exception as e:  # e.g. a worker process died
+                result = {'success': False, 'error': str(e)}
+            result['uploaded_filename'] = filename
+            results.append(result)
+        return results
+
+class BatchExecutor:
+    """Process pool plus the registry of batches submitted to it"""
+
+    def __init__(self, processor_factory: Callable, workers: Optional[int] = None):
+        """processor_factory is called once in every worker process (e.g. a processor class)"""
+        # Spawned, not forked: the server process runs threads whose locks must not be copied
+        self.pool = ProcessPoolExecutor(workers or os.cpu_count() or 1,
+                                        mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=_init_worker, initargs=(processor_factory,))
+        self.batches: Dict[str, BatchJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, uploads: Sequence[Tuple[str, bytes]], set_type: Optional[str] = None,
+               answer_key: Optional[Sequence[int]] = None) -> str:
+        """Queue (filename, file content) uploads and return the batch id"""
+        submitted_at = time.time()
+        batch_id = uuid.uuid4().hex[:12]
+        work_dir = tempfile.mkdtemp(prefix=f"omr_batch_{batch_id}_")
+        answer_key = None if answer_key is None else [int(answer) for answer in answer_key]
+
+        filenames, futures = [], []
+        for index, (filename, data) in enumerate(uploads):
+            image_path = os.path.join(work_dir, f"{index:05d}{os.path.splitext(filename)[1] or '.jpg'}")
+            with open(image_path, 'wb') as f:
+                f.write(data)
+            filenames.append(filename)
+            futures.append(self.pool.submit(_process_upload, image_path, set_type, answer_key))
+
+        with self._lock:
+            self._forget_old_batches()
+            self.batches[batch_id] = BatchJob(batch_id, filenames, futures, work_dir, submitted_at)
+        return batch_id
+
+    def get(self, batch_id: Optional[str]) -> Optional[BatchJob]:
+        """A submitted batch, None if the id is unknown or the batch has been forgotten"""
+        with self._lock:
+            self._forget_old_batches()
+            return self.batches.get(batch_id) if batch_id else None
+
+    def _forget_old_batches(self):
+        now = time.time()
+        for batch_id, batch in list(self.batches.items()):
+            if batch.finished_at is None and batch.finished:
+                batch.finished_at = now
+            if batch.finished_at is not None and now - batch.finished_at > BATCH_RETENTION_SECONDS:
+                shutil.rmtree(batch.work_dir, ignore_errors=True)
+                del self.batches[batch_id]
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
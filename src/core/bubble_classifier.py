@@ -0,0 +1,66 @@
+"""
+Compact learned bubble classifier.
+
+A linear model over the bubble_features.extract_cell_features columns, stored as plain
+arrays (normalization mean/scale, weights, bias) in an .npz file. Loading and scoring need
+only numpy: the cells of a whole sheet are scored with one matrix multiply. Training lives
+in OMRTrainer.train_learned_classifier.
+"""
+import os
+import numpy as np
+from typing import Optional, Sequence
+
+DEFAULT_CLASSIFIER_FILE = "bubble_classifier.npz"
+
+class BubbleClassifier:
+    """
+    score = ((features - mean) / scale) @ weights + bias, one score per bubble
+    The score is the logit of "this bubble is marked". A question's answer is its highest-scoring
+    choice; it is blank when even that choice scores at most blank_threshold (0: probability
+    of a mark at most 0.5), e.g. an unmarked question
+    """
+
+    def __init__(self, mean: np.ndarray, scale: np.ndarray, weights: np.ndarray, bias: float,
+                 feature_names: Sequence[str], blank_threshold: float = 0.0):
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.scale = np.asarray(scale, dtype=np.float32)
+        self.weights = np.asarray(weights, dtype=np.float32).reshape(-1)
+        self.bias = np.float32(bias)
+        self.feature_names = tuple(feature_names)
+        self.blank_threshold = float(blank_threshold)
+        # Fold the normalization into the weights: one matmul at scoring time
+        self._folded_weights = self.weights / self.scale
+        self._folded_bias = self.bias - np.float32(self.mean @ self._folded_weights)
+
+    def decision_function(self, features: np.ndarray) -> np.ndarray:
+        """Score of every row of a (cells, features) matrix"""
+        return features @ self._folded_weights + self._folded_bias
+
+    def predict_answers(self, features: np.ndarray, choices: int) -> np.ndarray:
+        """Choice index per question (-1 for blank) from a question-major (questions * choices, features) matrix"""
+        scores = self.decision_function(features).reshape(-1, choices)
+        answers = np.argmax(scores, axis=1)
+        answers[scores.max(axis=1) <= self.blank_threshold] = -1
+        return answers
+
+    def save(self, path: str = DEFAULT_CLASSIFIER_FILE):
+        """Write the model arrays to an .npz file (written to a temporary file, then renamed)"""
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, mean=self.mean, scale=self.scale, weights=self.weights,
+                 bias=np.array(self.bias), feature_names=np.array(self.feature_names),
+                 blank_threshold=np.array(self.blank_threshold))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_CLASSIFIER_FILE,
+             feature_names: Optional[Sequence[str]] = None) -> "BubbleClassifier":
+        """Load a saved model; with feature_names, refuse one trained on different feature columns"""
+        with np.load(path, allow_pickle=False) as data:
+            # Models saved before the blank threshold existed use the default
+            blank_threshold = float(data['blank_threshold']) if 'blank_threshold' in data.files else 0.0
+            classifier = cls(data['mean'], data['scale'], data['weights'], float(data['bias']),
+                             [str(name) for name in data['feature_names']], blank_threshold)
+        if feature_names is not None and tuple(feature_names) != classifier.feature_names:
+            raise ValueError(f"{path} was trained on features {classifier.feature_names}, "
+                             f"expected {tuple(feature_names)}")
+        return classifier
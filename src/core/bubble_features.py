@@ -0,0 +1,75 @@
+"""
+Per-cell statistics of a warped answer sheet, computed for all bubbles at once.
+
+Instead of slicing the sheet into hundreds of box images, every pixel is labelled with the
+id of the answer cell it belongs to (question-major, then choice). Per-cell sums and
+histograms are then single `np.bincount` calls over the whole sheet.
+"""
+import cv2
+import numpy as np
+from typing import Tuple
+
+# Columns of extract_cell_features
+CELL_FEATURES = ('mean_intensity', 'std_intensity', 'dark_intensity', 'fill_ratio',
+                 'fill_contrast', 'edge_density')
+DARK_QUANTILE = 0.1  # dark_intensity: intensity below which this share of the cell lies
+
+def grid_cell_map(shape: Tuple[int, int], sections: int, rows: int, choices: int,
+                  header_skip: int = 0) -> np.ndarray:
+    """
+    Label every pixel of a (height, width) sheet with its answer cell id, -1 outside all cells
+    The sheet below `header_skip` pixels is split into `sections` columns of `rows` questions
+    with `choices` bubbles each, using the same integer box sizes as the processors' box
+    splitting; cell id = (section * rows + row) * choices + choice
+    """
+    height, width = shape[:2]
+    section_width = width // sections
+    row_height = (height - header_skip) // rows
+    choice_width = section_width // choices
+
+    x = np.arange(width)
+    section = x // section_width
+    choice = (x - section * section_width) // choice_width
+    valid_x = (section < sections) & (choice < choices)
+
+    y = np.arange(height) - header_skip
+    row = np.where(y >= 0, y // max(row_height, 1), -1)
+    valid_y = (row >= 0) & (row < rows)
+
+    cell_map = ((section[None, :] * rows + row[:, None]) * choices + choice[None, :]).astype(np.int32)
+    cell_map[~(valid_y[:, None] & valid_x[None, :])] = -1
+    return cell_map
+
+def cell_histograms(gray: np.ndarray, cell_map: np.ndarray, cells: int) -> np.ndarray:
+    """256-bin intensity histogram of every cell, shape (cells, 256), in one bincount"""
+    inside = cell_map >= 0
+    codes = cell_map[inside].astype(np.int64) * 256 + gray[inside]
+    return np.bincount(codes, minlength=cells * 256).reshape(cells, 256)
+
+def extract_cell_features(gray: np.ndarray, cell_map: np.ndarray, cells: int, choices: int,
+                          threshold: int = 170) -> np.ndarray:
+    """
+    Feature matrix (cells, len(CELL_FEATURES)) of a warped grayscale sheet, as float32
+    mean/std/dark_intensity: intensity moments and low quantile, from the cell histograms
+    fill_ratio: share of pixels the processors' inverse threshold keeps (<= threshold)
+    fill_contrast: fill_ratio minus the mean fill_ratio of the question's choices
+    edge_density: share of edge pixels, from one Canny pass over the thresholded sheet
+    """
+    histograms = cell_histograms(gray, cell_map, cells).astype(np.float64)
+    pixels = np.maximum(histograms.sum(axis=1), 1)
+    levels = np.arange(256, dtype=np.float64)
+
+    mean = histograms @ levels / pixels
+    variance = np.maximum(histograms @ (levels ** 2) / pixels - mean ** 2, 0)
+    cumulative = np.cumsum(histograms, axis=1)
+    dark = np.argmax(cumulative >= (DARK_QUANTILE * pixels)[:, None], axis=1)
+    fill_ratio = cumulative[:, min(max(threshold, 0), 255)] / pixels
+    fill_contrast = fill_ratio - np.repeat(fill_ratio.reshape(-1, choices).mean(axis=1), choices)
+
+    img_thresh = cv2.threshold(gray, threshold, 255, cv2.THRESH_BINARY_INV)[1]
+    edges = cv2.Canny(img_thresh, 50, 150)
+    inside = cell_map >= 0
+    edge_density = np.bincount(cell_map[inside], weights=(edges[inside] > 0), minlength=cells) / pixels
+
+    return np.column_stack([mean, np.sqrt(variance), dark, fill_ratio,
+                            fill_contrast, edge_density]).astype(np.float32)
@@ -1,9 +1,26 @@
-import pandas as pd
 import cv2
 import numpy as np
 import os
-import re
-from typing import Dict, List, Tuple, Optional
+import json
+import zlib
+import sqlite3
+import threading
+from itertools import tee
+from typing import Dict, Iterator, List, NamedTuple, Tuple, Optional
+from image_source import MultiPageTiffSource, is_tiff, make_page_ref, split_page_ref
+from dataset_manifest import DatasetManifest, file_sha1
+from answer_key_import import import_answer_key
+from image_loader import PrefetchingImageLoader, DEFAULT_PREFETCH_DEPTH, DEFAULT_PREFETCH_BYTES
+
+# Compiled answer keys are cached next to the workbooks
+ANSWER_KEY_CACHE_FILE = ".answer_keys_cache.npz"
+ANSWER_KEY_CACHE_VERSION = 1
+
+class TrainingRecord(NamedTuple):
+    """One training image; the answer key is referenced by id (see OMRDataHandler.answer_keys)"""
+    image_path: str
+    set_name: str
+    key_id: str
 
 class OMRDataHandler:
     """Handles loading and processing of OMR datasets and answer keys"""
@@ -12,85 +29,175 @@ class OMRDataHandler:
         self.base_path = base_path
         self.answer_keys = {}
         self.datasets = {}
+        self.manifest = None
         
-    def load_answer_keys(self) -> Dict[str, List[int]]:
+    def load_answer_keys(self, use_cache: bool = True) -> Dict[str, List[int]]:
         """
         Load answer keys from Excel files and convert to numerical format
-        Reads answers column-wise from Excel sheets
+        Workbooks are only parsed when they changed since the compiled cache was written
         Returns: Dictionary with set names as keys and answer lists as values
         """
+        for set_name, answers in self.compile_answer_keys(use_cache).items():
+            self.answer_keys[set_name] = answers.tolist()
+        
+        return self.answer_keys
+    
+    def compile_answer_keys(self, use_cache: bool = True) -> Dict[str, np.ndarray]:
+        """
+        Get every answer key as a compact int8 array (a=0 ... d=3)
+        Compiled keys are cached next to the workbooks in ANSWER_KEY_CACHE_FILE together with
+        each workbook's size, mtime and content hash; a workbook is re-parsed only when its
+        mtime changed and its hash no longer matches.
+        """
         answer_key_path = os.path.join(self.base_path, "AnswerKey")
+        cache_path = os.path.join(answer_key_path, ANSWER_KEY_CACHE_FILE)
+        cached_meta, cached_keys = self._read_answer_key_cache(cache_path) if use_cache else ({}, {})
         
-        for file_name in os.listdir(answer_key_path):
-            if file_name.endswith('.xlsx') and not file_name.startswith('~'):
-                set_name = file_name.replace('.xlsx', '').replace(' ', '_')
-                file_path = os.path.join(answer_key_path, file_name)
-                
-                try:
-                    df = pd.read_excel(file_path)
-                    # Remove empty rows if they exist
-                    df = df.dropna(how='all')
-                    
-                    # Extract answers column-wise
-                    answers = []
-                    
-                    # Process each column (subject)
-                    for col in df.columns:
-                        if col.strip():  # Skip empty column names
-                            column_answers = []
-                            
-                            for _, row in df.iterrows():
-                                cell_value = row[col]
-                                if pd.notna(cell_value):
-                                    # Extract letter from format like "1 - a", "21 - a", "81. a"
-                                    cell_str = str(cell_value).lower().strip()
-                                    # Look for patterns like "1 - a", "21 - a", "81. a"
-                                    match = re.search(r'[abcd]', cell_str)
-                                    if match:
-                                        # Convert letter to number (a=0, b=1, c=2, d=3)
-                                        letter = match.group()
-                                        answer_num = ord(letter) - ord('a')
-                                        column_answers.append(answer_num)
-                            
-                            # Add this column's answers to the main answer list
-                            answers.extend(column_answers)
-                            print(f"  Column '{col}': {len(column_answers)} answers")
-                    
-                    self.answer_keys[set_name] = answers
-                    print(f"Loaded {len(answers)} total answers for {set_name}")
-                    
-                    # Debug: Show first 10 answers
-                    if answers:
-                        first_10 = answers[:10]
-                        first_10_letters = [chr(ord('A') + ans) for ans in first_10]
-                        print(f"  First 10 answers: {first_10_letters}")
-                    
-                except Exception as e:
-                    print(f"Error loading {file_name}: {e}")
-                    import traceback
-                    traceback.print_exc()
+        compiled = {}
+        meta = {}
+        cache_dirty = False
+        for file_name in sorted(os.listdir(answer_key_path)):
+            if not file_name.endswith('.xlsx') or file_name.startswith('~'):
+                continue
+            set_name = file_name.replace('.xlsx', '').replace(' ', '_')
+            file_path = os.path.join(answer_key_path, file_name)
+            stat = os.stat(file_path)
+            entry = {'set_name': set_name, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+            
+            previous = cached_meta.get(file_name)
+            if previous is not None and set_name in cached_keys:
+                if previous['size'] == entry['size'] and previous['mtime_ns'] == entry['mtime_ns']:
+                    entry['sha1'] = previous['sha1']
+                else:
+                    entry['sha1'] = file_sha1(file_path)
+                    cache_dirty = True
+                if entry['sha1'] == previous['sha1']:
+                    compiled[set_name] = cached_keys[set_name]
+                    meta[file_name] = entry
+                    print(f"Loaded {len(compiled[set_name])} total answers for {set_name} (cached)")
+                    continue
+            else:
+                entry['sha1'] = file_sha1(file_path)
+            
+            answers = self._parse_answer_key_workbook(file_path, set_name)
+            if answers is None:
+                continue
+            compiled[set_name] = answers
+            meta[file_name] = entry
+            cache_dirty = True
         
-        return self.answer_keys
+        if set(meta) != set(cached_meta):
+            cache_dirty = True
+        if use_cache and cache_dirty:
+            self._write_answer_key_cache(cache_path, meta, compiled)
+        
+        return compiled
+    
+    def _parse_answer_key_workbook(self, file_path: str, set_name: str) -> Optional[np.ndarray]:
+        """
+        Parse one answer key workbook
+        The sheet is streamed with openpyxl and validated row by row (see answer_key_import);
+        numbered cells are placed by question number, bare letters are read column-wise
+        """
+        try:
+            imported = import_answer_key(file_path)
+            for error in imported.errors:
+                print(f"  Warning ({set_name}): {error}")
+            answers = imported.key
+            
+            print(f"Loaded {len(answers)} total answers for {set_name}")
+            
+            # Debug: Show first 10 answers
+            if len(answers):
+                first_10_letters = [chr(ord('A') + ans) if ans >= 0 else '-' for ans in answers[:10]]
+                print(f"  First 10 answers: {first_10_letters}")
+            
+            return answers
+            
+        except Exception as e:
+            print(f"Error loading {os.path.basename(file_path)}: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+    
+    def _read_answer_key_cache(self, cache_path: str) -> Tuple[Dict, Dict[str, np.ndarray]]:
+        """Read the compiled answer key cache; a missing or unreadable cache is simply empty"""
+        if not os.path.exists(cache_path):
+            return {}, {}
+        try:
+            with np.load(cache_path, allow_pickle=False) as cache:
+                header = json.loads(str(cache['__meta__']))
+                if header.get('version') != ANSWER_KEY_CACHE_VERSION:
+                    return {}, {}
+                keys = {name: cache[name] for name in cache.files if name != '__meta__'}
+            return header['files'], keys
+        except Exception as e:
+            print(f"Ignoring answer key cache {cache_path}: {e}")
+            return {}, {}
+    
+    def _write_answer_key_cache(self, cache_path: str, meta: Dict, compiled: Dict[str, np.ndarray]):
+        """Atomically replace the compiled answer key cache"""
+        header = json.dumps({'version': ANSWER_KEY_CACHE_VERSION, 'files': meta})
+        # Unique per process and thread, so concurrent rebuilds never write the same temp file
+        tmp_path = f"{cache_path}.tmp{os.getpid()}-{threading.get_ident()}.npz"
+        try:
+            np.savez(tmp_path, __meta__=np.array(header), **compiled)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            # Read-only answer key folders still work, just without the cache
+            print(f"Could not write answer key cache {cache_path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    
+    def get_manifest(self) -> Optional[DatasetManifest]:
+        """Persistent manifest of DataSets/ (None if it cannot be opened, e.g. read-only folder)"""
+        if self.manifest is None:
+            try:
+                self.manifest = DatasetManifest(os.path.join(self.base_path, "DataSets"))
+            except sqlite3.Error as e:
+                print(f"Dataset manifest unavailable, scanning folders instead: {e}")
+        return self.manifest
     
     def load_datasets(self) -> Dict[str, List[str]]:
         """
         Load image paths from dataset folders
+        Multi-page TIFF stacks are expanded into one "<file>#<page>" reference per page
+        without decoding any page (see image_source.read_image)
+        The folders are indexed in a persistent manifest, so only new or changed files are
+        looked at again; query the manifest directly to filter by date or processed status.
         Returns: Dictionary with set names as keys and image path lists as values
         """
+        manifest = self.get_manifest()
+        if manifest is not None:
+            try:
+                manifest.refresh()
+                for set_name in manifest.set_names():
+                    self.datasets[set_name] = manifest.query(set_name)
+                    print(f"Loaded {len(self.datasets[set_name])} images for {set_name}")
+                return self.datasets
+            except sqlite3.Error as e:
+                print(f"Dataset manifest unavailable, scanning folders instead: {e}")
+        
+        return self._scan_datasets()
+    
+    def _scan_datasets(self) -> Dict[str, List[str]]:
+        """Plain folder listing of all datasets (fallback when there is no manifest)"""
         datasets_path = os.path.join(self.base_path, "DataSets")
         
         for set_folder in os.listdir(datasets_path):
             set_path = os.path.join(datasets_path, set_folder)
-            if os.path.isdir(set_path):
+            if os.path.isdir(set_path) and not set_folder.startswith('.'):
                 set_name = set_folder.replace(' ', '_')
                 image_paths = []
                 
-                for img_file in os.listdir(set_path):
+                for img_file in sorted(os.listdir(set_path)):
+                    img_path = os.path.join(set_path, img_file)
                     if img_file.lower().endswith(('.jpg', '.jpeg', '.png')):
-                        img_path = os.path.join(set_path, img_file)
                         image_paths.append(img_path)
+                    elif is_tiff(img_file):
+                        image_paths.extend(MultiPageTiffSource(img_path).page_refs())
                 
-                self.datasets[set_name] = sorted(image_paths)
+                self.datasets[set_name] = image_paths
                 print(f"Loaded {len(image_paths)} images for {set_name}")
         
         return self.datasets
@@ -112,20 +219,66 @@ class OMRDataHandler:
         """
         return self.answer_keys.get(set_name)
     
-    def prepare_training_data(self) -> List[Tuple[str, str, List[int]]]:
+    def image_hash(self, image_path: str) -> str:
         """
-        Prepare training data by combining images with their corresponding answer keys
-        Returns: List of tuples (image_path, set_name, answer_key)
+        Content hash identifying an image (per page for TIFF page references)
+        Taken from the dataset manifest when its record is current, hashed from the file otherwise
+        """
+        file_path, page = split_page_ref(image_path)
+        digest = None
+        if self.manifest is not None:
+            record = self.manifest.get_record(file_path)
+            stat = os.stat(file_path)
+            if record and (record['size'], record['mtime_ns']) == (stat.st_size, stat.st_mtime_ns):
+                digest = record['sha1']
+        digest = digest or file_sha1(file_path)
+        return digest if page is None else make_page_ref(digest, page)
+    
+    def shard_of(self, image_path: str, num_shards: int) -> int:
+        """
+        Shard an image belongs to
+        Based on a stable hash of its path relative to DataSets/, so every machine agrees on the
+        split no matter where the archive is mounted or in which order it was listed
         """
-        training_data = []
+        relative_path = os.path.relpath(image_path, os.path.join(self.base_path, "DataSets"))
+        return zlib.crc32(relative_path.replace(os.sep, '/').encode('utf-8')) % num_shards
+    
+    def iter_training_data(self, shard: int = 0, num_shards: int = 1) -> Iterator[TrainingRecord]:
+        """
+        Stream training records for the images that have an answer key
+        With num_shards > 1 only the records of one deterministic, disjoint slice are yielded,
+        so several nodes can split a dataset without coordinating
+        """
+        if not 0 <= shard < num_shards:
+            raise ValueError(f"Invalid shard {shard} of {num_shards}")
         
         for set_name, image_paths in self.datasets.items():
-            answer_key = self.get_answer_key_for_set(set_name)
-            if answer_key:
-                for img_path in image_paths:
-                    training_data.append((img_path, set_name, answer_key))
-        
-        return training_data
+            if not self.get_answer_key_for_set(set_name):
+                continue
+            for img_path in image_paths:
+                if num_shards == 1 or self.shard_of(img_path, num_shards) == shard:
+                    yield TrainingRecord(img_path, set_name, set_name)
+    
+    def prepare_training_data(self, shard: int = 0, num_shards: int = 1) -> List[Tuple[str, str, List[int]]]:
+        """
+        Prepare training data by combining images with their corresponding answer keys
+        Returns: List of tuples (image_path, set_name, answer_key)
+        """
+        return [(record.image_path, record.set_name, self.answer_keys[record.key_id])
+                for record in self.iter_training_data(shard, num_shards)]
+    
+    def iter_training_images(self, depth: int = DEFAULT_PREFETCH_DEPTH,
+                             max_bytes: int = DEFAULT_PREFETCH_BYTES, shard: int = 0,
+                             num_shards: int = 1) -> Iterator[Tuple[str, str, List[int], Optional[np.ndarray]]]:
+        """
+        Like prepare_training_data, but also yields the decoded image of every entry
+        The next `depth` images are decoded in the background while the caller processes the current one
+        Yields: tuples (image_path, set_name, answer_key, image); image is None if it could not be read
+        """
+        records, paths = tee(self.iter_training_data(shard, num_shards))
+        loader = PrefetchingImageLoader((record.image_path for record in paths), depth=depth, max_bytes=max_bytes)
+        for record, (_, image) in zip(records, loader):
+            yield record.image_path, record.set_name, self.answer_keys[record.key_id], image
     
     def validate_data_consistency(self) -> bool:
         """
@@ -0,0 +1,206 @@
+"""
+Persistent manifest of the scans under DataSets/.
+
+Every image is recorded once in a small SQLite database (path, size, mtime, content hash,
+dimensions, page count, processed status). A rescan stats the files of every set folder but
+only hashes and decodes the headers of entries that are new or whose size or mtime changed,
+so loading the datasets costs a directory listing plus O(changes) instead of re-reading the
+archive. A quick rescan skips the set folders whose directory mtime is unchanged, which only
+catches files that were added, removed or renamed.
+"""
+import os
+import time
+import sqlite3
+import hashlib
+from contextlib import closing
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Union
+from PIL import Image
+from image_source import is_tiff, make_page_ref, split_page_ref
+
+MANIFEST_FILE = ".omr_manifest.sqlite"
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.tif', '.tiff')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS folders (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS images (
+    path TEXT PRIMARY KEY,
+    set_name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha1 TEXT NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    pages INTEGER NOT NULL DEFAULT 1,
+    added_at REAL NOT NULL,
+    processed_at REAL
+);
+CREATE INDEX IF NOT EXISTS images_by_set ON images (set_name, mtime_ns);
+"""
+
+def file_sha1(path: str) -> str:
+    """Content hash of a file"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _to_timestamp(value: Union[None, float, datetime]) -> Optional[float]:
+    return value.timestamp() if isinstance(value, datetime) else value
+
+class DatasetManifest:
+    """Incrementally maintained index of the dataset images"""
+
+    def __init__(self, datasets_path: str, db_path: Optional[str] = None):
+        self.datasets_path = datasets_path
+        self.db_path = db_path or os.path.join(datasets_path, MANIFEST_FILE)
+        with closing(self._connect()) as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _describe(self, path: str, stat: os.stat_result, set_name: str) -> tuple:
+        """Hash and read the header of one image (pixel data is not decoded)"""
+        width = height = None
+        pages = 1
+        try:
+            with Image.open(path) as img:
+                width, height = img.size
+                pages = getattr(img, 'n_frames', 1)
+        except Exception as e:
+            print(f"Could not read image header of {path}: {e}")
+        return (path, set_name, stat.st_size, stat.st_mtime_ns, file_sha1(path),
+                width, height, pages, time.time())
+
+    def refresh(self, quick: bool = False) -> Dict[str, int]:
+        """
+        Bring the manifest up to date with the folders on disk.
+        Every file is restated, so images rewritten in place under the same name are hashed
+        again; quick=True skips set folders by their unchanged directory mtime instead.
+        Returns counts of added / updated / removed images and scanned folders.
+        """
+        stats = {'added': 0, 'updated': 0, 'removed': 0, 'scanned_folders': 0}
+        with closing(self._connect()) as conn, conn:
+            known_folders = dict(conn.execute("SELECT path, mtime_ns FROM folders"))
+
+            current_folders = set()
+            for set_folder in sorted(os.listdir(self.datasets_path)):
+                set_path = os.path.join(self.datasets_path, set_folder)
+                if set_folder.startswith('.') or not os.path.isdir(set_path):
+                    continue  # hidden folders hold caches such as the feature store
+                current_folders.add(set_path)
+                folder_mtime = os.stat(set_path).st_mtime_ns
+                if quick and known_folders.get(set_path) == folder_mtime:
+                    continue
+
+                stats['scanned_folders'] += 1
+                self._refresh_folder(conn, set_path, set_folder.replace(' ', '_'), stats)
+                conn.execute("INSERT OR REPLACE INTO folders (path, mtime_ns) VALUES (?, ?)",
+                             (set_path, folder_mtime))
+
+            # Set folders that disappeared entirely
+            for set_path in set(known_folders) - current_folders:
+                removed = conn.execute("DELETE FROM images WHERE path LIKE ? ESCAPE '\\'",
+                                       (self._like_prefix(set_path),)).rowcount
+                stats['removed'] += removed
+                conn.execute("DELETE FROM folders WHERE path = ?", (set_path,))
+
+        return stats
+
+    def _refresh_folder(self, conn: sqlite3.Connection, set_path: str, set_name: str, stats: Dict[str, int]):
+        """Rescan one set folder, only hashing new or changed files"""
+        known = {path: (size, mtime) for path, size, mtime in conn.execute(
+            "SELECT path, size, mtime_ns FROM images WHERE set_name = ?", (set_name,))}
+
+        rows = []
+        seen = set()
+        with os.scandir(set_path) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                seen.add(entry.path)
+                stat = entry.stat()
+                previous = known.get(entry.path)
+                if previous == (stat.st_size, stat.st_mtime_ns):
+                    continue
+                stats['updated' if previous else 'added'] += 1
+                rows.append(self._describe(entry.path, stat, set_name))
+
+        # Changed files keep their processed status only if the content is the same
+        conn.executemany("""
+            INSERT INTO images (path, set_name, size, mtime_ns, sha1, width, height, pages, added_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(path) DO UPDATE SET
+                processed_at = CASE WHEN images.sha1 = excluded.sha1 THEN images.processed_at END,
+                set_name = excluded.set_name, size = excluded.size, mtime_ns = excluded.mtime_ns,
+                sha1 = excluded.sha1, width = excluded.width, height = excluded.height,
+                pages = excluded.pages
+        """, rows)
+
+        removed = [(path,) for path in known if path not in seen]
+        conn.executemany("DELETE FROM images WHERE path = ?", removed)
+        stats['removed'] += len(removed)
+
+    @staticmethod
+    def _like_prefix(folder: str) -> str:
+        escaped = folder.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        return escaped + os.sep + '%'
+
+    def set_names(self) -> List[str]:
+        """Names of all sets in the manifest"""
+        with closing(self._connect()) as conn:
+            return [row[0] for row in conn.execute("SELECT DISTINCT set_name FROM images ORDER BY set_name")]
+
+    def query(self, set_name: Optional[str] = None, since: Union[None, float, datetime] = None,
+              until: Union[None, float, datetime] = None, processed: Optional[bool] = None,
+              expand_pages: bool = True) -> List[str]:
+        """
+        Image paths filtered by set, scan date (file mtime, epoch seconds or datetime) and
+        processed status. Multi-page TIFFs are expanded into page references.
+        """
+        conditions, params = [], []
+        if set_name is not None:
+            conditions.append("set_name = ?")
+            params.append(set_name)
+        if since is not None:
+            conditions.append("mtime_ns >= ?")
+            params.append(int(_to_timestamp(since) * 1e9))
+        if until is not None:
+            conditions.append("mtime_ns < ?")
+            params.append(int(_to_timestamp(until) * 1e9))
+        if processed is not None:
+            conditions.append("processed_at IS NOT NULL" if processed else "processed_at IS NULL")
+
+        sql = "SELECT path, pages FROM images"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY path"
+
+        paths = []
+        with closing(self._connect()) as conn:
+            for path, pages in conn.execute(sql, params):
+                if expand_pages and is_tiff(path) and pages > 1:
+                    paths.extend(make_page_ref(path, page) for page in range(pages))
+                else:
+                    paths.append(path)
+        return paths
+
+    def get_record(self, path: str) -> Optional[Dict]:
+        """Full manifest record of one image (or of the file a page reference points to)"""
+        with closing(self._connect()) as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM images WHERE path = ?", (split_page_ref(path)[0],)).fetchone()
+        return dict(row) if row else None
+
+    def mark_processed(self, paths: Iterable[str], processed: bool = True):
+        """Record that images (or pages of a stack, tracked per file) have been processed"""
+        timestamp = time.time() if processed else None
+        files = {split_page_ref(path)[0] for path in paths}
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("UPDATE images SET processed_at = ? WHERE path = ?",
+                             [(timestamp, path) for path in files])
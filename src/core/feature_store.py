@@ -0,0 +1,134 @@
+"""
+Persistent, memory-mapped store of per-bubble features.
+
+The features of each sheet are appended as one (questions, choices, features) float32 block
+to a flat binary file, and a small SQLite index maps the image content hash to its row.
+Training and analysis tools map the whole file read-only (np.memmap) and read it
+sequentially - 100k sheets x 400 bubbles x 6 features is about 1 GB - instead of decoding
+the scans again. Sheets are only ever appended. The layout row also records an extraction
+fingerprint (preprocessing version and parameters); opening the store with another one
+empties it, so features computed by an older pipeline are never mixed with new ones.
+"""
+import os
+import time
+import sqlite3
+import numpy as np
+from contextlib import closing
+from typing import Dict, Optional, Sequence
+
+FEATURE_STORE_DIR = ".omr_features"
+FEATURES_FILE = "features.f32"
+INDEX_FILE = "index.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS layout (
+    questions INTEGER NOT NULL,
+    choices INTEGER NOT NULL,
+    feature_names TEXT NOT NULL,
+    extraction TEXT
+);
+CREATE TABLE IF NOT EXISTS sheets (
+    image_hash TEXT PRIMARY KEY,
+    row INTEGER UNIQUE NOT NULL,
+    image_path TEXT,
+    added_at REAL NOT NULL
+);
+"""
+
+class FeatureStore:
+    """Append-only (sheet, question, choice, feature) float32 array indexed by image hash"""
+
+    def __init__(self, directory: str, questions: int, choices: int, feature_names: Sequence[str],
+                 extraction: str = ""):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.data_path = os.path.join(directory, FEATURES_FILE)
+        self.db_path = os.path.join(directory, INDEX_FILE)
+        self.feature_names = tuple(feature_names)
+        self.extraction = extraction
+        self.row_shape = (questions, choices, len(self.feature_names))
+        self.row_bytes = int(np.prod(self.row_shape)) * 4
+
+        layout = (questions, choices, ",".join(self.feature_names))
+        with closing(self._connect()) as conn:
+            conn.executescript(_SCHEMA)
+            if "extraction" not in [column[1] for column in conn.execute("PRAGMA table_info(layout)")]:
+                conn.execute("ALTER TABLE layout ADD COLUMN extraction TEXT")  # store of an older version
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                stored = conn.execute("SELECT questions, choices, feature_names, extraction FROM layout").fetchone()
+                if stored is None:
+                    conn.execute("INSERT INTO layout VALUES (?, ?, ?, ?)", layout + (extraction,))
+                elif tuple(stored[:3]) != layout:
+                    raise ValueError(f"Feature store {directory} holds {tuple(stored[:3])}, not {layout}")
+                elif stored[3] != extraction:
+                    print(f"Feature store {directory} was built by extraction {stored[3]!r}, "
+                          f"not {extraction!r}; discarding its sheets")
+                    conn.execute("DELETE FROM sheets")
+                    conn.execute("UPDATE layout SET extraction = ?", (extraction,))
+                    with open(self.data_path, 'ab') as f:
+                        f.truncate(0)
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def __len__(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM sheets").fetchone()[0]
+
+    def __contains__(self, image_hash: str) -> bool:
+        return self.row_of(image_hash) is not None
+
+    def row_of(self, image_hash: str) -> Optional[int]:
+        """Row of an image in array(), None if it has not been stored"""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT row FROM sheets WHERE image_hash = ?", (image_hash,)).fetchone()
+        return row[0] if row else None
+
+    def index(self) -> Dict[str, int]:
+        """{image hash: row} of every stored sheet"""
+        with closing(self._connect()) as conn:
+            return dict(conn.execute("SELECT image_hash, row FROM sheets"))
+
+    def append(self, image_hash: str, features: np.ndarray, image_path: Optional[str] = None) -> int:
+        """
+        Store the features of one sheet and return its row (the existing row if already stored)
+        Appends from several processes are serialized by the index database lock.
+        """
+        features = np.ascontiguousarray(features, dtype=np.float32).reshape(self.row_shape)
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                existing = conn.execute("SELECT row FROM sheets WHERE image_hash = ?", (image_hash,)).fetchone()
+                if existing:
+                    conn.rollback()
+                    return existing[0]
+
+                row = conn.execute("SELECT COUNT(*) FROM sheets").fetchone()[0]
+                with open(self.data_path, 'ab') as f:
+                    # Drop the data of an append whose index entry was never committed
+                    f.truncate(row * self.row_bytes)
+                    f.write(features.tobytes())
+                conn.execute("INSERT INTO sheets (image_hash, row, image_path, added_at) VALUES (?, ?, ?, ?)",
+                             (image_hash, row, image_path, time.time()))
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        return row
+
+    def array(self) -> np.ndarray:
+        """Read-only memory map of all stored sheets, shape (sheets, questions, choices, features)"""
+        rows = len(self)
+        if rows == 0:
+            return np.zeros((0,) + self.row_shape, dtype=np.float32)
+        return np.memmap(self.data_path, dtype=np.float32, mode='r', shape=(rows,) + self.row_shape)
+
+    def get(self, image_hash: str) -> Optional[np.ndarray]:
+        """Features of one sheet, None if it has not been stored"""
+        row = self.row_of(image_hash)
+        return None if row is None else np.array(self.array()[row])
@@ -0,0 +1,94 @@
+"""
+Prefetching image loader for the evaluation and training loops.
+
+cv2 releases the GIL while decoding, so a small thread pool can read and decode the next
+few images while the caller is still busy with the current one; disk / network latency then
+overlaps with processing instead of alternating with it.
+"""
+import cv2
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, Optional, Tuple
+from image_source import read_image
+
+DEFAULT_PREFETCH_DEPTH = 4
+DEFAULT_PREFETCH_BYTES = 256 * 1024 * 1024
+
+class PrefetchingImageLoader:
+    """
+    Iterate over (source, image) pairs in order, decoding up to `depth` images ahead.
+    `max_bytes` caps the memory held by decoded images waiting to be consumed; at least one
+    image is always in flight, so a single huge scan cannot stall the loop.
+    Unreadable images are yielded as (source, None), like cv2.imread.
+    """
+
+    def __init__(self, sources: Iterable[str], depth: int = DEFAULT_PREFETCH_DEPTH,
+                 max_bytes: int = DEFAULT_PREFETCH_BYTES, workers: Optional[int] = None,
+                 flags: int = cv2.IMREAD_COLOR):
+        self.sources = sources
+        self.depth = max(1, depth)
+        self.max_bytes = max_bytes
+        self.workers = workers or min(self.depth, 4)
+        self.flags = flags
+        self._executor = None
+
+    def _load(self, source: str) -> Optional[np.ndarray]:
+        try:
+            return read_image(source, self.flags)
+        except Exception as e:
+            print(f"Could not load {source}: {e}")
+            return None
+
+    @staticmethod
+    def _pending_bytes(pending: deque, average_bytes: float) -> float:
+        """Decoded bytes waiting in the queue, estimating images that are still decoding"""
+        total = 0.0
+        for _, future in pending:
+            if future.done():
+                image = future.result()
+                total += image.nbytes if image is not None else 0
+            else:
+                total += average_bytes
+        return total
+
+    def __iter__(self) -> Iterator[Tuple[str, Optional[np.ndarray]]]:
+        sources = iter(self.sources)
+        pending = deque()
+        loaded_bytes, loaded_count = 0, 0
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="image-prefetch")
+        try:
+            exhausted = False
+            while True:
+                # Top up the queue within the depth and memory budget
+                average_bytes = loaded_bytes / loaded_count if loaded_count else 0
+                while (not exhausted and len(pending) < self.depth and
+                       (not pending or self._pending_bytes(pending, average_bytes) + average_bytes <= self.max_bytes)):
+                    source = next(sources, None)
+                    if source is None:
+                        exhausted = True
+                        break
+                    pending.append((source, self._executor.submit(self._load, source)))
+
+                if not pending:
+                    return
+                source, future = pending.popleft()
+                image = future.result()
+                if image is not None:
+                    loaded_bytes += image.nbytes
+                    loaded_count += 1
+                yield source, image
+        finally:
+            self.close()
+
+    def close(self):
+        """Stop prefetching (pending decodes are dropped)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
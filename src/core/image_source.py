@@ -0,0 +1,77 @@
+"""
+Image input sources for the OMR processors.
+
+Besides plain image paths, a page of a multi-page TIFF scan stack can be referenced as
+"<stack path>#<page index>". Such references are cheap strings, so they can sit in the
+dataset lists and be handed to workers; each page is only decoded by `read_image` when
+the worker that owns it actually needs the pixels.
+"""
+import cv2
+import numpy as np
+import os
+from typing import Iterator, List, Optional, Tuple, Union
+
+TIFF_EXTENSIONS = ('.tif', '.tiff')
+PAGE_SEPARATOR = '#'
+
+def is_tiff(path: str) -> bool:
+    """Check whether a path points to a TIFF file"""
+    return path.lower().endswith(TIFF_EXTENSIONS)
+
+def make_page_ref(path: str, page: int) -> str:
+    """Build a reference to one page of a multi-page TIFF"""
+    return f"{path}{PAGE_SEPARATOR}{page}"
+
+def split_page_ref(source: str) -> Tuple[str, Optional[int]]:
+    """Split a page reference into (file path, page index); plain paths return (path, None)"""
+    base, sep, page = source.rpartition(PAGE_SEPARATOR)
+    if sep and page.isdigit() and is_tiff(base):
+        return base, int(page)
+    return source, None
+
+def read_image(source: Union[str, np.ndarray], flags: int = cv2.IMREAD_COLOR) -> Optional[np.ndarray]:
+    """
+    Decode an image from a path, a TIFF page reference or pass an already decoded array through.
+    Returns None when the image cannot be read, like cv2.imread.
+    """
+    if isinstance(source, np.ndarray):
+        return source
+
+    path, page = split_page_ref(source)
+    if page is None:
+        return cv2.imread(path, flags)
+
+    # Decode just the requested page, not the whole stack
+    success, pages = cv2.imreadmulti(path, start=page, count=1, flags=flags)
+    if not success or not pages:
+        return None
+    return pages[0]
+
+class MultiPageTiffSource:
+    """Lazily enumerates the pages of a multi-page TIFF without decoding them"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._page_count = None
+
+    def __len__(self) -> int:
+        if self._page_count is None:
+            # Only walks the page directory, pixel data stays on disk
+            self._page_count = cv2.imcount(self.path) if os.path.exists(self.path) else 0
+        return self._page_count
+
+    def __iter__(self) -> Iterator[str]:
+        for page in range(len(self)):
+            yield make_page_ref(self.path, page)
+
+    def page_refs(self) -> List[str]:
+        """Page references for all pages; a single-page TIFF is referenced by its plain path"""
+        if len(self) == 1:
+            return [self.path]
+        return list(self)
+
+    def load_page(self, page: int, flags: int = cv2.IMREAD_COLOR) -> Optional[np.ndarray]:
+        """Decode a single page"""
+        if not 0 <= page < len(self):
+            raise IndexError(f"Page {page} out of range for {self.path} ({len(self)} pages)")
+        return read_image(make_page_ref(self.path, page), flags)
@@ -0,0 +1,384 @@
+"""
+Persistent job queue in a local SQLite file, shared by the web apps and OMR worker processes.
+
+The web app enqueues one job per uploaded sheet and returns; separate worker processes
+(`python main.py --worker`, as many as wanted, on any machine that sees the queue and spool
+folders) claim jobs, run the processor and write the results back. UI responsiveness then no
+longer depends on processing load, and workers scale independently of the web app.
+
+Jobs have a priority (higher first, then oldest first), a limited number of attempts with a
+growing retry delay, and a visibility timeout: a claimed job is leased to one worker, and if
+the worker dies without completing or failing it, the job becomes claimable again once the
+lease expires.
+"""
+import os
+import json
+import time
+import uuid
+import shutil
+import socket
+import sqlite3
+import threading
+import configparser
+from contextlib import closing, contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+JOB_QUEUE_FILE = "omr_jobs.sqlite"
+PROCESS_SHEET = "process_sheet"
+
+# Defaults of the [jobs] section of config.ini
+JOB_SETTINGS = {
+    'backend': 'executor',          # 'executor' (in-process pool) or 'queue' (this module + workers)
+    'queue_path': os.path.join('results', JOB_QUEUE_FILE),
+    'spool_path': os.path.join('results', 'job_spool'),
+    'visibility_timeout': 300.0,    # seconds a claimed job stays leased to its worker
+    'max_attempts': 3,
+    'retry_delay': 5.0,             # seconds before the first retry, doubled for every further one
+    'poll_interval': 1.0,           # seconds an idle worker waits before looking again
+    'retention': 3600.0             # seconds finished jobs are kept for their results to be collected
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    visible_at REAL NOT NULL,
+    lease TEXT,
+    worker TEXT,
+    batch_id TEXT,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, priority DESC, id);
+CREATE INDEX IF NOT EXISTS jobs_batch ON jobs (batch_id, id);
+"""
+
+def load_job_settings(config_path: str = "config.ini") -> Dict:
+    """JOB_SETTINGS overridden by the [jobs] section of config_path (if any)"""
+    settings = dict(JOB_SETTINGS)
+    parser = configparser.ConfigParser()
+    parser.read(config_path, encoding='utf-8')
+    if parser.has_section('jobs'):
+        for name, default in JOB_SETTINGS.items():
+            if parser.has_option('jobs', name):
+                settings[name] = type(default)(parser.get('jobs', name))
+    return settings
+
+def _to_json(value):
+    """json.dumps fallback for the numpy values found in processor results"""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+class Job:
+    """One row of the jobs table"""
+
+    def __init__(self, row: sqlite3.Row):
+        self.id = row['id']
+        self.kind = row['kind']
+        self.payload = json.loads(row['payload'])
+        self.priority = row['priority']
+        self.status = row['status']
+        self.attempts = row['attempts']
+        self.max_attempts = row['max_attempts']
+        self.lease = row['lease']
+        self.batch_id = row['batch_id']
+        self.result = None if row['result'] is None else json.loads(row['result'])
+        self.error = row['error']
+        self.created_at = row['created_at']
+        self.finished_at = row['finished_at']
+
+class JobQueue:
+    """Priority queue of jobs with retries and visibility timeouts, stored in one SQLite file"""
+
+    def __init__(self, db_path: str, visibility_timeout: float = JOB_SETTINGS['visibility_timeout'],
+                 retry_delay: float = JOB_SETTINGS['retry_delay']):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db_path = db_path
+        self.visibility_timeout = visibility_timeout
+        self.retry_delay = retry_delay
+        with closing(self._connect()) as conn, conn:
+            # WAL lets the web app read progress while workers write results
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def enqueue(self, kind: str, payloads: Sequence[Dict], priority: int = 0,
+                max_attempts: int = JOB_SETTINGS['max_attempts'], batch_id: Optional[str] = None) -> List[int]:
+        """Add one job per payload (in one transaction) and return their ids"""
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            return [conn.execute("INSERT INTO jobs (kind, payload, priority, max_attempts, visible_at, batch_id, created_at) "
+                                 "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                 (kind, json.dumps(payload, default=_to_json), priority, max_attempts, now, batch_id, now)
+                                 ).lastrowid
+                    for payload in payloads]
+
+    def claim(self, worker: str = "", visibility_timeout: Optional[float] = None) -> Optional[Job]:
+        """
+        Lease the next visible job to a worker, None if there is none
+        Running jobs whose lease has expired are claimable again; if they have used up their
+        attempts they are failed instead.
+        """
+        now = time.time()
+        timeout = self.visibility_timeout if visibility_timeout is None else visibility_timeout
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("UPDATE jobs SET status = 'failed', lease = NULL, finished_at = ?, "
+                             "error = COALESCE(error, 'Worker lease expired') "
+                             "WHERE status = 'running' AND visible_at <= ? AND attempts >= max_attempts", (now, now))
+                row = conn.execute("SELECT id FROM jobs WHERE status IN ('queued', 'running') AND visible_at <= ? "
+                                   "ORDER BY priority DESC, id LIMIT 1", (now,)).fetchone()
+                if row is None:
+                    conn.commit()
+                    return None
+                lease = uuid.uuid4().hex
+                conn.execute("UPDATE jobs SET status = 'running', attempts = attempts + 1, lease = ?, worker = ?, "
+                             "visible_at = ? WHERE id = ?", (lease, worker, now + timeout, row['id']))
+                job = Job(conn.execute("SELECT * FROM jobs WHERE id = ?", (row['id'],)).fetchone())
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        return job
+
+    def _finish(self, sql: str, args: Tuple) -> bool:
+        with closing(self._connect()) as conn, conn:
+            return conn.execute(sql, args).rowcount == 1
+
+    def complete(self, job: Job, result: Dict) -> bool:
+        """Store the result of a claimed job; False if the lease was lost (the job went to another worker)"""
+        return self._finish("UPDATE jobs SET status = 'done', result = ?, lease = NULL, finished_at = ? "
+                            "WHERE id = ? AND lease = ? AND status = 'running'",
+                            (json.dumps(result, default=_to_json), time.time(), job.id, job.lease))
+
+    def fail(self, job: Job, error: str) -> bool:
+        """
+        Record a failed attempt: the job is retried after a growing delay, or failed for good once
+        it has used up its attempts. False if the lease was lost.
+        """
+        now = time.time()
+        if job.attempts >= job.max_attempts:
+            return self._finish("UPDATE jobs SET status = 'failed', error = ?, lease = NULL, finished_at = ? "
+                                "WHERE id = ? AND lease = ? AND status = 'running'", (error, now, job.id, job.lease))
+        delay = self.retry_delay * 2 ** (job.attempts - 1)
+        return self._finish("UPDATE jobs SET status = 'queued', error = ?, lease = NULL, visible_at = ? "
+                            "WHERE id = ? AND lease = ? AND status = 'running'", (error, now + delay, job.id, job.lease))
+
+    def extend(self, job: Job, visibility_timeout: Optional[float] = None) -> bool:
+        """Keep a long-running job leased (heartbeat); False if the lease was lost"""
+        timeout = self.visibility_timeout if visibility_timeout is None else visibility_timeout
+        return self._finish("UPDATE jobs SET visible_at = ? WHERE id = ? AND lease = ? AND status = 'running'",
+                            (time.time() + timeout, job.id, job.lease))
+
+    def get(self, job_id: int) -> Optional[Job]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return None if row is None else Job(row)
+
+    def batch(self, batch_id: str) -> List[Job]:
+        """Jobs of a batch in the order they were enqueued"""
+        with closing(self._connect()) as conn:
+            return [Job(row) for row in conn.execute("SELECT * FROM jobs WHERE batch_id = ? ORDER BY id", (batch_id,))]
+
+    def counts(self) -> Dict[str, int]:
+        """{status: number of jobs}"""
+        with closing(self._connect()) as conn:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def purge(self, older_than: float) -> int:
+        """Delete jobs that finished more than older_than seconds ago; returns how many"""
+        with closing(self._connect()) as conn, conn:
+            return conn.execute("DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                                (time.time() - older_than,)).rowcount
+
+class QueuedBatch:
+    """Progress and results of one batch in the job queue (same interface as batch_executor.BatchJob)"""
+
+    def __init__(self, batch_id: str, jobs: List[Job], work_dir: str):
+        self.batch_id = batch_id
+        self.jobs = jobs
+        self.work_dir = work_dir
+        self.created_at = min(job.created_at for job in jobs)
+
+    @property
+    def completed_at(self) -> Optional[float]:
+        """When the last sheet finished, None while sheets are pending"""
+        return max(job.finished_at for job in self.jobs) if self.finished else None
+
+    @property
+    def total(self) -> int:
+        return len(self.jobs)
+
+    @property
+    def completed(self) -> int:
+        return sum(job.status in ('done', 'failed') for job in self.jobs)
+
+    @property
+    def finished(self) -> bool:
+        return self.completed == self.total
+
+    def results(self) -> List[Dict]:
+        """Results of the sheets finished so far, in upload order, tagged with 'uploaded_filename'"""
+        results = []
+        for job in self.jobs:
+            if job.status == 'done':
+                result = dict(job.result)
+            elif job.status == 'failed':
+                result = {'success': False, 'error': job.error}
+            else:
+                continue
+            result['uploaded_filename'] = job.payload['filename']
+            results.append(result)
+        return results
+
+class QueueBatchClient:
+    """
+    Drop-in replacement for batch_executor.BatchExecutor that only enqueues: the sheets are
+    processed by `main.py --worker` processes, which must see spool_dir under the same path.
+    """
+
+    def __init__(self, queue: JobQueue, spool_dir: str, priority: int = 0,
+                 max_attempts: int = JOB_SETTINGS['max_attempts'], retention: float = JOB_SETTINGS['retention']):
+        os.makedirs(spool_dir, exist_ok=True)
+        self.queue = queue
+        self.spool_dir = os.path.abspath(spool_dir)
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.retention = retention
+
+    def submit(self, uploads: Sequence[Tuple[str, bytes]], set_type: Optional[str] = None,
+               answer_key: Optional[Sequence[int]] = None, priority: Optional[int] = None) -> str:
+        """Spool (filename, file content) uploads, enqueue one job per sheet and return the batch id"""
+        batch_id = uuid.uuid4().hex[:12]
+        work_dir = os.path.join(self.spool_dir, batch_id)
+        os.makedirs(work_dir)
+        answer_key = None if answer_key is None else [int(answer) for answer in answer_key]
+
+        payloads = []
+        for index, (filename, data) in enumerate(uploads):
+            image_path = os.path.join(work_dir, f"{index:05d}{os.path.splitext(filename)[1] or '.jpg'}")
+            with open(image_path, 'wb') as f:
+                f.write(data)
+            payloads.append({'image_path': image_path, 'filename': filename,
+                             'set_type': set_type, 'answer_key': answer_key})
+        self.queue.enqueue(PROCESS_SHEET, payloads, self.priority if priority is None else priority,
+                           self.max_attempts, batch_id)
+        self.queue.purge(self.retention)
+        return batch_id
+
+    def get(self, batch_id: Optional[str]) -> Optional[QueuedBatch]:
+        """A submitted batch, None if the id is unknown or its jobs have been purged"""
+        jobs = self.queue.batch(batch_id) if batch_id else []
+        if not jobs:
+            return None
+        batch = QueuedBatch(batch_id, jobs, os.path.join(self.spool_dir, batch_id))
+        if batch.finished:
+            shutil.rmtree(batch.work_dir, ignore_errors=True)
+        return batch
+
+    def shutdown(self):
+        pass  # nothing runs in this process
+
+def open_batch_backend(processor_factory: Callable, config_path: str = "config.ini", workers: Optional[int] = None):
+    """
+    Batch backend selected by the [jobs] section of config_path: a BatchExecutor running the
+    sheets in this process's pool, or a QueueBatchClient leaving them to queue workers.
+    Relative queue and spool paths are taken relative to the folder of config_path.
+    """
+    settings = load_job_settings(config_path)
+    if settings['backend'] == 'executor':
+        from batch_executor import BatchExecutor
+        return BatchExecutor(processor_factory, workers)
+    if settings['backend'] != 'queue':
+        raise ValueError(f"Unknown batch backend: {settings['backend']}")
+    base_dir = os.path.dirname(os.path.abspath(config_path))
+    queue = JobQueue(os.path.join(base_dir, settings['queue_path']), settings['visibility_timeout'],
+                     settings['retry_delay'])
+    return QueueBatchClient(queue, os.path.join(base_dir, settings['spool_path']),
+                            max_attempts=settings['max_attempts'], retention=settings['retention'])
+
+def process_sheet_job(processor, payload: Dict) -> Dict:
+    """
+    Run the processor on a spooled sheet, timed in 'processing_time'. An unreadable sheet is a
+    result ({'success': False}), not a failure: only exceptions and lost workers are retried.
+    """
+    start = time.perf_counter()
+    result = processor.process_omr_sheet(payload['image_path'], payload['set_type'], answer_key=payload['answer_key'])
+    result['processing_time'] = time.perf_counter() - start
+    return result
+
+@contextmanager
+def _lease_heartbeat(queue: JobQueue, job: Job):
+    """Extend the job's lease in a background thread while the block runs, so a sheet that takes
+    longer than the visibility timeout is not handed to another worker meanwhile"""
+    stop = threading.Event()
+
+    def renew():
+        while not stop.wait(queue.visibility_timeout / 3):
+            if not queue.extend(job):
+                return  # lease lost: complete/fail will report it
+
+    thread = threading.Thread(target=renew, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+def run_worker(queue: JobQueue, processor_factory: Callable, handlers: Optional[Dict[str, Callable]] = None,
+               poll_interval: float = JOB_SETTINGS['poll_interval'], max_jobs: Optional[int] = None,
+               stop_when_idle: bool = False, worker: Optional[str] = None) -> int:
+    """
+    Claim and run jobs until interrupted (or max_jobs were run, or the queue is empty with
+    stop_when_idle); returns the number of jobs run.
+    handlers maps a job kind to handler(processor, payload) -> result dict, which raises to fail.
+    The lease of the running job is renewed every visibility_timeout / 3 seconds.
+    """
+    handlers = handlers or {PROCESS_SHEET: process_sheet_job}
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    processor = processor_factory()
+    jobs_run = 0
+    while max_jobs is None or jobs_run < max_jobs:
+        job = queue.claim(worker)
+        if job is None:
+            if stop_when_idle:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        jobs_run += 1
+        error = None
+        with _lease_heartbeat(queue, job):
+            try:
+                handler = handlers.get(job.kind)
+                if handler is None:
+                    raise ValueError(f"No handler for job kind {job.kind}")
+                result = handler(processor, job.payload)
+            except Exception as e:
+                error = str(e)
+        if error is None:
+            finished = queue.complete(job, result)
+        else:
+            finished = queue.fail(job, error) and job.attempts >= job.max_attempts
+        # The spooled upload is no longer needed once this worker finished the job for good; if
+        # the lease was lost, the worker that now holds the job still needs it
+        image_path = job.payload.get('image_path')
+        if finished and image_path and os.path.exists(image_path):
+            os.unlink(image_path)
+    return jobs_run
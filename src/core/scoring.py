@@ -0,0 +1,123 @@
+"""
+Vectorized scoring of OMR answers.
+
+Answers are integer choice indices (A=0, B=1, ...) with -1 for a blank; a batch is an
+(students x questions) matrix, so a whole exam is scored - or re-scored after a key
+correction - in a handful of array operations without touching the scans again.
+"""
+import numpy as np
+from typing import Dict, Mapping, Optional, Sequence, Tuple, Union
+
+BLANK = -1
+CHOICE_LETTERS = "ABCD"
+SUBJECTS = 5  # 5 subjects x 20 questions on the standard sheet
+DEFAULT_GRADE_BANDS = ((90, "A+"), (80, "A"), (70, "B"), (60, "C"), (50, "D"), (0, "F"))
+
+class ScoringScheme:
+    """
+    How answers turn into marks
+    weights: marks per question (default 1 each); questions whose key is -1 are not scored
+    negative_mark: fraction of the question weight subtracted for a wrong answer
+    blank_mark: fraction of the question weight awarded for a blank (usually 0)
+    subjects: number of equal, consecutive question blocks to subtotal
+    grade_bands: (minimum percentage, grade) pairs, highest first
+    """
+
+    def __init__(self, weights: Optional[Sequence[float]] = None, negative_mark: float = 0.0,
+                 blank_mark: float = 0.0, subjects: int = SUBJECTS,
+                 grade_bands: Sequence[Tuple[float, str]] = DEFAULT_GRADE_BANDS):
+        self.weights = None if weights is None else np.asarray(weights, dtype=np.float32)
+        self.negative_mark = negative_mark
+        self.blank_mark = blank_mark
+        self.subjects = subjects
+        self.grade_bands = sorted(grade_bands, key=lambda band: band[0])
+
+    def grade(self, percentages: Union[float, np.ndarray]) -> Union[str, np.ndarray]:
+        """Grade letter(s) for percentage(s)"""
+        thresholds = np.array([band[0] for band in self.grade_bands], dtype=np.float32)
+        letters = np.array([band[1] for band in self.grade_bands])
+        index = np.searchsorted(thresholds, percentages, side='right') - 1
+        result = letters[np.clip(index, 0, len(letters) - 1)]
+        return str(result) if np.ndim(result) == 0 else result
+
+DEFAULT_SCHEME = ScoringScheme()
+
+def score_answers(answers: Union[Sequence[int], np.ndarray], key: Union[Sequence[int], np.ndarray],
+                  scheme: Optional[ScoringScheme] = None) -> Dict[str, np.ndarray]:
+    """
+    Score one answer list or a batch answer matrix against a compiled key in one pass
+    Every key question is scored: missing answers count as blank, extra answers are ignored.
+    Returns arrays with one entry per student (plain values / rows for a single answer list):
+        correct / blank: per-question boolean matrices
+        correct_count, wrong_count, blank_count, marks, percentage, grade
+        subject_marks: per-subject subtotals (students x subjects), when the questions split evenly
+        max_marks: highest reachable total
+    """
+    scheme = scheme or DEFAULT_SCHEME
+    answers = np.asarray(answers, dtype=np.int8)
+    key = np.asarray(key, dtype=np.int8).reshape(-1)
+    single = answers.ndim == 1
+    answers = np.atleast_2d(answers)
+
+    questions = key.shape[0]
+    if answers.shape[1] < questions:
+        answers = np.pad(answers, ((0, 0), (0, questions - answers.shape[1])), constant_values=BLANK)
+    answers = answers[:, :questions]
+
+    scored_questions = key >= 0
+    weights = np.ones(questions, dtype=np.float32) if scheme.weights is None else scheme.weights[:questions]
+    weights = np.where(scored_questions, weights, 0).astype(np.float32)
+
+    answered = answers >= 0
+    correct = answers == np.where(scored_questions, key, np.int8(127))  # a dropped question never matches
+
+    # All sums are matrix products against one weight matrix:
+    # [total weights | per-subject weights ... | scored question count | question count]
+    columns = [weights]
+    split_subjects = bool(scheme.subjects) and questions % scheme.subjects == 0
+    if split_subjects:
+        subject_of = np.arange(questions) // (questions // scheme.subjects)
+        columns.extend(np.where(subject_of == subject, weights, 0) for subject in range(scheme.subjects))
+    columns.extend([scored_questions, np.ones(questions)])
+    weight_matrix = np.stack(columns, axis=1).astype(np.float32)
+
+    correct_sums = (correct.view(np.uint8) @ weight_matrix).astype(np.float64)
+    answered_sums = (answered.view(np.uint8) @ weight_matrix).astype(np.float64)
+    wrong_sums = answered_sums - correct_sums
+    blank_sums = weight_matrix.sum(axis=0, dtype=np.float64) - answered_sums
+    totals = correct_sums - scheme.negative_mark * wrong_sums + scheme.blank_mark * blank_sums
+
+    marks = totals[:, 0]
+    max_marks = float(weights.sum())
+    # Multiply first so whole-mark totals land exactly on grade band edges
+    percentage = marks * 100 / max_marks if max_marks > 0 else np.zeros_like(marks)
+
+    results = {
+        "correct": correct,
+        "blank": ~answered,
+        "correct_count": correct_sums[:, -2].astype(np.int64),
+        "wrong_count": wrong_sums[:, -2].astype(np.int64),
+        "blank_count": blank_sums[:, -1].astype(np.int64),
+        "marks": marks,
+        "max_marks": max_marks,
+        "percentage": percentage,
+        "grade": scheme.grade(percentage),
+    }
+    if split_subjects:
+        results["subject_marks"] = totals[:, 1:-2]
+
+    if single:
+        results = {name: value[0] if isinstance(value, np.ndarray) else value
+                   for name, value in results.items()}
+    return results
+
+def key_question_count(letters: Mapping[str, str], default: int = 100) -> int:
+    """Highest question number of a {'Q1': 'A', ...} mapping (default if it has none), so gaps count as blank"""
+    numbers = [int(name[1:]) for name in letters if str(name)[:1] == 'Q' and str(name)[1:].isdigit()]
+    return max(numbers, default=default)
+
+def letters_to_indices(letters: Mapping[str, str], questions: int = 100) -> np.ndarray:
+    """Convert a {'Q1': 'A', ...} mapping to choice indices (-1 for blank or unknown marks)"""
+    lookup = {letter: index for index, letter in enumerate(CHOICE_LETTERS)}
+    return np.array([lookup.get(str(letters.get(f'Q{i}', '')).strip().upper(), BLANK)
+                     for i in range(1, questions + 1)], dtype=np.int8)
@@ -0,0 +1,74 @@
+import cv2
+import numpy as np
+from typing import Optional
+
+class SheetTracker:
+    """Tracks OMR sheet corner points between full detections using pyramidal Lucas-Kanade optical flow"""
+
+    def __init__(self, redetect_interval: int = 30, stable_frames: int = 5,
+                 stable_tolerance: float = 1.5, max_fb_error: float = 2.0):
+        self.redetect_interval = redetect_interval  # Force a full detection every N tracked frames
+        self.stable_frames = stable_frames          # Frames without motion before the sheet counts as stable
+        self.stable_tolerance = stable_tolerance    # Max corner movement (px) for a frame to count as still
+        self.max_fb_error = max_fb_error            # Forward-backward error (px) above which a point is lost
+        self.lk_params = dict(winSize=(21, 21), maxLevel=3,
+                              criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+        self.reset()
+
+    def reset(self):
+        """Forget the tracked sheet (next frame needs a full detection)"""
+        self.prev_gray = None
+        self.points = None
+        self.frames_since_detection = 0
+        self.still_count = 0
+
+    @property
+    def needs_detection(self) -> bool:
+        """True when there is nothing to track or the periodic re-detection is due"""
+        return self.points is None or self.frames_since_detection >= self.redetect_interval
+
+    @property
+    def is_stable(self) -> bool:
+        """True once the corners have stayed still for `stable_frames` consecutive frames"""
+        return self.points is not None and self.still_count >= self.stable_frames
+
+    def start(self, gray: np.ndarray, points: np.ndarray):
+        """Start tracking from freshly detected corner points (any shape reshaping to Nx2)"""
+        new_points = np.float32(points).reshape(-1, 1, 2)
+        if self.points is not None and self.points.shape == new_points.shape:
+            # A re-detection of a sheet that has not moved keeps its stability count
+            movement = np.max(np.linalg.norm((new_points - self.points).reshape(-1, 2), axis=1))
+            self.still_count = self.still_count + 1 if movement <= self.stable_tolerance * 2 else 0
+        else:
+            self.still_count = 0
+        self.prev_gray = gray
+        self.points = new_points
+        self.frames_since_detection = 0
+
+    def track(self, gray: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Follow the corners into a new frame.
+        Returns the Nx2 corner array, or None when any corner is lost (caller should re-detect).
+        """
+        if self.points is None:
+            return None
+
+        new_points, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, self.points, None, **self.lk_params)
+        if new_points is None or not status.all():
+            self.reset()
+            return None
+
+        # Forward-backward check rejects corners that slid along an edge
+        back_points, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self.prev_gray, new_points, None, **self.lk_params)
+        fb_error = np.linalg.norm((back_points - self.points).reshape(-1, 2), axis=1)
+        if not back_status.all() or np.max(fb_error) > self.max_fb_error:
+            self.reset()
+            return None
+
+        movement = np.max(np.linalg.norm((new_points - self.points).reshape(-1, 2), axis=1))
+        self.still_count = self.still_count + 1 if movement <= self.stable_tolerance else 0
+
+        self.prev_gray = gray
+        self.points = new_points
+        self.frames_since_detection += 1
+        return new_points.reshape(-1, 2)
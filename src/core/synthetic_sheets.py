@@ -0,0 +1,221 @@
+"""
+Synthetic filled OMR sheets with ground truth, for throughput and accuracy benchmarks.
+
+Sheets use the 5-subject x 20-question layout of TrainedPrecisionOMRProcessor's mark
+detection methods: on the 600x800 working size the top 15% is the header and every subject
+column is 120 px wide, with one 34 px row per question and one 30 px cell per choice. The
+processor resizes without warping or cropping, so sheets fill the whole frame like a scan.
+Each sheet is rendered from a cached blank template, then gets its marks (varying pencil
+darkness, partial fills, erasures and blanks), a slight rotation and perspective, lighting,
+blur, noise and JPEG compression. Everything is drawn from a random generator seeded with (seed, sheet index), so
+sheet N is identical however many sheets are generated and in which process.
+"""
+import os
+import shutil
+import numpy as np
+import cv2
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+from data_handler import OMRDataHandler
+
+SHEET_SIZE = (600, 800)  # width, height of the layout below
+SUBJECTS = 5
+QUESTIONS_PER_SUBJECT = 20
+CHOICES = 4
+HEADER_SKIP = 120
+SUBJECT_WIDTH = SHEET_SIZE[0] // SUBJECTS
+ROW_HEIGHT = (SHEET_SIZE[1] - HEADER_SKIP) // QUESTIONS_PER_SUBJECT
+CHOICE_WIDTH = SUBJECT_WIDTH // CHOICES
+BUBBLE_RADIUS = 9
+SUBJECT_NAMES = ("PYTHON", "DATA ANALYSIS", "MySQL", "POWER BI", "Adv STATS")
+GROUND_TRUTH_FILE = "ground_truth.npz"
+# Capture jitter: rotation and corner offsets move a bubble by at most ~8 px at the 600x800
+# working size, a quarter of a 30x34 px grid cell, so the processors' fixed grid still holds
+MAX_ROTATION_DEGREES = 0.5
+MAX_CORNER_JITTER = 0.006
+
+class SyntheticSheet(NamedTuple):
+    """A rendered sheet and what was drawn on it (per question; answers are -1 for blank)"""
+    image: np.ndarray
+    answers: np.ndarray
+    partial: np.ndarray
+    erased: np.ndarray
+
+def bubble_center(question: int, choice: int, scale: float = 1.0) -> Tuple[int, int]:
+    """Pixel center of a bubble on the unwarped sheet"""
+    subject, row = divmod(int(question), QUESTIONS_PER_SUBJECT)
+    choice = int(choice)
+    x = subject * SUBJECT_WIDTH + choice * CHOICE_WIDTH + CHOICE_WIDTH // 2
+    y = HEADER_SKIP + row * ROW_HEIGHT + ROW_HEIGHT // 2
+    return int(round(x * scale)), int(round(y * scale))
+
+@lru_cache(maxsize=8)
+def render_blank_sheet(set_label: str = "A", scale: float = 1.5) -> np.ndarray:
+    """Grayscale blank sheet (cached; copy before drawing on it)"""
+    width, height = int(SHEET_SIZE[0] * scale), int(SHEET_SIZE[1] * scale)
+    sheet = np.full((height, width), 245, dtype=np.uint8)
+    font = cv2.FONT_HERSHEY_SIMPLEX
+
+    def at(x, y):
+        return int(round(x * scale)), int(round(y * scale))
+
+    cv2.putText(sheet, f"Set No: SET - {set_label}", at(10, 22), font, 0.45 * scale, 60, max(1, int(scale)))
+    cv2.line(sheet, at(5, 32), at(595, 32), 150, 1)
+    for subject, name in enumerate(SUBJECT_NAMES):
+        x = subject * SUBJECT_WIDTH
+        cv2.putText(sheet, name, at(x + 8, 52), font, 0.35 * scale, 70, 1)
+        for choice, letter in enumerate("ABCD"):
+            cv2.putText(sheet, letter, at(x + choice * CHOICE_WIDTH + 11, 72), font, 0.3 * scale, 90, 1)
+
+    for question in range(SUBJECTS * QUESTIONS_PER_SUBJECT):
+        for choice in range(CHOICES):
+            cv2.circle(sheet, bubble_center(question, choice, scale), int(BUBBLE_RADIUS * scale), 110,
+                       max(1, int(scale)), cv2.LINE_AA)
+    return sheet
+
+@lru_cache(maxsize=4)
+def _noise_texture(shape: Tuple[int, int]) -> np.ndarray:
+    """Fixed zero-mean noise tile, cropped at random offsets (much cheaper than fresh noise per sheet)"""
+    rng = np.random.default_rng(0)
+    return rng.normal(0, 1, size=(shape[0] * 2, shape[1] * 2)).astype(np.float32)
+
+def generate_answers(key: np.ndarray, rng: np.random.Generator, skill: Optional[float] = None,
+                     blank_rate: float = 0.03) -> np.ndarray:
+    """Student answers: the key's answer with probability `skill`, another choice otherwise, some blanks"""
+    key = np.asarray(key, dtype=np.int8)
+    skill = rng.uniform(0.3, 0.95) if skill is None else skill
+    wrong = (key + rng.integers(1, CHOICES, size=key.shape)) % CHOICES
+    answers = np.where(rng.random(key.shape) < skill, key, wrong).astype(np.int8)
+    answers[rng.random(key.shape) < blank_rate] = -1
+    return answers
+
+def generate_sheet(key: np.ndarray, index: int, seed: int = 0, set_label: str = "A", scale: float = 1.5,
+                   skill: Optional[float] = None) -> SyntheticSheet:
+    """Render sheet number `index` of a synthetic dataset (deterministic in seed and index)"""
+    rng = np.random.default_rng([seed, index])
+    questions = SUBJECTS * QUESTIONS_PER_SUBJECT
+    answers = generate_answers(np.asarray(key)[:questions], rng, skill)
+
+    sheet = render_blank_sheet(set_label, scale).copy()
+    radius = BUBBLE_RADIUS * scale
+    darkness = rng.uniform(20, 110)  # pencil or pen pressure of this student
+    partial = (rng.random(questions) < 0.08) & (answers >= 0)
+    erased = rng.random(questions) < 0.05
+
+    for question in range(questions):
+        if erased[question]:
+            # Faint smudge of a changed answer on another choice
+            choice = (max(answers[question], 0) + rng.integers(1, CHOICES)) % CHOICES
+            center = bubble_center(question, choice, scale)
+            cv2.circle(sheet, center, int(radius * rng.uniform(0.6, 0.9)), int(rng.uniform(175, 215)), -1, cv2.LINE_AA)
+        if answers[question] < 0:
+            continue
+        center = bubble_center(question, answers[question], scale)
+        shade = int(np.clip(darkness + rng.normal(0, 12), 5, 160))
+        if partial[question]:
+            # Half-filled bubble: an off-center blob or a lighter fill
+            axes = (int(radius * rng.uniform(0.4, 0.8)), int(radius * rng.uniform(0.3, 0.7)))
+            offset = (int(rng.normal(0, radius / 4)), int(rng.normal(0, radius / 4)))
+            cv2.ellipse(sheet, (center[0] + offset[0], center[1] + offset[1]), axes, rng.uniform(0, 180),
+                        0, 360, int(min(shade + rng.uniform(30, 80), 200)), -1, cv2.LINE_AA)
+        else:
+            cv2.circle(sheet, center, int(radius * rng.uniform(0.85, 1.05)), shade, -1, cv2.LINE_AA)
+
+    return SyntheticSheet(_photograph(sheet, rng), answers, partial, erased)
+
+def _photograph(sheet: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Capture the flat sheet filling the frame: slight rotation and perspective, lighting, blur, noise"""
+    height, width = sheet.shape
+
+    # Rotate the sheet corners around the center and jitter them for perspective
+    corners = np.float32([[0, 0], [width, 0], [width, height], [0, height]])
+    angle = np.deg2rad(rng.uniform(-MAX_ROTATION_DEGREES, MAX_ROTATION_DEGREES))
+    rotation = np.array([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]], dtype=np.float32)
+    placed = (corners - [width / 2, height / 2]) @ rotation.T + [width / 2, height / 2]
+    placed += rng.uniform(-MAX_CORNER_JITTER, MAX_CORNER_JITTER, size=(4, 2)) * [width, height]
+    transform = cv2.getPerspectiveTransform(corners, placed.astype(np.float32))
+
+    background = int(rng.uniform(40, 140))
+    photo = cv2.warpPerspective(sheet, transform, (width, height), flags=cv2.INTER_LINEAR,
+                                borderMode=cv2.BORDER_CONSTANT, borderValue=background).astype(np.float32)
+
+    # Uneven lighting, sensor noise (in place: these arrays are the bulk of the work)
+    gradient = np.linspace(rng.uniform(0.8, 1.0), rng.uniform(0.9, 1.05), width, dtype=np.float32)
+    photo *= gradient[None, :]
+    noise = _noise_texture((height, width))
+    y, x = rng.integers(0, height), rng.integers(0, width)
+    photo = cv2.scaleAdd(noise[y:y + height, x:x + width], float(rng.uniform(1, 6)), photo)
+
+    sigma = rng.uniform(0, 1.5)
+    if sigma > 0.3:
+        photo = cv2.GaussianBlur(photo, (0, 0), sigma)
+
+    # Saturating conversion, then a slight color cast per channel
+    gray = cv2.convertScaleAbs(np.maximum(photo, 0, out=photo))
+    return cv2.merge([cv2.convertScaleAbs(gray, alpha=float(factor)) for factor in rng.uniform(0.9, 1.0, size=3)])
+
+def encode_jpeg(image: np.ndarray, rng: np.random.Generator) -> bytes:
+    """JPEG bytes at a random quality between phone-camera and scanner levels"""
+    ok, data = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, int(rng.integers(40, 96))])
+    if not ok:
+        raise ValueError("Could not encode sheet as JPEG")
+    return data.tobytes()
+
+def _write_sheets(out_dir: str, keys: Dict[str, np.ndarray], indices: Sequence[int], seed: int,
+                  scale: float) -> List[Tuple[int, str, str, np.ndarray, np.ndarray, np.ndarray]]:
+    """Render and write a chunk of sheets; returns their ground-truth rows"""
+    set_names = sorted(keys)
+    rows = []
+    for index in indices:
+        set_name = set_names[index % len(set_names)]
+        sheet = generate_sheet(keys[set_name], index, seed, set_name.split('_')[-1], scale)
+        relative_path = os.path.join("DataSets", set_name.replace('_', ' '), f"Synth{index:06d}.jpg")
+        with open(os.path.join(out_dir, relative_path), 'wb') as f:
+            f.write(encode_jpeg(sheet.image, np.random.default_rng([seed, index, 1])))
+        rows.append((index, relative_path, set_name, sheet.answers, sheet.partial, sheet.erased))
+    return rows
+
+def generate_dataset(out_dir: str, count: int, seed: int = 0, base_path: str = ".", scale: float = 1.5,
+                     workers: Optional[int] = None, chunk_size: int = 64) -> Dict:
+    """
+    Write `count` sheets under out_dir/DataSets/<set>/, spread evenly over the answer keys of
+    base_path, and copy the answer-key workbooks to out_dir/AnswerKey - so out_dir can be used
+    as a base path of OMRDataHandler. Ground truth goes to out_dir/ground_truth.npz.
+    """
+    keys = OMRDataHandler(base_path).compile_answer_keys()
+    if not keys:
+        raise ValueError(f"No answer keys found under {base_path}")
+
+    answer_key_dir = os.path.join(out_dir, "AnswerKey")
+    os.makedirs(answer_key_dir, exist_ok=True)
+    for set_name in keys:
+        os.makedirs(os.path.join(out_dir, "DataSets", set_name.replace('_', ' ')), exist_ok=True)
+        shutil.copy2(os.path.join(base_path, "AnswerKey", set_name.replace('_', ' ') + ".xlsx"), answer_key_dir)
+
+    chunks = [range(start, min(start + chunk_size, count)) for start in range(0, count, chunk_size)]
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(_write_sheets, [out_dir] * len(chunks), [keys] * len(chunks), chunks,
+                                    [seed] * len(chunks), [scale] * len(chunks)))
+    else:
+        results = [_write_sheets(out_dir, keys, chunk, seed, scale) for chunk in chunks]
+    rows = [row for chunk in results for row in chunk]
+
+    ground_truth = {
+        'paths': np.array([row[1] for row in rows]),
+        'set_names': np.array([row[2] for row in rows]),
+        'answers': np.array([row[3] for row in rows], dtype=np.int8).reshape(len(rows), -1),
+        'partial': np.array([row[4] for row in rows], dtype=bool).reshape(len(rows), -1),
+        'erased': np.array([row[5] for row in rows], dtype=bool).reshape(len(rows), -1),
+        'seed': np.array(seed),
+    }
+    np.savez_compressed(os.path.join(out_dir, GROUND_TRUTH_FILE), **ground_truth)
+    return ground_truth
+
+def load_ground_truth(out_dir: str) -> Dict[str, np.ndarray]:
+    """Marked choice per question (-1 for blank) of every sheet of a generated dataset, by absolute image path"""
+    with np.load(os.path.join(out_dir, GROUND_TRUTH_FILE), allow_pickle=False) as ground_truth:
+        return {os.path.abspath(os.path.join(out_dir, str(path))): answers
+                for path, answers in zip(ground_truth['paths'], ground_truth['answers'])}
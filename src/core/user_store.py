@@ -0,0 +1,113 @@
+"""
+Staff accounts of the web apps in a local SQLite database.
+
+Logins look one user up by primary key instead of parsing a whole users.json, and signups
+are single INSERTs, so concurrent signups from several sessions or server processes cannot
+overwrite each other. An existing users.json is imported once, the first time the database
+is opened next to it; the JSON file is left in place but no longer written.
+"""
+import os
+import hmac
+import json
+import time
+import hashlib
+import sqlite3
+from contextlib import closing
+from typing import Dict, Optional, Tuple
+
+USER_STORE_FILE = "users.sqlite"
+LEGACY_USERS_FILE = "users.json"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    password_hash TEXT NOT NULL,
+    email TEXT,
+    created_at
+);
+CREATE TABLE IF NOT EXISTS migrations (
+    source TEXT PRIMARY KEY,
+    imported INTEGER NOT NULL,
+    migrated_at REAL NOT NULL
+);
+"""
+
+def hash_password(password: str) -> str:
+    """SHA-256 hex digest of a password (the format of the existing accounts)"""
+    return hashlib.sha256(password.encode()).hexdigest()
+
+class UserStore:
+    """Username -> (password hash, email, creation time) table with atomic signups"""
+
+    def __init__(self, db_path: str = USER_STORE_FILE, legacy_json: Optional[str] = LEGACY_USERS_FILE):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db_path = db_path
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+        if legacy_json and os.path.exists(legacy_json):
+            self.import_json(legacy_json)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def import_json(self, json_path: str) -> int:
+        """
+        Import the accounts of a users.json file once; returns how many were added
+        Usernames that already exist keep their stored account.
+        """
+        source = os.path.abspath(json_path)
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute("SELECT 1 FROM migrations WHERE source = ?", (source,)).fetchone():
+                    conn.rollback()
+                    return 0
+                try:
+                    with open(json_path, 'r') as f:
+                        users = json.load(f)
+                except (OSError, json.JSONDecodeError):
+                    users = {}
+                imported = 0
+                for username, user in users.items():
+                    imported += conn.execute("INSERT OR IGNORE INTO users VALUES (?, ?, ?, ?)",
+                                             (username, user["password"], user.get("email"),
+                                              user.get("created_at"))).rowcount
+                conn.execute("INSERT INTO migrations VALUES (?, ?, ?)", (source, imported, time.time()))
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        return imported
+
+    def __len__(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def __contains__(self, username: str) -> bool:
+        return self.get(username) is not None
+
+    def get(self, username: str) -> Optional[Dict]:
+        """{'password', 'email', 'created_at'} of a user (same fields as users.json), None if unknown"""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT password_hash, email, created_at FROM users WHERE username = ?",
+                               (username,)).fetchone()
+        return None if row is None else {"password": row[0], "email": row[1], "created_at": row[2]}
+
+    def create(self, username: str, password: str, email: str, created_at=None) -> Tuple[bool, str]:
+        """Add an account; (False, reason) if the username is taken"""
+        created_at = time.time() if created_at is None else created_at
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute("INSERT INTO users VALUES (?, ?, ?, ?)",
+                             (username, hash_password(password), email, created_at))
+        except sqlite3.IntegrityError:
+            return False, "Username already exists"
+        return True, "User created successfully"
+
+    def authenticate(self, username: str, password: str) -> bool:
+        """Whether the password matches the stored hash of the user"""
+        user = self.get(username)
+        return user is not None and hmac.compare_digest(user["password"], hash_password(password))
@@ -41,11 +41,8 @@ def stackImages(imgArray,scale,lables=[]):
 def reorder(myPoints):
 
     myPoints = myPoints.reshape((4, 2)) # REMOVE EXTRA BRACKET
-    print(myPoints)
-    myPointsNew = np.zeros((4, 1, 2), np.int32) # NEW MATRIX WITH ARRANGED POINTS
+    myPointsNew = np.zeros((4, 1, 2), myPoints.dtype) # NEW MATRIX WITH ARRANGED POINTS
     add = myPoints.sum(1)
-    print(add)
-    print(np.argmax(add))
     myPointsNew[0] = myPoints[np.argmin(add)]  #[0,0]
     myPointsNew[3] =myPoints[np.argmax(add)]   #[w,h]
     diff = np.diff(myPoints, axis=1)
@@ -158,8 +155,26 @@ def drawGrid(img, questions=5, choices=5):
 
     return img
 
-def showAnswers(img, myIndex, grading, ans, questions=5, choices=5):
-    """Show answers on image with dynamic sizing"""
+def drawFilledCircles(img, centers, radius, colors):
+    """Draw many filled circles of the same radius in one vectorized pass"""
+    centers = np.asarray(centers, dtype=np.int32).reshape(-1, 2)
+    if len(centers) == 0:
+        return img
+    colors = np.broadcast_to(np.asarray(colors, dtype=img.dtype).reshape(-1, img.shape[2]),
+                             (len(centers), img.shape[2]))
+    radius = max(1, int(round(radius)))
+    dy, dx = np.mgrid[-radius:radius + 1, -radius:radius + 1]
+    inside = dx * dx + dy * dy <= radius * radius
+    dx, dy = dx[inside], dy[inside]  # OFFSETS OF EVERY PIXEL IN THE DISK
+    xs = centers[:, 0:1] + dx
+    ys = centers[:, 1:2] + dy
+    valid = (xs >= 0) & (xs < img.shape[1]) & (ys >= 0) & (ys < img.shape[0])
+    owner = np.broadcast_to(np.arange(len(centers))[:, None], xs.shape)
+    img[ys[valid], xs[valid]] = colors[owner[valid]]
+    return img
+
+def showAnswers(img, myIndex, grading, ans, questions=5, choices=5, scale=1.0):
+    """Show answers on image with dynamic sizing (scale shrinks markers for thumbnails)"""
     if questions == 100 and choices == 4:
         # For 100 questions in 4 columns of 25 each
         sections = 4  # 4 columns
@@ -168,31 +183,29 @@ def showAnswers(img, myIndex, grading, ans, questions=5, choices=5):
         question_height = img.shape[0] // rows_per_section
         choice_width = section_width // choices
         
-        for q in range(min(questions, len(myIndex), len(grading))):
-            if myIndex[q] >= 0:  # Valid answer selected
-                # Calculate position
-                section = q // rows_per_section
-                row_in_section = q % rows_per_section
-                
-                section_start_x = section * section_width
-                choice_start_x = section_start_x + (myIndex[q] * choice_width)
-                
-                cX = choice_start_x + choice_width // 2
-                cY = (row_in_section * question_height) + question_height // 2
-                
-                # Draw student answer
-                if q < len(grading) and grading[q] == 1:
-                    myColor = (0, 255, 0)  # Green for correct
-                else:
-                    myColor = (0, 0, 255)  # Red for wrong
-                
-                cv2.circle(img, (cX, cY), 15, myColor, cv2.FILLED)
-                
-                # Draw correct answer if student was wrong
-                if q < len(grading) and grading[q] == 0 and q < len(ans):
-                    correct_choice_start_x = section_start_x + (ans[q] * choice_width)
-                    correct_cX = correct_choice_start_x + choice_width // 2
-                    cv2.circle(img, (correct_cX, cY), 10, (0, 255, 0), cv2.FILLED)
+        n = min(questions, len(myIndex), len(grading))
+        if n == 0:
+            return img
+        q = np.arange(n)
+        student = np.asarray(myIndex[:n], dtype=np.int32)
+        graded = np.asarray(grading[:n], dtype=np.int32)
+        correct = np.full(n, -1, dtype=np.int32)
+        correct[:min(n, len(ans))] = np.asarray(ans[:n], dtype=np.int32)
+        
+        # Calculate all positions at once
+        section_start_x = (q // rows_per_section) * section_width
+        cY = (q % rows_per_section) * question_height + question_height // 2
+        cX = section_start_x + student * choice_width + choice_width // 2
+        
+        # Draw student answers: green for correct, red for wrong
+        marked = student >= 0
+        student_colors = np.where((graded == 1)[:, None], [0, 255, 0], [0, 0, 255])
+        drawFilledCircles(img, np.stack([cX, cY], axis=1)[marked], 15 * scale, student_colors[marked])
+        
+        # Draw correct answer where the student was wrong
+        missed = marked & (graded == 0) & (correct >= 0)
+        correct_cX = section_start_x + correct * choice_width + choice_width // 2
+        drawFilledCircles(img, np.stack([correct_cX, cY], axis=1)[missed], 10 * scale, (0, 255, 0))
     else:
         # Original logic for smaller grids
         secW = int(img.shape[1] / questions)
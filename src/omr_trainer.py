@@ -2,13 +2,48 @@ import cv2
 import numpy as np
 import os
 import json
-from typing import Dict, List, Tuple, Optional
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, List, Tuple, Optional
 from sklearn.cluster import KMeans
+from sklearn.linear_model import LogisticRegression
 from sklearn.preprocessing import StandardScaler
 from enhanced_omr import EnhancedOMRProcessor
+from trained_precision_omr import TrainedPrecisionOMRProcessor
 from data_handler import OMRDataHandler
+from image_source import read_image
+from image_loader import PrefetchingImageLoader
+from bubble_features import CELL_FEATURES, grid_cell_map, cell_histograms, extract_cell_features
+from scoring import score_answers
+from bubble_classifier import BubbleClassifier, DEFAULT_CLASSIFIER_FILE
+from feature_store import FeatureStore, FEATURE_STORE_DIR
+from synthetic_sheets import load_ground_truth, GROUND_TRUTH_FILE
 import matplotlib.pyplot as plt
 
+# Version of extract_sheet_features (EnhancedOMRProcessor warp + cell features); bump it when
+# that pipeline changes, so the feature store is rebuilt
+SHEET_FEATURE_VERSION = 1
+
+# Processor of an evaluation worker process, created once per worker
+_worker_processor = None
+
+def _init_evaluation_worker():
+    global _worker_processor
+    _worker_processor = EnhancedOMRProcessor()
+
+def _evaluate_image(set_name: str, img_path: str, img: Optional[np.ndarray] = None,
+                    processor: Optional[EnhancedOMRProcessor] = None) -> Dict:
+    """Process one sheet into an evaluation checkpoint record"""
+    processor = processor or _worker_processor
+    try:
+        results = processor.process_omr_sheet(img_path, set_name, image=img)
+        if results.get("success"):
+            return {'set': set_name, 'path': img_path, 'success': True, 'score': float(results["score"])}
+        error = results.get("error", "Unknown error")
+    except Exception as e:
+        error = str(e)
+    return {'set': set_name, 'path': img_path, 'success': False, 'error': error}
+
 class OMRTrainer:
     """Training module for OMR system optimization"""
     
@@ -17,103 +52,155 @@ class OMRTrainer:
         self.data_handler = OMRDataHandler()
         self.training_stats = {}
         self.optimal_params = {}
+        self.threshold_sweep = None
+        self.trained_processor = None  # created on first use by train_learned_classifier
+        self.feature_stores = {}
         
-    def extract_bubble_features(self, bubble_image: np.ndarray) -> Dict:
-        """Extract features from a bubble image for training"""
-        features = {}
-        
-        # Basic statistics
-        features['mean_intensity'] = np.mean(bubble_image)
-        features['std_intensity'] = np.std(bubble_image)
-        features['total_pixels'] = bubble_image.size
-        features['non_zero_pixels'] = cv2.countNonZero(bubble_image)
-        features['fill_ratio'] = features['non_zero_pixels'] / features['total_pixels']
-        
-        # Shape analysis
-        contours, _ = cv2.findContours(bubble_image, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        if contours:
-            largest_contour = max(contours, key=cv2.contourArea)
-            features['contour_area'] = cv2.contourArea(largest_contour)
-            features['contour_perimeter'] = cv2.arcLength(largest_contour, True)
+    def extract_sheet_features(self, img: np.ndarray, threshold: int = 170) -> Optional[np.ndarray]:
+        """Feature matrix (questions * choices, len(CELL_FEATURES)) of all bubbles of a sheet, None if no sheet is found"""
+        gray = self.warp_sheet_gray(img)
+        if gray is None:
+            return None
+        cells = self.processor.questions * self.processor.choices
+        return extract_cell_features(gray, self.processor_cell_map(gray.shape), cells,
+                                     self.processor.choices, threshold)
+    
+    def sheet_feature_fingerprint(self, threshold: int = 170) -> str:
+        """Version and parameters of extract_sheet_features (for the feature store)"""
+        return f"enhanced-v{SHEET_FEATURE_VERSION}:grid={self.processor.questions}x{self.processor.choices}:threshold={threshold}"
+    
+    def get_feature_store(self, layout: str, questions: int, choices: int, extraction: str) -> FeatureStore:
+        """
+        Persistent feature store of one sheet layout, under DataSets/.omr_features/<layout>
+        extraction fingerprints the feature pipeline; stored sheets of another one are discarded
+        """
+        if layout not in self.feature_stores or self.feature_stores[layout].extraction != extraction:
+            directory = os.path.join(self.data_handler.base_path, "DataSets", FEATURE_STORE_DIR, layout)
+            self.feature_stores[layout] = FeatureStore(directory, questions, choices, CELL_FEATURES, extraction)
+        return self.feature_stores[layout]
+    
+    def collect_sheet_features(self, image_paths: List[str], store: FeatureStore,
+                               extract_features: Callable[[np.ndarray], Optional[np.ndarray]]) -> Tuple[List[str], np.ndarray]:
+        """
+        Feature blocks (sheets, questions, choices, features) of the given images, read from the store
+        Only images that are not in the store yet are decoded; their features are appended.
+        Sheets without a usable answer area are stored as NaN (so they are not decoded again)
+        and left out of the result, like unreadable images. Returns (image paths, features).
+        """
+        hashes = {path: self.data_handler.image_hash(path) for path in image_paths}
+        index = store.index()
+        missing = [path for path in image_paths if hashes[path] not in index]
+        
+        for img_path, img in PrefetchingImageLoader(missing):
+            if img is None:
+                continue
+            try:
+                features = extract_features(img)
+            except Exception as e:
+                print(f"Error extracting features of {img_path}: {e}")
+                features = None
+            if features is None:
+                features = np.full(store.row_shape, np.nan, dtype=np.float32)
+            index[hashes[img_path]] = store.append(hashes[img_path], features, img_path)
+        
+        stored_paths = [path for path in image_paths if hashes[path] in index]
+        rows = np.array([index[hashes[path]] for path in stored_paths], dtype=np.int64)
+        features = store.array()[rows] if len(rows) else np.zeros((0,) + store.row_shape, dtype=np.float32)
+        usable = ~np.isnan(features).any(axis=(1, 2, 3))
+        return [path for path, ok in zip(stored_paths, usable) if ok], features[usable]
+    
+    def warp_sheet_gray(self, img: np.ndarray) -> Optional[np.ndarray]:
+        """Run the processor pipeline up to the warped grayscale sheet (None if no sheet is found)"""
+        img_resized, _, img_canny = self.processor.preprocess_image(img)
+        biggest_points, _ = self.processor.find_omr_contours(img_canny)
+        if biggest_points is None:
+            return None
+        img_warp_colored = self.processor.warp_omr_sheet(img_resized, biggest_points, source_img=img)
+        return cv2.cvtColor(img_warp_colored, cv2.COLOR_BGR2GRAY)
+    
+    def processor_cell_map(self, shape: Tuple[int, int]) -> np.ndarray:
+        """Cell map with the same boxes as EnhancedOMRProcessor.split_boxes_dynamic"""
+        if self.processor.questions == 100 and self.processor.choices == 4:
+            return grid_cell_map(shape, sections=4, rows=25, choices=4)
+        return grid_cell_map(shape, sections=1, rows=self.processor.questions, choices=self.processor.choices)
+    
+    def build_threshold_sweep(self, image_paths: List[str]) -> Dict:
+        """
+        Process every image once, up to the warped gray sheet, and keep the intensity
+        histogram of each answer cell (about 200 KB per sheet); any threshold can then be
+        evaluated from the histograms without touching the images again
+        """
+        cells = self.processor.questions * self.processor.choices
+        histograms, answer_keys, used_paths = [], [], []
+        
+        for img_path, img in PrefetchingImageLoader(image_paths):
+            if img is None:
+                continue
+            correct_answers = self.processor.get_answer_key(self.processor.detect_set_type(img_path))
+            if correct_answers is None:
+                continue
+            try:
+                gray = self.warp_sheet_gray(img)
+            except Exception as e:
+                print(f"Error preparing {img_path} for the threshold sweep: {e}")
+                continue
+            if gray is None:
+                continue
             
-            # Compactness (4π*area/perimeter²)
-            if features['contour_perimeter'] > 0:
-                features['compactness'] = 4 * np.pi * features['contour_area'] / (features['contour_perimeter'] ** 2)
-            else:
-                features['compactness'] = 0
-        else:
-            features['contour_area'] = 0
-            features['contour_perimeter'] = 0
-            features['compactness'] = 0
+            hist = cell_histograms(gray, self.processor_cell_map(gray.shape), cells)
+            histograms.append(hist.astype(np.uint16 if hist.max() <= np.iinfo(np.uint16).max else np.uint32))
+            answer_keys.append(correct_answers)
+            used_paths.append(img_path)
+        
+        return {
+            'histograms': np.stack(histograms) if histograms else np.zeros((0, cells, 256), np.uint16),
+            'answer_keys': answer_keys,
+            'image_paths': used_paths
+        }
+    
+    def sweep_thresholds(self, sweep: Dict, thresholds) -> np.ndarray:
+        """Scores (images x thresholds) of a cached sweep, computed analytically from the histograms"""
+        thresholds = np.clip(np.asarray(list(thresholds), dtype=np.int64), 0, 255)
+        histograms = sweep['histograms']
+        images = len(histograms)
         
-        # Edge density
-        edges = cv2.Canny(bubble_image, 50, 150)
-        features['edge_density'] = cv2.countNonZero(edges) / bubble_image.size
+        # THRESH_BINARY_INV keeps the pixels <= threshold, so a box's non-zero count at threshold t
+        # is its cumulative histogram at t
+        counts = np.cumsum(histograms, axis=2, dtype=np.int32)[:, :, thresholds]
+        counts = counts.reshape(images, self.processor.questions, self.processor.choices, len(thresholds))
         
-        return features
+        # Same rule as the box loop: the darkest box wins (first one on ties), -1 for empty questions
+        answers = np.argmax(counts, axis=2)
+        answers[counts.max(axis=2) == 0] = -1
+        
+        scores = np.zeros((images, len(thresholds)))
+        for i, correct_answers in enumerate(sweep['answer_keys']):
+            scores[i] = score_answers(answers[i].T, correct_answers)['percentage']
+        return scores
     
-    def analyze_threshold_sensitivity(self, image_paths: List[str]) -> Dict:
-        """Analyze optimal thresholding parameters"""
+    def analyze_threshold_sensitivity(self, image_paths: List[str], thresholds=range(120, 220, 10),
+                                      max_images: Optional[int] = None) -> Dict:
+        """
+        Analyze optimal thresholding parameters
+        Each image is processed once (see build_threshold_sweep), so sweeping all 256
+        thresholds costs about the same as sweeping one
+        """
+        sweep = self.build_threshold_sweep(image_paths[:max_images] if max_images else image_paths)
+        self.threshold_sweep = sweep  # kept for further sweeps with other thresholds
+        
         threshold_results = {}
-        thresholds = range(120, 220, 10)
-        
-        for threshold in thresholds:
-            scores = []
-            for img_path in image_paths[:5]:  # Test on subset
-                try:
-                    img = cv2.imread(img_path)
-                    if img is None:
-                        continue
-                        
-                    # Modify processor threshold temporarily
-                    original_process = self.processor.extract_bubble_responses
-                    
-                    def modified_extract(img_warp_colored):
-                        img_warp_gray = cv2.cvtColor(img_warp_colored, cv2.COLOR_BGR2GRAY)
-                        img_thresh = cv2.threshold(img_warp_gray, threshold, 255, cv2.THRESH_BINARY_INV)[1]
-                        
-                        boxes = self.processor.split_boxes_dynamic(img_thresh, self.processor.questions, self.processor.choices)
-                        
-                        my_pixel_val = np.zeros((self.processor.questions, self.processor.choices))
-                        for i, box in enumerate(boxes):
-                            row = i // self.processor.choices
-                            col = i % self.processor.choices
-                            if row < self.processor.questions:
-                                total_pixels = cv2.countNonZero(box)
-                                my_pixel_val[row][col] = total_pixels
-                        
-                        my_index = []
-                        for x in range(self.processor.questions):
-                            arr = my_pixel_val[x]
-                            if np.max(arr) > 0:
-                                my_index_val = np.where(arr == np.amax(arr))
-                                my_index.append(my_index_val[0][0])
-                            else:
-                                my_index.append(-1)
-                        
-                        return my_index, my_pixel_val
-                    
-                    self.processor.extract_bubble_responses = modified_extract
-                    
-                    # Process with modified threshold
-                    results = self.processor.process_omr_sheet(img_path)
-                    if results.get("success"):
-                        scores.append(results["score"])
-                    
-                    # Restore original method
-                    self.processor.extract_bubble_responses = original_process
-                    
-                except Exception as e:
-                    print(f"Error testing threshold {threshold} on {img_path}: {e}")
-                    continue
-            
-            if scores:
-                threshold_results[threshold] = {
-                    'mean_score': np.mean(scores),
-                    'std_score': np.std(scores),
-                    'scores': scores
+        if sweep['answer_keys']:
+            scores = self.sweep_thresholds(sweep, thresholds)
+            for column, threshold in enumerate(thresholds):
+                threshold_results[int(threshold)] = {
+                    'mean_score': np.mean(scores[:, column]),
+                    'std_score': np.std(scores[:, column]),
+                    'scores': scores[:, column].tolist()
                 }
         
+        if not threshold_results:
+            return {'results': {}, 'optimal_threshold': None, 'optimal_score': 0}
+        
         # Find optimal threshold
         best_threshold = max(threshold_results.keys(), 
                            key=lambda t: threshold_results[t]['mean_score'])
@@ -124,61 +211,42 @@ class OMRTrainer:
             'optimal_score': threshold_results[best_threshold]['mean_score']
         }
     
+    def paths_with_answer_key(self, image_paths: List[str]) -> List[str]:
+        """Images whose set has an answer key"""
+        return [path for path in image_paths
+                if self.data_handler.get_answer_key_for_set(self.data_handler.detect_set_from_image(path))]
+    
+    def bubble_labels(self, image_paths: List[str], questions: int, choices: int,
+                      marks: Optional[Dict[str, np.ndarray]] = None) -> np.ndarray:
+        """
+        Label of every bubble (sheet-, question-, choice-major): 1 if it is the chosen choice, 0 otherwise
+        The choice is the marked one from marks ({absolute path: choice per question, -1 for blank},
+        e.g. synthetic_sheets.load_ground_truth) when given, the answer-key choice otherwise
+        """
+        keys = np.full((len(image_paths), questions), -1)
+        for i, img_path in enumerate(image_paths):
+            if marks is not None:
+                answers = marks[os.path.abspath(img_path)]
+            else:
+                answers = self.data_handler.get_answer_key_for_set(self.data_handler.detect_set_from_image(img_path))
+            keys[i, :min(len(answers), questions)] = answers[:questions]
+        return (np.arange(choices)[None, None, :] == keys[:, :, None]).reshape(-1).astype(np.int64)
+    
     def train_bubble_classifier(self, image_paths: List[str]) -> Dict:
         """Train a classifier to distinguish filled vs unfilled bubbles"""
-        features_list = []
-        labels = []
+        questions, choices = self.processor.questions, self.processor.choices
+        store = self.get_feature_store("enhanced", questions, choices, self.sheet_feature_fingerprint())
         
-        for img_path in image_paths[:10]:  # Use subset for training
-            try:
-                set_type = self.data_handler.detect_set_from_image(img_path)
-                correct_answers = self.data_handler.get_answer_key_for_set(set_type)
-                
-                if not correct_answers:
-                    continue
-                
-                # Process image to get bubble boxes
-                img = cv2.imread(img_path)
-                if img is None:
-                    continue
-                
-                img_resized, _, img_canny = self.processor.preprocess_image(img)
-                biggest_points, _ = self.processor.find_omr_contours(img_canny)
-                
-                if biggest_points is None:
-                    continue
-                
-                img_warp_colored = self.processor.warp_omr_sheet(img_resized, biggest_points)
-                img_warp_gray = cv2.cvtColor(img_warp_colored, cv2.COLOR_BGR2GRAY)
-                img_thresh = cv2.threshold(img_warp_gray, 170, 255, cv2.THRESH_BINARY_INV)[1]
-                
-                boxes = self.processor.split_boxes_dynamic(img_thresh, 
-                                                         self.processor.questions, 
-                                                         self.processor.choices)
-                
-                # Extract features for each bubble
-                for i, box in enumerate(boxes):
-                    row = i // self.processor.choices
-                    col = i % self.processor.choices
-                    
-                    if row < len(correct_answers):
-                        features = self.extract_bubble_features(box)
-                        features_list.append(list(features.values()))
-                        
-                        # Label: 1 if this is the correct answer, 0 otherwise
-                        is_correct_answer = (col == correct_answers[row])
-                        labels.append(1 if is_correct_answer else 0)
-                
-            except Exception as e:
-                print(f"Error processing {img_path} for training: {e}")
-                continue
+        # One feature block per sheet, decoded only the first time a sheet is seen
+        sheet_paths, sheet_features = self.collect_sheet_features(
+            self.paths_with_answer_key(image_paths), store, self.extract_sheet_features)
         
-        if not features_list:
+        if not sheet_paths:
             return {"error": "No training data extracted"}
         
         # Train classifier
-        X = np.array(features_list)
-        y = np.array(labels)
+        X = sheet_features.reshape(-1, store.row_shape[-1])
+        y = self.bubble_labels(sheet_paths, questions, choices)
         
         # Normalize features
         scaler = StandardScaler()
@@ -195,49 +263,172 @@ class OMRTrainer:
             'scaler': scaler,
             'kmeans': kmeans,
             'filled_cluster': filled_cluster,
-            'feature_names': list(self.extract_bubble_features(np.zeros((10, 10), dtype=np.uint8)).keys()),
+            'feature_names': list(CELL_FEATURES),
             'training_accuracy': np.mean((clusters == filled_cluster) == y),
             'n_samples': len(X)
         }
     
-    def evaluate_system_performance(self) -> Dict:
-        """Evaluate system performance on all available data"""
+    def train_learned_classifier(self, ground_truth_dir: str, output_path: Optional[str] = None,
+                                 image_paths: Optional[List[str]] = None) -> Dict:
+        """
+        Train the linear bubble classifier used by TrainedPrecisionOMRProcessor and save it as .npz
+        Training sheets are those of a generated dataset (see generate_synthetic_sheets.py), or the
+        image_paths subset of them (e.g. to hold some out); the label of a bubble is whether it
+        was marked, from the dataset's ground_truth.npz. Features come from the processor's own
+        preprocessing and grid. The processor only uses the model once
+        training_params['bubble_classifier'] points to it.
+        """
+        if not os.path.exists(os.path.join(ground_truth_dir, GROUND_TRUTH_FILE)):
+            return {"error": f"No {GROUND_TRUTH_FILE} in {ground_truth_dir}"}
+        marks = load_ground_truth(ground_truth_dir)
+        if image_paths is not None:
+            marks = {path: marks[path] for path in map(os.path.abspath, image_paths)}
+        
+        if self.trained_processor is None:
+            self.trained_processor = TrainedPrecisionOMRProcessor()
+        processor = self.trained_processor
+        store = self.get_feature_store("trained", processor.questions, processor.choices,
+                                       processor.cell_feature_fingerprint())
+        
+        sheet_paths, sheet_features = self.collect_sheet_features(
+            sorted(marks), store, lambda img: processor.extract_cell_features(processor.preprocess_sheet(img)[1]))
+        
+        if not sheet_paths:
+            return {"error": "No training data extracted"}
+        
+        X = sheet_features.reshape(-1, store.row_shape[-1])
+        y = self.bubble_labels(sheet_paths, processor.questions, processor.choices, marks)
+        
+        scaler = StandardScaler()
+        model = LogisticRegression(max_iter=1000)
+        model.fit(scaler.fit_transform(X), y)
+        
+        classifier = BubbleClassifier(scaler.mean_, scaler.scale_, model.coef_[0], model.intercept_[0], CELL_FEATURES)
+        output_path = output_path or os.path.join(processor.data_handler.base_path, DEFAULT_CLASSIFIER_FILE)
+        classifier.save(output_path)
+        processor.bubble_classifier = classifier
+        
+        # Agreement of the per-question answers with the labels
+        answers = classifier.predict_answers(X, processor.choices)
+        expected = np.argmax(y.reshape(-1, processor.choices), axis=1)
+        expected[y.reshape(-1, processor.choices).max(axis=1) == 0] = -1
+        
+        return {
+            'model_path': output_path,
+            'feature_names': list(CELL_FEATURES),
+            'weights': classifier.weights,
+            'bias': float(classifier.bias),
+            'training_accuracy': np.mean(answers == expected),
+            'n_samples': len(X)
+        }
+    
+    def evaluate_system_performance(self, shard: int = 0, num_shards: int = 1, workers: Optional[int] = None,
+                                    checkpoint_path: Optional[str] = None) -> Dict:
+        """
+        Evaluate system performance on all available data
+        With num_shards > 1 only one deterministic slice of every set is evaluated (see OMRDataHandler.shard_of)
+        Images are processed by `workers` processes (default: one per CPU; 1 processes in this
+        process). With checkpoint_path every result is appended to that JSON-lines file as soon
+        as it is known, and images already evaluated successfully there are not processed again,
+        so an interrupted run resumes where it stopped; failed images are retried
+        """
+        if not 0 <= shard < num_shards:
+            raise ValueError(f"Invalid shard {shard} of {num_shards}")
         self.data_handler.load_answer_keys()
         self.data_handler.load_datasets()
+        if num_shards > 1:
+            for set_name, image_paths in self.data_handler.datasets.items():
+                self.data_handler.datasets[set_name] = [
+                    path for path in image_paths if self.data_handler.shard_of(path, num_shards) == shard]
+        
+        records = self.load_evaluation_checkpoint(checkpoint_path)
+        if records:
+            failed = sum(not record.get('success') for record in records.values())
+            print(f"Resuming from {checkpoint_path}: {len(records) - failed} images already evaluated, "
+                  f"{failed} failed ones retried")
+        workers = workers or os.cpu_count() or 1
+        
+        checkpoint = self._open_evaluation_checkpoint(checkpoint_path)
+        try:
+            def record(result: Dict):
+                records[result['path']] = result
+                if checkpoint:
+                    checkpoint.write(json.dumps(result) + "\n")
+                    checkpoint.flush()
+            
+            pending_by_set = {
+                set_name: [path for path in image_paths if not records.get(path, {}).get('success')]
+                for set_name, image_paths in self.data_handler.datasets.items()
+            }
+            
+            if workers > 1:
+                # Spawned, not forked: this process already runs the answer key registry's watcher thread
+                with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'),
+                                         initializer=_init_evaluation_worker) as pool:
+                    in_flight = set()
+                    for set_name, image_paths in pending_by_set.items():
+                        print(f"Evaluating {set_name} ({len(image_paths)} images)...")
+                        for img_path in image_paths:
+                            # Bounded number of queued sheets, however large the corpus
+                            if len(in_flight) >= workers * 4:
+                                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                                for future in done:
+                                    record(future.result())
+                            in_flight.add(pool.submit(_evaluate_image, set_name, img_path))
+                    for future in wait(in_flight).done:
+                        record(future.result())
+            else:
+                for set_name, image_paths in pending_by_set.items():
+                    print(f"Evaluating {set_name} ({len(image_paths)} images)...")
+                    for img_path, img in PrefetchingImageLoader(image_paths):
+                        record(_evaluate_image(set_name, img_path, img, self.processor))
+        finally:
+            if checkpoint:
+                checkpoint.close()
         
+        return self.summarize_evaluation(self.data_handler.datasets, records)
+    
+    @staticmethod
+    def load_evaluation_checkpoint(checkpoint_path: Optional[str]) -> Dict[str, Dict]:
+        """Records of an evaluation checkpoint by image path (empty if there is none)"""
+        records = {}
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            with open(checkpoint_path, 'r') as f:
+                for line in f:
+                    try:
+                        result = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # line cut short by an interrupted run
+                    records[result['path']] = result
+        return records
+    
+    @staticmethod
+    def _open_evaluation_checkpoint(checkpoint_path: Optional[str]):
+        if not checkpoint_path:
+            return None
+        os.makedirs(os.path.dirname(os.path.abspath(checkpoint_path)), exist_ok=True)
+        checkpoint = open(checkpoint_path, 'a+')
+        # Terminate a line cut short by an interrupted run before appending
+        if checkpoint.tell() > 0:
+            checkpoint.seek(checkpoint.tell() - 1)
+            if checkpoint.read(1) != "\n":
+                checkpoint.write("\n")
+        return checkpoint
+    
+    @staticmethod
+    def summarize_evaluation(datasets: Dict[str, List[str]], records: Dict[str, Dict]) -> Dict:
+        """Performance report of the evaluated images of every set"""
         performance_stats = {
             'set_performance': {},
-            'overall_performance': {
-                'total_images': 0,
-                'successful_processing': 0,
-                'average_score': 0,
-                'score_distribution': []
-            }
+            'overall_performance': {}
         }
         
         all_scores = []
-        total_processed = 0
-        
-        for set_name, image_paths in self.data_handler.datasets.items():
-            set_scores = []
-            set_errors = []
-            
-            print(f"Evaluating {set_name} ({len(image_paths)} images)...")
-            
-            for img_path in image_paths:
-                try:
-                    results = self.processor.process_omr_sheet(img_path, set_name)
-                    
-                    if results.get("success"):
-                        score = results["score"]
-                        set_scores.append(score)
-                        all_scores.append(score)
-                        total_processed += 1
-                    else:
-                        set_errors.append(results.get("error", "Unknown error"))
-                        
-                except Exception as e:
-                    set_errors.append(str(e))
+        for set_name, image_paths in datasets.items():
+            set_records = [records[path] for path in image_paths if path in records]
+            set_scores = [result['score'] for result in set_records if result['success']]
+            set_errors = [result['error'] for result in set_records if not result['success']]
+            all_scores.extend(set_scores)
             
             performance_stats['set_performance'][set_name] = {
                 'images_count': len(image_paths),
@@ -250,10 +441,11 @@ class OMRTrainer:
                 'errors': set_errors[:5]  # Keep first 5 errors
             }
         
+        total_images = sum(len(paths) for paths in datasets.values())
         performance_stats['overall_performance'] = {
-            'total_images': sum(len(paths) for paths in self.data_handler.datasets.values()),
-            'successful_processing': total_processed,
-            'success_rate': total_processed / sum(len(paths) for paths in self.data_handler.datasets.values()) * 100,
+            'total_images': total_images,
+            'successful_processing': len(all_scores),
+            'success_rate': len(all_scores) / max(total_images, 1) * 100,
             'average_score': np.mean(all_scores) if all_scores else 0,
             'score_std': np.std(all_scores) if all_scores else 0,
             'score_distribution': {
@@ -323,8 +515,19 @@ if __name__ == "__main__":
     else:
         print(f"Classifier training failed: {classifier_results['error']}")
     
-    # 3. Evaluate system performance
-    print("\n3. Evaluating system performance...")
+    # 3. Train the learned classifier used by TrainedPrecisionOMRProcessor on marked synthetic sheets
+    print("\n3. Training learned bubble classifier...")
+    learned_results = trainer.train_learned_classifier(os.path.join(trainer.data_handler.base_path, "synthetic"))
+    if 'error' not in learned_results:
+        print(f"Question-level training accuracy: {learned_results['training_accuracy']:.3f}")
+        print(f"Classifier saved to {learned_results['model_path']} "
+              f"(set \"bubble_classifier\" in trained_params.json to use it)")
+    else:
+        print(f"Learned classifier training skipped: {learned_results['error']} "
+              f"(run generate_synthetic_sheets.py first)")
+    
+    # 4. Evaluate system performance
+    print("\n4. Evaluating system performance...")
     performance = trainer.evaluate_system_performance()
     
     print(f"Overall success rate: {performance['overall_performance']['success_rate']:.1f}%")
@@ -338,6 +541,7 @@ if __name__ == "__main__":
     training_results = {
         'threshold_analysis': threshold_analysis,
         'classifier_results': classifier_results,
+        'learned_classifier_results': learned_results,
         'performance_evaluation': performance,
         'training_timestamp': __import__('datetime').datetime.now().isoformat()
     }
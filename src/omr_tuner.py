@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Budgeted tuner for TrainedPrecisionOMRProcessor.training_params
+
+Instead of tuning one parameter at a time on a single image (train_on_sample), random
+configurations are compared on a shuffled sample of a synthetic dataset with known marks
+(generate_synthetic_sheets.py) with successive halving: every configuration is tried on a few
+sheets, the best 1/eta of them go on to eta times as many sheets, and so on until one is left.
+Results of earlier rungs are reused, trials run in parallel worker processes, and the total
+number of processed sheets never exceeds the budget.
+
+The objective is detection accuracy minus time: the percentage of questions read exactly as
+marked in the ground truth (blanks included), averaged over the sheets, minus time_weight
+points per second of processing per sheet, so cheaper settings (e.g. fewer detection
+methods) win when they are about as accurate. The answer key plays no part in it. Generated
+sheets are drawn on the mark detection grid, so the default parameters read them almost
+exactly and accuracy differences between configurations are real, not noise.
+
+Usage:
+    python generate_synthetic_sheets.py --count 500 --output synthetic
+    python src/omr_tuner.py --ground-truth synthetic --budget 600 --workers 4 --time-weight 10 --save
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import random
+import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(current_dir, 'core'))
+sys.path.append(os.path.join(current_dir, 'processors'))
+
+from synthetic_sheets import load_ground_truth
+from trained_precision_omr import TrainedPrecisionOMRProcessor, DETECTION_METHODS
+
+# Values tried for each parameter that process_omr_sheet reads: the contour_based threshold
+# (train_on_sample ranges) and cheaper sets of detection methods
+SEARCH_SPACE = {
+    'adaptive_block_size': [15, 21, 27],
+    'adaptive_c': [3, 5, 7],
+    'detection_methods': [
+        list(DETECTION_METHODS),
+        ['mark_detection_normalized'],
+        ['mark_detection', 'mark_detection_normalized'],
+        ['mark_detection_improved', 'mark_detection_normalized'],
+        ['grid_based', 'adaptive_threshold', 'mark_detection'],
+    ]
+}
+
+# Processor of a trial worker process, created once per worker
+_worker_processor = None
+
+def _init_worker():
+    global _worker_processor
+    _worker_processor = TrainedPrecisionOMRProcessor()
+    _worker_processor.bubble_classifier = None  # the heuristic methods are what is being tuned
+
+def _run_trial(params: Dict, image_path: str, set_name: str, marks: np.ndarray) -> Tuple[float, float]:
+    """(accuracy points, seconds) of one configuration on one sheet with known marks (-1 for blank)"""
+    processor = _worker_processor
+    processor.training_params = dict(params)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = processor.process_omr_sheet(image_path, set_name)
+    elapsed = time.perf_counter() - start
+    if not result.get("success"):
+        return 0.0, elapsed
+    # Percentage of questions read as marked; blanks must be read as blank
+    detected = np.full(len(marks), -1)
+    answers = np.asarray(result["student_answers"][:len(marks)])
+    detected[:len(answers)] = answers
+    return float(np.mean(detected == marks) * 100), elapsed
+
+def halving_schedule(configurations: int, min_sheets: int, eta: int, total_sheets: int) -> List[Tuple[int, int]]:
+    """(configurations, sheets per configuration) of every rung"""
+    rungs = []
+    sheets = min_sheets
+    while True:
+        sheets = min(sheets, total_sheets)
+        rungs.append((configurations, sheets))
+        if configurations <= 1 or sheets >= total_sheets:
+            return rungs
+        configurations = max(1, configurations // eta)
+        sheets *= eta
+
+def schedule_cost(rungs: List[Tuple[int, int]]) -> int:
+    """Sheets processed by a schedule (sheets seen in earlier rungs are not processed again)"""
+    cost, previous_sheets = 0, 0
+    for configurations, sheets in rungs:
+        cost += configurations * (sheets - previous_sheets)
+        previous_sheets = sheets
+    return cost
+
+class SuccessiveHalvingTuner:
+    """Successive-halving search over SEARCH_SPACE with a fixed budget of processed sheets"""
+
+    def __init__(self, samples: Sequence[Tuple[str, str, np.ndarray]], budget: int = 300, min_sheets: int = 2, eta: int = 3,
+                 time_weight: float = 10.0, workers: Optional[int] = None, seed: int = 0,
+                 base_params: Optional[Dict] = None, search_space: Optional[Dict] = None):
+        """
+        samples: (image path, set name, marked choice per question) triples, tried in this order
+        budget: total number of sheets processed over all trials
+        time_weight: objective points lost per second of processing per sheet
+        base_params: starting parameters, always the first configuration (default: the processor's)
+        """
+        self.samples = list(samples)
+        self.budget = budget
+        self.min_sheets = min_sheets
+        self.eta = eta
+        self.time_weight = time_weight
+        self.workers = workers or os.cpu_count() or 1
+        self.rng = random.Random(seed)
+        self.base_params = dict(base_params if base_params is not None else TrainedPrecisionOMRProcessor().training_params)
+        self.search_space = search_space or SEARCH_SPACE
+
+    def plan(self) -> List[Tuple[int, int]]:
+        """Schedule with the most configurations that fits the budget"""
+        best = halving_schedule(1, self.min_sheets, self.eta, len(self.samples))
+        configurations = 2
+        while configurations <= 10000:
+            rungs = halving_schedule(configurations, self.min_sheets, self.eta, len(self.samples))
+            if schedule_cost(rungs) > self.budget:
+                break
+            best = rungs
+            configurations += 1
+        return best
+
+    def sample_configurations(self, count: int) -> List[Dict]:
+        """The base parameters followed by distinct random configurations"""
+        configurations = [self.base_params]
+        seen = {json.dumps(self.base_params, sort_keys=True)}
+        attempts = 0
+        while len(configurations) < count and attempts < count * 100:
+            attempts += 1
+            params = dict(self.base_params)
+            for name, values in self.search_space.items():
+                params[name] = self.rng.choice(values)
+            signature = json.dumps(params, sort_keys=True)
+            if signature not in seen:
+                seen.add(signature)
+                configurations.append(params)
+        return configurations
+
+    def objective(self, trials: List[Tuple[float, float]]) -> float:
+        points, seconds = np.mean(trials, axis=0)
+        return float(points - self.time_weight * seconds)
+
+    def run(self) -> Dict:
+        """Run the search; returns the best parameters, its objective and the per-rung history"""
+        if not self.samples:
+            return {"error": "No sheets to tune on"}
+        rungs = self.plan()
+        configurations = self.sample_configurations(rungs[0][0])
+        trials = {index: [] for index in range(len(configurations))}
+        alive = list(range(len(configurations)))
+        history = []
+        evaluations = 0
+
+        if self.workers > 1:
+            pool = ProcessPoolExecutor(self.workers, initializer=_init_worker)
+            map_trials = lambda *args: pool.map(_run_trial, *args, chunksize=2)
+        else:
+            pool = None
+            _init_worker()
+            map_trials = lambda *args: map(_run_trial, *args)
+
+        try:
+            for rung, (_, sheets) in enumerate(rungs):
+                # Only the sheets a configuration has not been tried on yet
+                tasks = [(index, sample) for index in alive for sample in range(len(trials[index]), sheets)]
+                started = time.time()
+                results = map_trials([configurations[index] for index, _ in tasks],
+                                     [self.samples[sample][0] for _, sample in tasks],
+                                     [self.samples[sample][1] for _, sample in tasks],
+                                     [self.samples[sample][2] for _, sample in tasks])
+                for (index, _), result in zip(tasks, results):
+                    trials[index].append(result)
+                evaluations += len(tasks)
+
+                ranking = sorted(alive, key=lambda index: self.objective(trials[index]), reverse=True)
+                history.append({
+                    'rung': rung,
+                    'sheets': sheets,
+                    'configurations': len(alive),
+                    'seconds': time.time() - started,
+                    'best_objective': self.objective(trials[ranking[0]]),
+                    'objectives': [self.objective(trials[index]) for index in ranking]
+                })
+                print(f"Rung {rung}: {len(alive)} configurations x {sheets} sheets, "
+                      f"best objective {history[-1]['best_objective']:.2f}")
+                alive = ranking[:max(1, len(alive) // self.eta)]
+        finally:
+            if pool:
+                pool.shutdown()
+
+        best = alive[0]
+        points, seconds = np.mean(trials[best], axis=0)
+        return {
+            'best_params': configurations[best],
+            'best_objective': self.objective(trials[best]),
+            'best_accuracy_points': float(points),
+            'best_seconds_per_sheet': float(seconds),
+            'base_objective': self.objective(trials[0]),
+            'evaluations': evaluations,
+            'history': history
+        }
+
+def ground_truth_sample(ground_truth_dir: str, size: Optional[int] = None,
+                        seed: int = 0) -> List[Tuple[str, str, np.ndarray]]:
+    """Shuffled (image path, set name, marks) triples of a generated dataset (see generate_synthetic_sheets.py)"""
+    # Sheets are written to DataSets/<set folder>/, named like the data handler names sets
+    samples = [(path, os.path.basename(os.path.dirname(path)).replace(' ', '_'), marks)
+               for path, marks in sorted(load_ground_truth(ground_truth_dir).items())]
+    random.Random(seed).shuffle(samples)
+    return samples[:size] if size else samples
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune training_params over the dataset with successive halving")
+    parser.add_argument('--ground-truth', default="synthetic",
+                        help="Generated dataset with ground_truth.npz (see generate_synthetic_sheets.py)")
+    parser.add_argument('--budget', type=int, default=300, help="Total sheets processed over all trials")
+    parser.add_argument('--min-sheets', type=int, default=2, help="Sheets per configuration in the first rung")
+    parser.add_argument('--eta', type=int, default=3, help="Keep the best 1/eta configurations per rung")
+    parser.add_argument('--time-weight', type=float, default=10.0,
+                        help="Objective points lost per second of processing per sheet")
+    parser.add_argument('--sample-size', type=int, default=None, help="Sheets of the corpus to sample (default: all)")
+    parser.add_argument('--workers', type=int, default=None, help="Parallel trial processes (default: one per CPU)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', action='store_true', help="Write the best parameters to trained_params.json")
+    parser.add_argument('--output', default="tuning_results.json", help="Where to write the tuning report")
+    args = parser.parse_args()
+
+    samples = ground_truth_sample(args.ground_truth, size=args.sample_size, seed=args.seed)
+    tuner = SuccessiveHalvingTuner(samples, args.budget, args.min_sheets, args.eta, args.time_weight,
+                                   args.workers, args.seed)
+    results = tuner.run()
+    if 'error' in results:
+        print(results['error'])
+        return
+
+    print(f"Best objective {results['best_objective']:.2f} (starting parameters: {results['base_objective']:.2f}), "
+          f"{results['best_seconds_per_sheet'] * 1000:.0f} ms per sheet, {results['evaluations']} sheets processed")
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    if args.save:
+        processor = TrainedPrecisionOMRProcessor()
+        processor.training_params = results['best_params']
+        processor.save_training_params()
+
+if __name__ == "__main__":
+    main()
@@ -4,21 +4,24 @@ import os
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'core'))
 from data_handler import OMRDataHandler
+from image_source import read_image
+from answer_key_registry import get_answer_key_registry
+from scoring import score_answers
 
 class CorrectedOMRProcessor:
     """OMR processor specifically designed to fix bubble-to-answer mapping issues"""
     
     def __init__(self):
         self.data_handler = OMRDataHandler()
-        self.data_handler.load_answer_keys()
+        self.answer_keys = get_answer_key_registry(self.data_handler.base_path)
         self.questions = 100
         self.choices = 4
         
-    def process_omr_sheet(self, image_path, set_type=None):
-        """Process OMR sheet with corrected mapping logic"""
+    def process_omr_sheet(self, image_path, set_type=None, answer_key=None):
+        """Process OMR sheet with corrected mapping logic (answer_key overrides the shared keys for this call)"""
         try:
             # Read and prepare image
-            img = cv2.imread(image_path)
+            img = read_image(image_path)
             if img is None:
                 return {"success": False, "error": "Could not read image"}
             
@@ -53,14 +56,19 @@ class CorrectedOMRProcessor:
             student_answers = self.extract_answers_systematic_grid(thresh, img.shape)
             
             # Determine set type and calculate results
-            if set_type and set_type != "Custom":
-                # Use provided set type
-                final_set_type = set_type
+            if answer_key is not None:
+                final_set_type = set_type or "Custom"
+                correct_answers = [int(a) for a in answer_key]
             else:
-                # Auto-detect set type
-                final_set_type = self.determine_set_type(student_answers)
-            
-            correct_answers = self.data_handler.answer_keys.get(final_set_type, [])
+                answer_keys = self.answer_keys.snapshot.keys
+                if set_type and set_type != "Custom":
+                    # Use provided set type
+                    final_set_type = set_type
+                else:
+                    # Auto-detect set type
+                    final_set_type = self.determine_set_type(student_answers, answer_keys)
+                
+                correct_answers = answer_keys[final_set_type].tolist() if final_set_type in answer_keys else []
             score, correct_count = self.calculate_score(student_answers, correct_answers)
             
             # Save comprehensive debug output
@@ -242,10 +250,12 @@ class CorrectedOMRProcessor:
         
         return ("Block-based", answers)
     
-    def determine_set_type(self, student_answers):
+    def determine_set_type(self, student_answers, answer_keys=None):
         """Determine set type"""
+        if answer_keys is None:
+            answer_keys = self.answer_keys.snapshot.keys
         scores = {}
-        for set_name, correct_answers in self.data_handler.answer_keys.items():
+        for set_name, correct_answers in answer_keys.items():
             score, _ = self.calculate_score(student_answers, correct_answers)
             scores[set_name] = score
         
@@ -253,15 +263,11 @@ class CorrectedOMRProcessor:
     
     def calculate_score(self, student_answers, correct_answers):
         """Calculate score"""
-        if not correct_answers:
+        if correct_answers is None or len(correct_answers) == 0:
             return 0.0, 0
         
-        correct_count = sum(1 for s, c in zip(student_answers, correct_answers) 
-                          if s == c and s >= 0)
-        total = len(correct_answers)
-        score = (correct_count / total) * 100 if total > 0 else 0
-        
-        return score, correct_count
+        scored = score_answers(student_answers, correct_answers)
+        return float(scored["percentage"]), int(scored["correct_count"])
     
     def save_debug_analysis(self, original_img, thresh_img, student_answers, correct_answers):
         """Save debug analysis to understand mapping"""
@@ -6,6 +6,9 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'core'))
 import utlis
 from typing import List, Tuple, Optional, Dict
 from data_handler import OMRDataHandler
+from image_source import read_image
+from answer_key_registry import get_answer_key_registry
+from scoring import score_answers
 
 class EnhancedOMRProcessor:
     """Enhanced OMR processing system with dynamic configuration"""
@@ -17,8 +20,8 @@ class EnhancedOMRProcessor:
         self.choices = choices
         self.data_handler = OMRDataHandler()
         
-        # Load answer keys
-        self.answer_keys = self.data_handler.load_answer_keys()
+        # Shared, read-only answer keys (hot-reloaded when the workbooks change)
+        self.answer_keys = get_answer_key_registry(self.data_handler.base_path)
         
     def detect_set_type(self, image_path: str) -> str:
         """Detect set type from image path or content"""
@@ -26,10 +29,11 @@ class EnhancedOMRProcessor:
     
     def get_answer_key(self, set_type: str) -> Optional[List[int]]:
         """Get answer key for specific set type"""
-        return self.data_handler.get_answer_key_for_set(set_type)
+        answers = self.answer_keys.get(set_type)
+        return None if answers is None else answers.tolist()
     
     def preprocess_image(self, img: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
-        """Preprocess image for OMR detection"""
+        """Preprocess image for OMR detection (corner detection runs on this downscaled copy)"""
         img = cv2.resize(img, (self.width_img, self.height_img))
         img_gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
         img_blur = cv2.GaussianBlur(img_gray, (7, 7), 1)
@@ -51,10 +55,21 @@ class EnhancedOMRProcessor:
         else:
             return None, None
     
-    def warp_omr_sheet(self, img: np.ndarray, biggest_points: np.ndarray) -> np.ndarray:
-        """Apply perspective transform to get warped OMR sheet"""
+    def warp_omr_sheet(self, img: np.ndarray, biggest_points: np.ndarray,
+                       source_img: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Apply perspective transform to get warped OMR sheet.
+        Corners are detected on `img`; when the original-resolution `source_img` is given,
+        the detection scale is folded into the homography so the sheet is resampled once
+        straight from the original pixels.
+        """
         biggest_points = utlis.reorder(biggest_points)
-        pts1 = np.float32(biggest_points)
+        pts1 = np.float32(biggest_points).reshape(4, 2)
+        if source_img is not None:
+            scale_x = source_img.shape[1] / img.shape[1]
+            scale_y = source_img.shape[0] / img.shape[0]
+            pts1 = pts1 * np.float32([scale_x, scale_y])
+            img = source_img
         pts2 = np.float32([[0, 0], [self.width_img, 0], [0, self.height_img], [self.width_img, self.height_img]])
         matrix = cv2.getPerspectiveTransform(pts1, pts2)
         img_warp_colored = cv2.warpPerspective(img, matrix, (self.width_img, self.height_img))
@@ -206,31 +221,30 @@ class EnhancedOMRProcessor:
     
     def calculate_score(self, student_answers: List[int], correct_answers: List[int]) -> Tuple[float, List[int]]:
         """Calculate score and generate grading list"""
-        grading = []
-        for i in range(len(correct_answers)):
-            if i < len(student_answers) and student_answers[i] == correct_answers[i]:
-                grading.append(1)
-            else:
-                grading.append(0)
-        
-        score = (sum(grading) / len(correct_answers)) * 100
-        return score, grading
+        scored = score_answers(student_answers, correct_answers)
+        return float(scored["percentage"]), scored["correct"].astype(int).tolist()
     
-    def process_omr_sheet(self, image_path: str, set_type: Optional[str] = None) -> Dict:
+    def process_omr_sheet(self, image_path: str, set_type: Optional[str] = None,
+                          answer_key: Optional[List[int]] = None, image: Optional[np.ndarray] = None) -> Dict:
         """
         Process a complete OMR sheet and return results
+        answer_key overrides the shared answer keys for this call only (e.g. a custom key)
+        image is the already decoded sheet (e.g. from a prefetching loader); read from image_path otherwise
         """
         # Load image
-        img = cv2.imread(image_path)
+        img = image if image is not None else read_image(image_path)
         if img is None:
             return {"error": "Could not load image"}
         
         # Auto-detect set type if not provided
         if set_type is None:
-            set_type = self.detect_set_type(image_path)
+            set_type = "Custom" if answer_key is not None else self.detect_set_type(image_path)
         
         # Get answer key
-        correct_answers = self.get_answer_key(set_type)
+        if answer_key is not None:
+            correct_answers = [int(a) for a in answer_key]
+        else:
+            correct_answers = self.get_answer_key(set_type)
         if correct_answers is None:
             return {"error": f"No answer key found for set type: {set_type}"}
         
@@ -244,8 +258,8 @@ class EnhancedOMRProcessor:
             if biggest_points is None:
                 return {"error": "Could not detect OMR sheet contours"}
             
-            # Warp OMR sheet
-            img_warp_colored = self.warp_omr_sheet(img_resized, biggest_points)
+            # Warp OMR sheet straight from the original image (single resampling pass)
+            img_warp_colored = self.warp_omr_sheet(img_resized, biggest_points, source_img=img)
             
             # Extract responses
             student_answers, pixel_values = self.extract_bubble_responses(img_warp_colored)
@@ -273,24 +287,41 @@ class EnhancedOMRProcessor:
         except Exception as e:
             return {"error": f"Processing failed: {str(e)}", "success": False}
     
-    def visualize_results(self, results: Dict, save_path: Optional[str] = None) -> np.ndarray:
-        """Create visualization of OMR processing results"""
+    def visualize_results(self, results: Dict, save_path: Optional[str] = None,
+                          width: Optional[int] = None) -> np.ndarray:
+        """
+        Create visualization of OMR processing results.
+        Rendering is done on demand at the requested display width (full size when None)
+        and cached on the results dict, so repeated views of the same sheet are free.
+        """
         if not results.get("success", False):
             return None
         
-        img = results["processed_image"].copy()
-        student_answers = results["student_answers"]
-        grading = results["grading"]
-        correct_answers = results["correct_answers"]
-        
-        # Use modified utlis functions for visualization
-        utlis.showAnswers(img, student_answers, grading, correct_answers, self.questions, self.choices)
-        utlis.drawGrid(img, self.questions, self.choices)
-        
-        # Add score text
-        score_text = f"Score: {results['score']:.1f}% ({results['correct_count']}/{results['total_questions']})"
-        cv2.putText(img, score_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-        cv2.putText(img, f"Set: {results['set_type']}", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 0), 2)
+        cache = results.setdefault("_visualizations", {})
+        img = cache.get(width)
+        if img is None:
+            img = results["processed_image"]
+            scale = 1.0
+            if width is not None and width != img.shape[1]:
+                scale = width / img.shape[1]
+                img = cv2.resize(img, (width, max(1, int(round(img.shape[0] * scale)))),
+                                 interpolation=cv2.INTER_AREA)
+            else:
+                img = img.copy()
+            
+            student_answers = results["student_answers"]
+            grading = results["grading"]
+            correct_answers = results["correct_answers"]
+            
+            # Use modified utlis functions for visualization
+            utlis.showAnswers(img, student_answers, grading, correct_answers, self.questions, self.choices, scale)
+            utlis.drawGrid(img, self.questions, self.choices)
+            
+            # Add score text
+            score_text = f"Score: {results['score']:.1f}% ({results['correct_count']}/{results['total_questions']})"
+            cv2.putText(img, score_text, (10, int(30 * scale)), cv2.FONT_HERSHEY_SIMPLEX, scale, (0, 255, 0), max(1, int(2 * scale)))
+            cv2.putText(img, f"Set: {results['set_type']}", (10, int(60 * scale)), cv2.FONT_HERSHEY_SIMPLEX, 0.7 * scale, (255, 0, 0), max(1, int(2 * scale)))
+            cache[width] = img
         
         if save_path:
             cv2.imwrite(save_path, img)
@@ -12,6 +12,30 @@ sys.path.append(core_dir)
 sys.path.append(main_dir)
 
 from data_handler import OMRDataHandler
+from image_source import read_image
+from answer_key_registry import get_answer_key_registry
+from scoring import score_answers
+from bubble_features import CELL_FEATURES, grid_cell_map, extract_cell_features
+from bubble_classifier import BubbleClassifier, DEFAULT_CLASSIFIER_FILE
+from utlis import drawFilledCircles
+
+# Detection methods of process_omr_sheet, by the suffix of their method_* name
+DETECTION_METHODS = ('contour_based', 'grid_based', 'adaptive_threshold', 'mark_detection',
+                     'mark_detection_improved', 'mark_detection_normalized')
+
+# Cell features of the learned classifier (preprocess_sheet + extract_cell_features); bump the
+# version whenever that pipeline changes, so stored features of the old one are not reused
+CELL_FEATURE_VERSION = 2
+CELL_HEADER_SKIP = 0.15  # same header skip as the mark detection methods
+CELL_FILL_THRESHOLD = 130
+
+# Bubble candidate thresholds of find_bubbles (the contour_based filter)
+BUBBLE_FILTER = {
+    'area_min': 50, 'area_max': 400,                  # Adjusted bubble size range
+    'circularity_min': 0.3,                           # Relaxed circularity
+    'aspect_ratio_min': 0.4, 'aspect_ratio_max': 2.5, # Relaxed aspect ratio
+    'size_min': 0, 'size_max': np.inf, 'extent_min': 0, 'solidity_min': 0
+}
 
 def sort_bubbles_for_choices(bubble_row, validate_order=True):
     """Sort bubbles in a row left-to-right and validate A,B,C,D ordering"""
@@ -53,7 +77,8 @@ class TrainedPrecisionOMRProcessor:
     
     def __init__(self):
         self.data_handler = OMRDataHandler(base_path=os.path.join(os.path.dirname(__file__), '..', '..'))
-        self.data_handler.load_answer_keys()
+        # Shared, read-only answer keys (hot-reloaded when the workbooks change)
+        self.answer_keys = get_answer_key_registry(self.data_handler.base_path)
         self.questions = 100
         self.choices = 4
         
@@ -71,10 +96,19 @@ class TrainedPrecisionOMRProcessor:
             'fill_variance_threshold': 0.005,
             'min_fill_score': 0.04,
             'adaptive_block_size': 15,
-            'adaptive_c': 5
+            'adaptive_c': 5,
+            'detection_methods': list(DETECTION_METHODS),  # fewer methods trade accuracy for speed
+            'bubble_classifier': None  # path of a learned classifier to use instead of the methods (opt-in)
         }
         
         self.load_training_params()
+        
+        # Learned bubble classifier (see OMRTrainer.train_learned_classifier), replaces the heuristic
+        # methods only when training_params names one
+        self.bubble_classifier = None
+        self._cell_maps = {}
+        if self.training_params.get('bubble_classifier'):
+            self.load_bubble_classifier(self.training_params['bubble_classifier'])
     
     def load_training_params(self):
         """Load previously trained parameters if available"""
@@ -87,56 +121,64 @@ class TrainedPrecisionOMRProcessor:
             except:
                 print("Using default parameters")
     
+    def load_bubble_classifier(self, path=None):
+        """Use a learned bubble classifier (relative paths are under the repository root)"""
+        path = os.path.join(self.data_handler.base_path, path or DEFAULT_CLASSIFIER_FILE)
+        if os.path.exists(path):
+            try:
+                self.bubble_classifier = BubbleClassifier.load(path, CELL_FEATURES)
+                print("Loaded learned bubble classifier")
+            except Exception as e:
+                print(f"Ignoring bubble classifier {path}: {e}")
+        else:
+            print(f"Bubble classifier {path} not found, using the detection methods")
+    
     def save_training_params(self):
         """Save trained parameters"""
         with open('trained_params.json', 'w') as f:
             json.dump(self.training_params, f, indent=2)
         print("Saved trained parameters")
     
-    def process_omr_sheet(self, image_path, set_type=None):
-        """Process OMR sheet using hybrid Ultimate approach with multiple validation methods"""
+    def process_omr_sheet(self, image_path, set_type=None, answer_key=None):
+        """
+        Process OMR sheet using hybrid Ultimate approach with multiple validation methods.
+        answer_key overrides the shared keys for this call only (e.g. an uploaded custom key).
+        """
         try:
             # Read and preprocess image
-            img = cv2.imread(image_path)
+            img = read_image(image_path)
             if img is None:
                 return {"success": False, "error": "Could not read image"}
             
-            # Resize for consistency
-            img = cv2.resize(img, (600, 800))
-            original_img = img.copy()
-            
-            # Enhanced preprocessing pipeline
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            
-            # Apply CLAHE for better contrast
-            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-            gray = clahe.apply(gray)
-            
-            # Apply bilateral filter to reduce noise while preserving edges
-            filtered = cv2.bilateralFilter(gray, 9, 75, 75)
+            original_img, filtered = self.preprocess_sheet(img)
             
-            # Try multiple methods and use the best result
-            methods = [
-                self.method_contour_based(filtered, original_img),
-                self.method_grid_based(filtered),
-                self.method_adaptive_threshold(filtered),
-                self.method_mark_detection(filtered),  # ORIGINAL: Specialized mark detection
-                self.method_mark_detection_improved(filtered),  # IMPROVED: Fixed bias version
-                self.method_mark_detection_normalized(filtered),  # NORMALIZED: Background-corrected version
-            ]
-            
-            # Evaluate and select best method
-            best_answers = self.select_best_method(methods)
+            if self.bubble_classifier is not None:
+                # One learned method: all 400 bubbles scored in a single matrix multiply
+                _, best_answers, _ = self.method_learned_classifier(filtered)
+            else:
+                # Try the configured methods (all six by default) and use the best result
+                methods = [self.run_detection_method(name, filtered, original_img)
+                           for name in self.training_params['detection_methods']]
+                
+                # Evaluate and select best method
+                best_answers = self.select_best_method(methods)
             
             # Determine set type and calculate score
-            if set_type and set_type != "Custom":
-                # Use provided set type if specified
-                determined_set_type = set_type
+            if answer_key is not None:
+                # Per-request key, never written into the shared registry
+                determined_set_type = set_type or "Custom"
+                correct_answers = [int(a) for a in answer_key]
             else:
-                # Auto-detect set type
-                determined_set_type = self.determine_set_type(best_answers)
-            
-            correct_answers = self.data_handler.answer_keys.get(determined_set_type, [])
+                # One snapshot for the whole sheet, even if a reload happens meanwhile
+                answer_keys = self.answer_keys.snapshot.keys
+                if set_type and set_type != "Custom":
+                    # Use provided set type if specified
+                    determined_set_type = set_type
+                else:
+                    # Auto-detect set type
+                    determined_set_type = self.determine_set_type(best_answers, answer_keys)
+                
+                correct_answers = answer_keys[determined_set_type].tolist() if determined_set_type in answer_keys else []
             score, correct_count = self.calculate_score(best_answers, correct_answers)
             
             # Save comprehensive debug
@@ -156,45 +198,73 @@ class TrainedPrecisionOMRProcessor:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    def preprocess_sheet(self, img):
+        """Resize to the 600x800 working size and return (resized copy, CLAHE + bilateral filtered gray)"""
+        # Resize for consistency
+        img = cv2.resize(img, (600, 800))
+        original_img = img.copy()
+        
+        # Enhanced preprocessing pipeline
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        
+        # Apply CLAHE for better contrast
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
+        gray = clahe.apply(gray)
+        
+        # Apply bilateral filter to reduce noise while preserving edges
+        filtered = cv2.bilateralFilter(gray, 9, 75, 75)
+        return original_img, filtered
+    
+    def extract_cell_features(self, gray_img):
+        """Feature matrix of all bubbles on the mark detection layout (5 subjects x 20 questions, header skipped)"""
+        cell_map = self._cell_maps.get(gray_img.shape)
+        if cell_map is None:
+            header_skip = int(gray_img.shape[0] * CELL_HEADER_SKIP)
+            cell_map = grid_cell_map(gray_img.shape, sections=5, rows=20, choices=self.choices,
+                                     header_skip=header_skip)
+            self._cell_maps[gray_img.shape] = cell_map
+        return extract_cell_features(gray_img, cell_map, self.questions * self.choices, self.choices,
+                                     threshold=CELL_FILL_THRESHOLD)
+    
+    def cell_feature_fingerprint(self):
+        """Version and parameters of extract_cell_features on preprocess_sheet output (for feature stores)"""
+        return (f"trained-v{CELL_FEATURE_VERSION}:size=600x800:grid=5x20x{self.choices}:"
+                f"header={CELL_HEADER_SKIP}:threshold={CELL_FILL_THRESHOLD}")
+    
+    def method_learned_classifier(self, gray_img):
+        """Learned linear bubble classifier over the whole-sheet feature matrix"""
+        student_answers = self.bubble_classifier.predict_answers(self.extract_cell_features(gray_img), self.choices).tolist()
+        detected_count = sum(1 for ans in student_answers if ans >= 0)
+        return "Learned Bubble Classifier", student_answers, detected_count
+    
+    def run_detection_method(self, name, gray_img, original_img):
+        """Run one of DETECTION_METHODS: contour_based, grid_based, adaptive_threshold, mark_detection
+        (original), mark_detection_improved (fixed bias) or mark_detection_normalized (background-corrected)"""
+        if name not in DETECTION_METHODS:
+            raise ValueError(f"Unknown detection method: {name}")
+        if name == 'contour_based':
+            return self.method_contour_based(gray_img, original_img)
+        return getattr(self, f"method_{name}")(gray_img)
+    
     def method_contour_based(self, gray_img, original_img):
         """Enhanced contour-based detection with CORRECTED bubble grouping for D,B,D pattern"""
         # Apply adaptive thresholding
         thresh = cv2.adaptiveThreshold(gray_img, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                     cv2.THRESH_BINARY_INV, 15, 5)
+                                     cv2.THRESH_BINARY_INV, int(self.training_params['adaptive_block_size']),
+                                     self.training_params['adaptive_c'])
         
         # Morphological operations
         kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (2, 2))
         thresh = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel)
         thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
         
-        # Find contours
-        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        # Enhanced bubble filtering with more specific criteria
-        bubble_contours = []
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            if 50 < area < 400:  # Adjusted bubble size range
-                # Enhanced shape validation
-                perimeter = cv2.arcLength(contour, True)
-                if perimeter > 0:
-                    circularity = 4 * np.pi * area / (perimeter * perimeter)
-                    if circularity > 0.3:  # Relaxed circularity
-                        x, y, w, h = cv2.boundingRect(contour)
-                        aspect_ratio = w / h if h > 0 else 0
-                        if 0.4 < aspect_ratio < 2.5:  # Relaxed aspect ratio
-                            bubble_contours.append(contour)
+        # Enhanced bubble filtering with more specific criteria (connected components, vectorized)
+        bubble_contours, centers = self.find_bubbles(thresh)
         
         print(f"Found {len(bubble_contours)} potential bubble contours")
         
         # Group bubbles into questions with CORRECTED logic for 5-subject layout
-        bubble_centers = []
-        for contour in bubble_contours:
-            M = cv2.moments(contour)
-            if M["m00"] != 0:
-                cx = int(M["m10"] / M["m00"])
-                cy = int(M["m01"] / M["m00"])
-                bubble_centers.append((cx, cy, contour))
+        bubble_centers = [(int(cx), int(cy), contour) for (cx, cy), contour in zip(centers, bubble_contours)]
         
         # Sort by y-coordinate first (top to bottom)
         bubble_centers.sort(key=lambda x: x[1])
@@ -1020,6 +1090,47 @@ class TrainedPrecisionOMRProcessor:
         
         return best_answers
     
+    def visualize_results(self, img, results, width=None):
+        """
+        Overlay the detected answers on a sheet image (BGR) on the grid-based layout: green for
+        correct, red for wrong, with a small green dot on the key's choice where the student was
+        wrong. Drawn directly at the display width (600 px working size when None).
+        """
+        if not results.get("success"):
+            return None
+        width = width or 600
+        height = int(round(width * 800 / 600))
+        img = cv2.resize(img, (width, height), interpolation=cv2.INTER_AREA)
+        scale = width / 600
+        
+        # Same grid as method_grid_based: 5 subjects x 20 questions below a 10% header
+        header_skip = int(height * 0.1)
+        subject_width = width / 5
+        question_height = (height - header_skip) / 20
+        choice_width = subject_width / self.choices
+        
+        student = np.asarray(results["student_answers"][:self.questions], dtype=np.int32)
+        correct = np.full(len(student), -1, dtype=np.int32)
+        key = np.asarray(results["correct_answers"][:len(student)], dtype=np.int32)
+        correct[:len(key)] = key
+        q = np.arange(len(student))
+        subject_x = (q // 20) * subject_width
+        center_y = header_skip + (q % 20 + 0.5) * question_height
+        
+        marked = student >= 0
+        right = marked & (student == correct)
+        colors = np.where(right[:, None], [0, 255, 0], [0, 0, 255])
+        centers = np.stack([subject_x + (student + 0.5) * choice_width, center_y], axis=1)
+        drawFilledCircles(img, centers[marked], 8 * scale, colors[marked])
+        missed = marked & ~right & (correct >= 0)
+        correct_centers = np.stack([subject_x + (correct + 0.5) * choice_width, center_y], axis=1)
+        drawFilledCircles(img, correct_centers[missed], 4 * scale, (0, 255, 0))
+        
+        score_text = f"Score: {results['score']:.1f}% ({results['correct_count']}/{results['total_questions']})"
+        cv2.putText(img, score_text, (10, max(12, int(30 * scale))), cv2.FONT_HERSHEY_SIMPLEX,
+                    0.7 * scale, (0, 255, 0), max(1, int(2 * scale)))
+        return img
+    
     def save_ultimate_debug(self, original_img, student_answers, correct_answers):
         """Save comprehensive debug output with CORRECTED choice mapping visualization"""
         debug_img = original_img.copy()
@@ -1130,168 +1241,61 @@ class TrainedPrecisionOMRProcessor:
                 print(f"Q{q_num+1:2d}: No answer detected")
         print("=" * 40)
     
-    def filter_bubble_contours(self, contours):
-        """Filter contours to find potential bubbles with trained parameters"""
-        bubble_contours = []
-        
-        for contour in contours:
-            if self.is_valid_bubble(contour):
-                bubble_contours.append(contour)
-        
-        print(f"Found {len(bubble_contours)} potential bubbles")
-        return bubble_contours
-    
-    def is_valid_bubble(self, contour):
-        """Enhanced bubble validation with trained parameters"""
-        # Calculate basic properties
-        area = cv2.contourArea(contour)
-        perimeter = cv2.arcLength(contour, True)
-        
-        # Filter by area
-        if not (self.training_params['area_min'] < area < self.training_params['area_max']):
-            return False
-        
-        if perimeter <= 0:
-            return False
-            
-        # Calculate circularity
-        circularity = 4 * np.pi * area / (perimeter * perimeter)
-        if circularity < self.training_params['circularity_min']:
-            return False
-        
-        # Get bounding rectangle
-        x, y, w, h = cv2.boundingRect(contour)
-        
-        # Aspect ratio check
-        aspect_ratio = float(w) / h
-        if not (self.training_params['aspect_ratio_min'] < aspect_ratio < self.training_params['aspect_ratio_max']):
-            return False
-        
-        # Size consistency check
-        if (w < self.training_params['size_min'] or h < self.training_params['size_min'] or 
-            w > self.training_params['size_max'] or h > self.training_params['size_max']):
-            return False
-        
-        # Extent check
-        rect_area = w * h
-        extent = float(area) / rect_area
-        if extent < self.training_params['extent_min']:
-            return False
-        
-        # Solidity check
-        hull = cv2.convexHull(contour)
-        hull_area = cv2.contourArea(hull)
-        if hull_area > 0:
-            solidity = float(area) / hull_area
-            if solidity < self.training_params['solidity_min']:
-                return False
-        
-        return True
-    
-    def group_bubbles_by_questions(self, bubble_contours, img_shape):
-        """Group bubbles into questions based on their positions with improved multi-column support"""
-        if not bubble_contours:
-            return []
-        
-        # Get center points of all bubbles
-        bubble_centers = []
-        for contour in bubble_contours:
-            M = cv2.moments(contour)
-            if M["m00"] != 0:
-                cx = int(M["m10"] / M["m00"])
-                cy = int(M["m01"] / M["m00"])
-                bubble_centers.append((cx, cy, contour))
+    def find_bubbles(self, thresh_img, params=None):
+        """
+        Find bubble candidates with connected components instead of per-contour checks.
+        Area, size, aspect ratio and extent are filtered for all components at once from the
+        component stats; circularity and solidity need a contour and are only computed for
+        the components that survive. Returns (contours, centers) with centers an Nx2 int array.
+        Thresholds default to BUBBLE_FILTER; params overrides some of them.
+        """
+        p = dict(BUBBLE_FILTER)
+        if params:
+            p.update(params)
+        
+        # Fill holes so an outlined bubble counts with its interior, like an external contour
+        # (a 1px empty border guarantees the flood starts outside every component)
+        background = cv2.bitwise_not(cv2.copyMakeBorder(thresh_img, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0))
+        cv2.floodFill(background, None, (0, 0), 0)
+        filled = cv2.bitwise_or(thresh_img, background[1:-1, 1:-1])
+        
+        _, labels, stats, centroids = cv2.connectedComponentsWithStats(filled, connectivity=8)
+        stats, centroids = stats[1:], centroids[1:]  # Drop the background component
+        x, y, w, h, area = (stats[:, i].astype(np.float64) for i in range(5))
+        aspect_ratio = w / np.maximum(h, 1)
+        extent = area / np.maximum(w * h, 1)
+        
+        keep = ((area > p['area_min']) & (area < p['area_max']) &
+                (aspect_ratio > p['aspect_ratio_min']) & (aspect_ratio < p['aspect_ratio_max']) &
+                (w >= p['size_min']) & (h >= p['size_min']) &
+                (w <= p['size_max']) & (h <= p['size_max']) &
+                (extent >= p['extent_min']))
         
-        if not bubble_centers:
-            return []
-        
-        # Sort bubbles by Y coordinate (top to bottom) first
-        bubble_centers.sort(key=lambda x: x[1])
-        
-        # Group bubbles into rows with adaptive tolerance
-        questions_bubbles = []
-        current_row = []
-        current_y = bubble_centers[0][1]
-        row_tolerance = max(8, img_shape[0] // 80)  # Smaller tolerance for better row separation
-        
-        for cx, cy, contour in bubble_centers:
-            if abs(cy - current_y) <= row_tolerance:
-                current_row.append((cx, cy, contour))
-            else:
-                if len(current_row) >= 2:
-                    # Sort by X coordinate to get left-to-right order
-                    current_row.sort(key=lambda x: x[0])
-                    processed_row = self.process_bubble_row(current_row, img_shape)
-                    if processed_row:
-                        questions_bubbles.extend(processed_row)
-                current_row = [(cx, cy, contour)]
-                current_y = cy
-        
-        # Add the last row if valid
-        if len(current_row) >= 2:
-            current_row.sort(key=lambda x: x[0])
-            processed_row = self.process_bubble_row(current_row, img_shape)
-            if processed_row:
-                questions_bubbles.extend(processed_row)
-        
-        print(f"Grouped bubbles into {len(questions_bubbles)} valid question rows")
-        return questions_bubbles
-    
-    def process_bubble_row(self, row, img_shape):
-        """Process a row of bubbles to handle multi-column layout"""
-        if len(row) < 2:
-            return []
-        
-        # For your specific OMR sheet layout, we need to identify the subject columns
-        # Based on your image, there are 5 subjects: PYTHON, DATA ANALYSIS, MySQL, POWER BI, ADV STATS
-        # Each subject should have its own set of 4 choices (A, B, C, D)
-        
-        x_positions = [bubble[0] for bubble in row]
-        
-        # If we have exactly 4 bubbles, treat as a single question
-        if len(row) == 4:
-            return [row]
-        
-        # If we have more than 4 bubbles, we need to group them by subject columns
-        if len(row) > 4:
-            # Calculate gaps between consecutive bubbles
-            gaps = []
-            for i in range(len(x_positions) - 1):
-                gap = x_positions[i+1] - x_positions[i]
-                gaps.append(gap)
-            
-            if gaps:
-                # Identify significant gaps that separate subject columns
-                avg_gap = sum(gaps) / len(gaps)
-                large_gap_indices = []
-                
-                # A gap is considered "large" if it's significantly bigger than average
-                for i, gap in enumerate(gaps):
-                    if gap > avg_gap * 1.8:  # 80% larger than average
-                        large_gap_indices.append(i)
-                
-                # Split into subject groups based on large gaps
-                groups = []
-                start_idx = 0
-                
-                for gap_idx in large_gap_indices:
-                    end_idx = gap_idx + 1
-                    if end_idx - start_idx >= 2:  # At least 2 bubbles
-                        group = row[start_idx:end_idx]
-                        if len(group) <= 4:  # Maximum 4 choices per question
-                            groups.append(group)
-                    start_idx = end_idx
-                
-                # Add the last group
-                if start_idx < len(row):
-                    group = row[start_idx:]
-                    if len(group) >= 2 and len(group) <= 4:
-                        groups.append(group)
-                
-                return groups
-        
-        # Simplified: just return first 4 bubbles to get more question rows
-        return [row[:4]]
+        bubble_contours = []
+        survivors = []
+        for idx in np.flatnonzero(keep):
+            bx, by, bw, bh = stats[idx, :4]
+            component = (labels[by:by + bh, bx:bx + bw] == idx + 1).astype(np.uint8)
+            contours, _ = cv2.findContours(component, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE,
+                                           offset=(int(bx), int(by)))
+            if not contours:
+                continue
+            contour = max(contours, key=cv2.contourArea)
+            contour_area = cv2.contourArea(contour)
+            perimeter = cv2.arcLength(contour, True)
+            if perimeter <= 0:
+                continue
+            if 4 * np.pi * contour_area / (perimeter * perimeter) < p['circularity_min']:
+                continue
+            if p['solidity_min'] > 0:
+                hull_area = cv2.contourArea(cv2.convexHull(contour))
+                if hull_area > 0 and contour_area / hull_area < p['solidity_min']:
+                    continue
+            bubble_contours.append(contour)
+            survivors.append(idx)
+        
+        centers = centroids[survivors].astype(np.int32) if survivors else np.zeros((0, 2), np.int32)
+        return bubble_contours, centers
     
     def is_valid_bubble_row(self, bubble_row):
         """Check if a row of bubbles is valid"""
@@ -1452,8 +1456,8 @@ class TrainedPrecisionOMRProcessor:
     
     def train_on_sample(self, image_path, correct_set_type):
         """Train the model on a sample with known correct answers"""
-        correct_answers = self.data_handler.answer_keys.get(correct_set_type, [])
-        if not correct_answers:
+        correct_answers = self.answer_keys.get(correct_set_type)
+        if correct_answers is None or len(correct_answers) == 0:
             print(f"No correct answers found for {correct_set_type}")
             return False
         
@@ -1503,10 +1507,12 @@ class TrainedPrecisionOMRProcessor:
         print(f"Training complete. Best score: {best_score:.1f}")
         return True
     
-    def determine_set_type(self, student_answers):
+    def determine_set_type(self, student_answers, answer_keys=None):
         """Determine if this is Set A or Set B based on answers"""
+        if answer_keys is None:
+            answer_keys = self.answer_keys.snapshot.keys
         scores = {}
-        for set_name, correct_answers in self.data_handler.answer_keys.items():
+        for set_name, correct_answers in answer_keys.items():
             score, _ = self.calculate_score(student_answers, correct_answers)
             scores[set_name] = score
         
@@ -1514,15 +1520,11 @@ class TrainedPrecisionOMRProcessor:
     
     def calculate_score(self, student_answers, correct_answers):
         """Calculate the score"""
-        if not correct_answers:
+        if correct_answers is None or len(correct_answers) == 0:
             return 0.0, 0
         
-        correct_count = sum(1 for s, c in zip(student_answers, correct_answers) 
-                          if s == c and s >= 0)
-        total = len(correct_answers)
-        score = (correct_count / total) * 100 if total > 0 else 0
-        
-        return score, correct_count
+        scored = score_answers(student_answers, correct_answers)
+        return float(scored["percentage"]), int(scored["correct_count"])
     
     def save_debug_images(self, original_img, thresh_img, bubble_contours, questions_bubbles):
         """Save debug images to organized folders for better file structure"""
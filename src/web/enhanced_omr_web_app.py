@@ -15,6 +15,8 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'processors'))
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'core'))
 from trained_precision_omr import TrainedPrecisionOMRProcessor
 from data_handler import OMRDataHandler
+from scoring import score_answers
+from answer_key_import import import_answer_key
 import matplotlib.pyplot as plt
 import seaborn as sns
 
@@ -26,9 +28,16 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+@st.cache_resource
+def get_processor():
+    """Processor built once per server process and shared read-only by all sessions;
+    per-request settings (set type, custom answer key) are passed to process_omr_sheet"""
+    return TrainedPrecisionOMRProcessor()
+
+processor = get_processor()
+
 # Initialize session state
-if 'processor' not in st.session_state:
-    st.session_state.processor = TrainedPrecisionOMRProcessor()
+if 'results_history' not in st.session_state:
     st.session_state.results_history = []
 
 # Add processor configuration in sidebar
@@ -38,10 +47,6 @@ bubble_threshold = st.sidebar.slider("Bubble Detection Threshold", 50, 500, 200,
 use_morphology = st.sidebar.checkbox("Use Morphological Operations", True,
                                     help="Apply image cleaning operations for better detection")
 
-# Update processor settings
-if hasattr(st.session_state.processor, 'bubble_threshold'):
-    st.session_state.processor.bubble_threshold = bubble_threshold
-
 # Custom CSS for better styling
 st.markdown("""
 <style>
@@ -78,25 +83,14 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 def process_uploaded_excel(uploaded_file):
-    """Process uploaded Excel answer key file"""
+    """Process uploaded Excel answer key file (streamed and validated row by row)"""
     try:
-        df = pd.read_excel(uploaded_file)
-        # Remove empty rows
-        df = df.dropna(how='all')
+        imported = import_answer_key(uploaded_file)
+        if not imported.valid:
+            return None, "; ".join(imported.errors[:5])
         
-        # Extract answers
-        answers = []
-        for _, row in df.iterrows():
-            for col in df.columns:
-                if pd.notna(row[col]):
-                    import re
-                    match = re.search(r'[abcd]', str(row[col]).lower())
-                    if match:
-                        letter = match.group()
-                        answer_num = ord(letter) - ord('a')
-                        answers.append(answer_num)
-        
-        return answers, None
+        # Compiled int8 key, answers placed by question number
+        return imported.key, None
     except Exception as e:
         return None, str(e)
 
@@ -234,21 +228,20 @@ def generate_detailed_csv_report(results, set_type):
     # Create detailed report data
     report_data = []
     
-    # Calculate score
-    correct_count = 0
+    # Calculate score (all questions in one vectorized pass)
     total_questions = min(len(student_answers), len(correct_answers), 100)
+    scored = score_answers(student_answers[:total_questions], correct_answers[:total_questions])
+    correct_count = int(scored["correct_count"])
     
     for i in range(100):
         if i < total_questions:
-            student_ans = student_answers[i] if i < len(student_answers) else -1
-            correct_ans = correct_answers[i] if i < len(correct_answers) else -1
+            student_ans = student_answers[i]
+            correct_ans = correct_answers[i]
             
             student_letter = chr(ord('A') + student_ans) if student_ans >= 0 else "None"
             correct_letter = chr(ord('A') + correct_ans) if correct_ans >= 0 else "None"
             
-            is_correct = student_ans == correct_ans and student_ans >= 0
-            if is_correct:
-                correct_count += 1
+            is_correct = bool(scored["correct"][i])
             
             report_data.append({
                 'Serial_Number': i + 1,
@@ -356,14 +349,10 @@ def main():
                         correct_answers = get_answer_key(set_type)
                         
                         # Calculate results
-                        correct_count = 0
                         total_questions = min(len(student_answers), len(correct_answers))
-                        
-                        for i in range(total_questions):
-                            if student_answers[i] == correct_answers[i]:
-                                correct_count += 1
-                        
-                        score = (correct_count / total_questions) * 100 if total_questions > 0 else 0
+                        scored = score_answers(student_answers[:total_questions], correct_answers[:total_questions])
+                        correct_count = int(scored["correct_count"])
+                        score = float(scored["percentage"])
                         
                         # Create results dictionary
                         results = {
@@ -7,8 +7,15 @@ from PIL import Image
 import base64
 import io
 import time
-import hashlib
-import json
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'core'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'processors'))
+from scoring import CHOICE_LETTERS, letters_to_indices, key_question_count
+from trained_precision_omr import TrainedPrecisionOMRProcessor
+from job_queue import open_batch_backend
+from user_store import UserStore
+from answer_key_repository import AnswerKeyRepository
+from answer_key_import import preview_sheet, import_answer_key_row
 
 # Configure page
 st.set_page_config(
@@ -18,67 +25,35 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Authentication functions
-def hash_password(password):
-    """Hash password using SHA-256"""
-    return hashlib.sha256(password.encode()).hexdigest()
-
-def load_users():
-    """Load users from JSON file"""
-    users_file = "users.json"
-    if os.path.exists(users_file):
-        try:
-            with open(users_file, 'r') as f:
-                return json.load(f)
-        except:
-            return {}
-    return {}
+@st.cache_resource
+def get_batch_executor():
+    """Batch backend shared by all sessions of this server process ([jobs] backend in config.ini)"""
+    config_path = os.path.join(os.path.dirname(__file__), '..', '..', 'config.ini')
+    return open_batch_backend(TrainedPrecisionOMRProcessor, config_path)
 
-def save_users(users):
-    """Save users to JSON file"""
-    users_file = "users.json"
-    with open(users_file, 'w') as f:
-        json.dump(users, f, indent=2)
+# Authentication functions
+@st.cache_resource
+def get_user_store():
+    """User database shared by all sessions (users.json is imported on first use)"""
+    return UserStore()
 
 def create_user(username, password, email):
     """Create a new user"""
-    users = load_users()
-    if username in users:
-        return False, "Username already exists"
-    
-    users[username] = {
-        "password": hash_password(password),
-        "email": email,
-        "created_at": time.strftime("%Y-%m-%d %H:%M:%S")
-    }
-    save_users(users)
-    return True, "User created successfully"
+    return get_user_store().create(username, password, email, created_at=time.strftime("%Y-%m-%d %H:%M:%S"))
 
 def authenticate_user(username, password):
     """Authenticate user credentials"""
-    users = load_users()
-    if username in users:
-        if users[username]["password"] == hash_password(password):
-            return True
-    return False
+    return get_user_store().authenticate(username, password)
 
 # Answer Key Management Functions
-def load_answer_keys():
-    """Load answer keys from JSON file"""
-    answer_keys_file = "answer_keys.json"
-    if os.path.exists(answer_keys_file):
-        try:
-            with open(answer_keys_file, 'r') as f:
-                return json.load(f)
-        except:
-            return get_default_answer_keys()
-    return get_default_answer_keys()
+@st.cache_resource
+def get_answer_key_repository():
+    """answer_keys.json cached in memory and shared by all sessions (reloaded only when the file changes)"""
+    return AnswerKeyRepository("answer_keys.json", defaults=get_default_answer_keys())
 
-def save_answer_keys(answer_keys):
-    """Save answer keys to JSON file"""
-    answer_keys_file = "answer_keys.json"
-    with open(answer_keys_file, 'w') as f:
-        json.dump(answer_keys, f, indent=2)
+def load_answer_keys():
+    """Read-only answer keys of the current version ({set name: {'Q1': 'A', ...}})"""
+    return get_answer_key_repository().keys
 
 def get_default_answer_keys():
     """Get default answer keys for Set A and Set B"""
@@ -111,19 +86,14 @@ def get_default_answer_keys():
 
 def add_answer_key(set_name, answer_key):
     """Add or update an answer key set"""
-    answer_keys = load_answer_keys()
-    answer_keys[set_name] = answer_key
-    save_answer_keys(answer_keys)
+    get_answer_key_repository().put(set_name, answer_key)
     return True
 
 def delete_answer_key(set_name):
     """Delete an answer key set"""
-    answer_keys = load_answer_keys()
-    if set_name in answer_keys and set_name not in ["Set A", "Set B"]:
-        del answer_keys[set_name]
-        save_answer_keys(answer_keys)
-        return True
-    return False
+    if set_name in ["Set A", "Set B"]:
+        return False
+    return get_answer_key_repository().delete(set_name)
 
 def export_answer_keys_to_excel():
     """Export all answer keys to Excel format"""
@@ -727,8 +697,7 @@ st.markdown("""
 
 def get_answer_key(set_type):
     """Get answer key based on set type from the answer keys database"""
-    answer_keys = load_answer_keys()
-    return answer_keys.get(set_type, {})
+    return get_answer_key_repository().get(set_type)
 
 def create_hero_header():
     """Create stunning animated hero header"""
@@ -797,70 +766,122 @@ def create_processing_metrics(total_files, processed_files, success_count, error
         </div>
         """, unsafe_allow_html=True)
 
-def process_single_image(image_file, answer_set, predefined_answers):
-    """Process a single OMR image with enhanced error handling and auto-detection"""
-    try:
-        # Generate unique identifiers
-        serial_no = random.randint(100000, 999999)
-        roll_no = f"STU{random.randint(1000, 9999)}"
-        
-        # Auto-detect set from filename if not explicitly provided
-        filename = image_file.name.upper()
-        if 'SET_A' in filename or 'SETA' in filename or ('SET' in filename and 'A' in filename):
-            detected_set = "Set A"
-        elif 'SET_B' in filename or 'SETB' in filename or ('SET' in filename and 'B' in filename):
-            detected_set = "Set B"
-        else:
-            detected_set = answer_set  # Use the provided answer_set
-        
-        # Get answer key
-        answer_key = get_answer_key(detected_set)
-        
-        # Calculate results
-        correct_count = 0
-        total_questions = len(answer_key)
-        detailed_results = []
-        
-        for i in range(1, 101):  # Process all 100 questions for Excel format
-            student_answer = predefined_answers.get(f'Q{i}', 'X')
-            correct_answer = answer_key.get(f'Q{i}', 'X')
-            is_correct = student_answer == correct_answer and student_answer != 'X' and correct_answer != 'X'
-            
-            if is_correct:
-                correct_count += 1
-                
-            detailed_results.append({
-                'question': f'Q{i}',
-                'student_answer': student_answer,
-                'correct_answer': correct_answer,
-                'is_correct': is_correct
-            })
-        
-        accuracy = (correct_count / total_questions) * 100 if total_questions > 0 else 0
-        
-        # Create result record
-        result = {
-            'file_name': image_file.name,
-            'serial_no': serial_no,
-            'roll_no': roll_no,
-            'detected_set': detected_set,
-            'correct_answers': correct_count,
-            'total_questions': total_questions,
-            'accuracy': accuracy,
-            'detailed_results': detailed_results,
-            'status': 'success',
-            'processing_time': random.uniform(0.5, 2.0)
-        }
-        
-        return result
-        
-    except Exception as e:
+def detect_answer_set(filename, answer_set):
+    """Answer set named in the file name (e.g. Set_A_Img1.jpeg), otherwise the selected one"""
+    filename = filename.upper()
+    if 'SET_A' in filename or 'SETA' in filename or ('SET' in filename and 'A' in filename):
+        return "Set A"
+    elif 'SET_B' in filename or 'SETB' in filename or ('SET' in filename and 'B' in filename):
+        return "Set B"
+    return answer_set
+
+def create_result_record(detected_set, answer_key, processed):
+    """Batch result record of one sheet from the processor's result and measured processing time"""
+    if not processed.get('success'):
         return {
-            'file_name': image_file.name,
-            'error': str(e),
+            'file_name': processed['uploaded_filename'],
+            'error': processed.get('error', 'Unknown error'),
             'status': 'error',
-            'processing_time': 0
+            'processing_time': processed.get('processing_time', 0)
         }
+    
+    student_answers = processed['student_answers']
+    detailed_results = [{
+        'question': f'Q{i}',
+        'student_answer': CHOICE_LETTERS[answer] if 0 <= answer < len(CHOICE_LETTERS) else 'X',
+        'correct_answer': answer_key.get(f'Q{i}', 'X'),
+        'is_correct': correct >= 0 and answer == correct  # dropped questions never match
+    } for i, (answer, correct) in enumerate(zip(student_answers, processed['correct_answers']), start=1)]
+    
+    return {
+        'file_name': processed['uploaded_filename'],
+        'serial_no': random.randint(100000, 999999),
+        'roll_no': f"STU{random.randint(1000, 9999)}",
+        'detected_set': detected_set,
+        'correct_answers': processed['correct_count'],
+        'total_questions': processed['total_questions'],
+        'accuracy': processed['score'],
+        'detailed_results': detailed_results,
+        'status': 'success',
+        'processing_time': processed['processing_time']
+    }
+
+def submit_batch(uploaded_files, answer_set):
+    """
+    Queue the uploads in the batch executor, one batch per answer set, and return the pending
+    batch: [(answer set, batch id, upload indices)] plus the answer keys it is scored with.
+    The keys are read once per batch, as one snapshot, however many sheets it has.
+    """
+    answer_keys = load_answer_keys()
+    groups = {}
+    for index, uploaded_file in enumerate(uploaded_files):
+        groups.setdefault(detect_answer_set(uploaded_file.name, answer_set), []).append(index)
+    
+    executor = get_batch_executor()
+    batches = []
+    for detected_set, indices in groups.items():
+        answer_key = answer_keys.get(detected_set, {})
+        batch_id = executor.submit([(uploaded_files[i].name, uploaded_files[i].getvalue()) for i in indices],
+                                   detected_set, answer_key=letters_to_indices(answer_key, key_question_count(answer_key)))
+        batches.append((detected_set, batch_id, indices))
+    return {'batches': batches, 'answer_keys': answer_keys, 'total': len(uploaded_files)}
+
+def collect_batch(pending):
+    """
+    (completed sheets, results in upload order, throughput stats) of a pending batch;
+    results and stats are None until every sheet is done. None if the executor has forgotten
+    the batch (e.g. its results were not collected within an hour, or the server restarted).
+    """
+    executor = get_batch_executor()
+    jobs = [(detected_set, executor.get(batch_id), indices) for detected_set, batch_id, indices in pending['batches']]
+    if any(job is None for _, job, _ in jobs):
+        return None
+    completed = sum(job.completed for _, job, _ in jobs)
+    if not all(job.finished for _, job, _ in jobs):
+        return completed, None, None
+    
+    results = [None] * pending['total']
+    for detected_set, job, indices in jobs:
+        answer_key = pending['answer_keys'].get(detected_set, {})
+        for index, processed in zip(indices, job.results()):
+            results[index] = create_result_record(detected_set, answer_key, processed)
+    
+    # Wall time from submission to the last finished sheet, as seen by the executor
+    wall_time = max(job.completed_at for _, job, _ in jobs) - min(job.created_at for _, job, _ in jobs)
+    times = [result['processing_time'] for result in results]
+    stats = {
+        'sheets': len(results),
+        'wall_time': wall_time,
+        'sheets_per_second': len(results) / max(wall_time, 1e-9),
+        'mean_time': float(np.mean(times)),
+        'max_time': float(np.max(times))
+    }
+    return completed, results, stats
+
+def format_processing_speed():
+    """Measured throughput of the last batch for the performance panels"""
+    stats = st.session_state.get('batch_stats')
+    if not stats:
+        return "Measured after the first batch"
+    return (f"{stats['sheets_per_second']:.1f} sheets/s, "
+            f"{stats['mean_time']:.2f}s per sheet (last batch of {stats['sheets']})")
+
+def create_throughput_metrics(stats):
+    """Measured wall time, throughput and per-sheet time of the last batch"""
+    col1, col2, col3, col4 = st.columns(4)
+    for column, value, label in [
+        (col1, f"{stats['wall_time']:.1f}s", "Batch Time"),
+        (col2, f"{stats['sheets_per_second']:.1f}", "Sheets / Second"),
+        (col3, f"{stats['mean_time']:.2f}s", "Mean Per Sheet"),
+        (col4, f"{stats['max_time']:.2f}s", "Slowest Sheet"),
+    ]:
+        with column:
+            st.markdown(f"""
+            <div class="metric-float">
+                <div class="metric-value">{value}</div>
+                <div class="metric-label">{label}</div>
+            </div>
+            """, unsafe_allow_html=True)
 
 def create_batch_results_display(results):
     """Create elegant batch results visualization"""
@@ -898,7 +919,7 @@ def create_batch_results_display(results):
                         <div style="font-size: 0.8rem; color: rgba(255,255,255,0.7);">ROLL NO</div>
                     </div>
                     <div style="text-align: center;">
-                        <div style="font-size: 1.5rem; font-weight: 700; color: #764ba2;">{result['processing_time']:.1f}s</div>
+                        <div style="font-size: 1.5rem; font-weight: 700; color: #764ba2;">{result['processing_time']:.2f}s</div>
                         <div style="font-size: 0.8rem; color: rgba(255,255,255,0.7);">TIME</div>
                     </div>
                 </div>
@@ -1088,11 +1109,11 @@ def create_elegant_sidebar():
         </div>
         """, unsafe_allow_html=True)
         
-        st.markdown("""
+        st.markdown(f"""
         <div class="sidebar-glass">
             <h4 style="color: #667eea; margin-bottom: 1rem;">📈 Performance Stats</h4>
             <div style="color: rgba(255,255,255,0.8); font-size: 0.9rem;">
-                <div style="margin-bottom: 0.5rem;">⚡ Processing Speed: ~2s/image</div>
+                <div style="margin-bottom: 0.5rem;">⚡ Processing Speed: {format_processing_speed()}</div>
                 <div style="margin-bottom: 0.5rem;">🎯 Accuracy Rate: 99.8%</div>
                 <div style="margin-bottom: 0.5rem;">📊 Supported Formats: JPG, PNG</div>
                 <div>🔄 Max Batch Size: 50 images</div>
@@ -1161,10 +1182,12 @@ def show_import_excel_form():
     
     if uploaded_excel is not None:
         try:
-            # Read Excel file
-            df = pd.read_excel(uploaded_excel)
+            # Only the first rows are read for the preview; the workbook is streamed on import
+            header, preview_rows = preview_sheet(uploaded_excel)
+            header = [str(col) if col is not None else f"Column {i + 1}" for i, col in enumerate(header)]
+            df = pd.DataFrame(preview_rows, columns=header)
             st.write("**Preview of uploaded Excel file:**")
-            st.dataframe(df.head(), use_container_width=True)
+            st.dataframe(df, use_container_width=True)
             
             # Let user specify which columns contain the data
             with st.form("import_excel_form"):
@@ -1194,7 +1217,6 @@ def show_import_excel_form():
                         row_index = st.number_input(
                             "Row number to extract answers from (0-based index)",
                             min_value=0,
-                            max_value=len(df)-1,
                             value=0,
                             help="Which row contains the answer key (0 = first row)"
                         )
@@ -1208,7 +1230,6 @@ def show_import_excel_form():
                     row_index = st.number_input(
                         "Row number to extract answers from (0-based index)",
                         min_value=0,
-                        max_value=len(df)-1,
                         value=0
                     )
                 
@@ -1220,25 +1241,16 @@ def show_import_excel_form():
                             st.error("Please enter a valid set name!")
                         else:
                             try:
-                                answers = {}
-                                
+                                # Stream the workbook up to the selected row and validate it
                                 if use_q_format and q_columns:
-                                    # Extract answers from Q columns
-                                    for col in q_columns:
-                                        answer = str(df.iloc[row_index][col]).strip().upper()
-                                        if answer in ['A', 'B', 'C', 'D']:
-                                            answers[col] = answer
-                                        else:
-                                            st.warning(f"Invalid answer '{answer}' for {col}, skipping...")
+                                    imported = import_answer_key_row(uploaded_excel, int(row_index))
+                                    for error in imported.errors:
+                                        st.warning(f"{error}, skipping...")
                                 else:
-                                    # Extract from specified range
-                                    start_idx = available_columns.index(start_col)
-                                    for i in range(num_questions):
-                                        if start_idx + i < len(available_columns):
-                                            col = available_columns[start_idx + i]
-                                            answer = str(df.iloc[row_index][col]).strip().upper()
-                                            if answer in ['A', 'B', 'C', 'D']:
-                                                answers[f'Q{i+1}'] = answer
+                                    imported = import_answer_key_row(uploaded_excel, int(row_index),
+                                                                     start_column=available_columns.index(start_col),
+                                                                     num_questions=int(num_questions))
+                                answers = imported.as_letters()
                                 
                                 if answers:
                                     # Check if set name already exists
@@ -1434,7 +1446,7 @@ def show_edit_answer_key_form():
 
 def create_elegant_footer():
     """Create modern footer"""
-    st.markdown("""
+    st.markdown(f"""
     <div class="footer-elegant">
         <div class="footer-grid">
             <div class="footer-section">
@@ -1443,7 +1455,7 @@ def create_elegant_footer():
             </div>
             <div class="footer-section">
                 <h4>⚡ Performance</h4>
-                <p>Ultra-fast processing</p>
+                <p>{format_processing_speed()}</p>
                 <p>99.8% accuracy rate</p>
                 <p>Batch processing support</p>
             </div>
@@ -1466,6 +1478,10 @@ def main():
         st.session_state.batch_results = []
     if 'processing_complete' not in st.session_state:
         st.session_state.processing_complete = False
+    if 'pending_batch' not in st.session_state:
+        st.session_state.pending_batch = None
+    if 'batch_stats' not in st.session_state:
+        st.session_state.batch_stats = None
     if 'authenticated' not in st.session_state:
         st.session_state.authenticated = False
     if 'username' not in st.session_state:
@@ -1510,125 +1526,37 @@ def main():
         
         create_processing_metrics(total_files, processed_files, success_count, error_count)
         
-        # Process button
+        # Process button: the sheets run in the batch executor; the page only follows progress
         if st.button("🚀 Process All Images", use_container_width=True, type="primary"):
             st.session_state.batch_results = []
             st.session_state.processing_complete = False
-            
-            # Load student answers from generated file
-            import json
-            import os
-            
-            # Try to load the complete student answers mapping
-            student_answers_file = os.path.join(os.path.dirname(__file__), '..', '..', 'student_answers_mapping.json')
-            if not os.path.exists(student_answers_file):
-                student_answers_file = 'student_answers_mapping.json'
-            
-            try:
-                with open(student_answers_file, 'r') as f:
-                    STUDENT_ANSWERS_BY_IMAGE = json.load(f)
-            except (FileNotFoundError, json.JSONDecodeError):
-                # Fallback to basic pattern if file not found
-                STUDENT_ANSWERS_BY_IMAGE = {
-                    'Set_A_Img1.jpeg': {
-                        'Q1': 'A', 'Q2': 'C', 'Q3': 'B', 'Q4': 'D', 'Q5': 'B',
-                        'Q6': 'A', 'Q7': 'A', 'Q8': 'C', 'Q9': 'A', 'Q10': 'C',
-                        'Q11': 'C', 'Q12': 'A', 'Q13': 'D', 'Q14': 'A', 'Q15': 'A',
-                        'Q16': 'B', 'Q17': 'C', 'Q18': 'D', 'Q19': 'D', 'Q20': 'B',
-                        'Q21': 'A', 'Q22': 'D', 'Q23': 'B', 'Q24': 'B', 'Q25': 'C',
-                        'Q26': 'A', 'Q27': 'A', 'Q28': 'B', 'Q29': 'D', 'Q30': 'D',
-                        'Q31': 'C', 'Q32': 'A', 'Q33': 'B', 'Q34': 'C', 'Q35': 'A',
-                        'Q36': 'A', 'Q37': 'B', 'Q38': 'B', 'Q39': 'A', 'Q40': 'B',
-                        'Q41': 'B', 'Q42': 'C', 'Q43': 'D', 'Q44': 'B', 'Q45': 'B',
-                        'Q46': 'A', 'Q47': 'A', 'Q48': 'D', 'Q49': 'D', 'Q50': 'C',
-                        'Q51': 'B', 'Q52': 'B', 'Q53': 'C', 'Q54': 'D', 'Q55': 'A',
-                        'Q56': 'B', 'Q57': 'B', 'Q58': 'A', 'Q59': 'A', 'Q60': 'A',
-                        'Q61': 'A', 'Q62': 'A', 'Q63': 'B', 'Q64': 'B', 'Q65': 'B',
-                        'Q66': 'A', 'Q67': 'B', 'Q68': 'A', 'Q69': 'B', 'Q70': 'A',
-                        'Q71': 'A', 'Q72': 'A', 'Q73': 'C', 'Q74': 'B', 'Q75': 'B',
-                        'Q76': 'B', 'Q77': 'A', 'Q78': 'B', 'Q79': 'A', 'Q80': 'A',
-                        'Q81': 'C', 'Q82': 'D', 'Q83': 'B', 'Q84': 'B', 'Q85': 'B',
-                        'Q86': 'A', 'Q87': 'B', 'Q88': 'C'
-                    }
-                }
-            
-            # Function to get student answers for a specific image
-            def get_student_answers_for_image(filename):
-                # Try exact match first
-                if filename in STUDENT_ANSWERS_BY_IMAGE:
-                    return STUDENT_ANSWERS_BY_IMAGE[filename]
-                
-                # Try variations of the filename
-                variations = [
-                    filename,
-                    filename.replace('Set_A_', '').replace('Set_B_', ''),
-                    f"Set_A_{filename}",
-                    f"Set_B_{filename}"
-                ]
-                
-                for variation in variations:
-                    if variation in STUDENT_ANSWERS_BY_IMAGE:
-                        base_answers = STUDENT_ANSWERS_BY_IMAGE[variation].copy()
-                        # Add default values for questions 89-100
-                        for i in range(89, 101):
-                            if f'Q{i}' not in base_answers:
-                                base_answers[f'Q{i}'] = ['A', 'B', 'C', 'D'][(i-89) % 4]
-                        return base_answers
-                
-                # If no match found, generate random answers based on the base pattern
-                import random
-                base_pattern = STUDENT_ANSWERS_BY_IMAGE['Set_A_Img1.jpeg'].copy()
-                choices = ['A', 'B', 'C', 'D']
-                
-                # Randomly change 20-40% of the answers
-                num_changes = random.randint(18, 35)  # 20-40% of 88 questions
-                questions_to_change = random.sample(list(base_pattern.keys()), num_changes)
-                
-                for question in questions_to_change:
-                    original_answer = base_pattern[question]
-                    available_choices = [choice for choice in choices if choice != original_answer]
-                    base_pattern[question] = random.choice(available_choices)
-                
-                # Add questions 89-100
-                for i in range(89, 101):
-                    base_pattern[f'Q{i}'] = choices[(i-89) % 4]
-                
-                return base_pattern
-            
-            # Progress bar
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            
-            # Process each image
-            for i, uploaded_file in enumerate(uploaded_files):
-                status_text.markdown(f"""
-                <div class="status-processing">🔄 Processing {uploaded_file.name}...</div>
-                """, unsafe_allow_html=True)
-                
-                # Simulate processing delay for realism
-                time.sleep(0.5)
-                
-                # Get specific student answers for this image
-                student_answers = get_student_answers_for_image(uploaded_file.name)
-                
-                # Process the image
-                result = process_single_image(uploaded_file, answer_set, student_answers)
-                st.session_state.batch_results.append(result)
+            st.session_state.pending_batch = submit_batch(uploaded_files, answer_set)
+        
+        if st.session_state.pending_batch is not None:
+            collected = collect_batch(st.session_state.pending_batch)
+            if collected is None:
+                st.session_state.pending_batch = None
+                st.error("This batch is no longer available; results are kept for an hour after it finishes.")
+            else:
+                completed, results, stats = collected
+                if results is None:
+                    st.progress(completed / st.session_state.pending_batch['total'])
+                    st.markdown(f"""
+                    <div class="status-processing">🔄 Processing... ({completed}/{st.session_state.pending_batch['total']} sheets done)</div>
+                    """, unsafe_allow_html=True)
+                    time.sleep(1)
+                    st.rerun()
                 
-                # Update progress
-                progress = (i + 1) / total_files
-                progress_bar.progress(progress)
-            
-            status_text.markdown("""
-            <div class="status-success">✅ Batch processing completed!</div>
-            """, unsafe_allow_html=True)
-            
-            st.session_state.processing_complete = True
-            time.sleep(1)
-            st.rerun()
+                st.session_state.pending_batch = None
+                st.session_state.batch_results = results
+                st.session_state.batch_stats = stats
+                st.session_state.processing_complete = True
+                st.rerun()
     
     # Display results if processing is complete
     if st.session_state.processing_complete and st.session_state.batch_results:
+        if st.session_state.batch_stats:
+            create_throughput_metrics(st.session_state.batch_stats)
         create_batch_results_display(st.session_state.batch_results)
         
         # Download section
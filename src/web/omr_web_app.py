@@ -10,10 +10,13 @@ import io
 import base64
 import sys
 import os
+import time
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'processors'))
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'core'))
 from trained_precision_omr import TrainedPrecisionOMRProcessor
 from data_handler import OMRDataHandler
+from answer_key_import import import_answer_key
+from job_queue import open_batch_backend
 import matplotlib.pyplot as plt
 import seaborn as sns
 
@@ -25,10 +28,26 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+@st.cache_resource
+def get_batch_executor():
+    """Batch backend shared by all sessions of this server process: a background process pool,
+    or the persistent job queue served by `main.py --worker` ([jobs] backend in config.ini)"""
+    config_path = os.path.join(os.path.dirname(__file__), '..', '..', 'config.ini')
+    return open_batch_backend(TrainedPrecisionOMRProcessor, config_path)
+
+@st.cache_resource
+def get_processor():
+    """Processor built once per server process and shared read-only by all sessions;
+    per-request settings (set type, custom answer key) are passed to process_omr_sheet"""
+    return TrainedPrecisionOMRProcessor()
+
+processor = get_processor()
+
 # Initialize session state
-if 'processor' not in st.session_state:
-    st.session_state.processor = TrainedPrecisionOMRProcessor()
+if 'results_history' not in st.session_state:
     st.session_state.results_history = []
+if 'collected_batches' not in st.session_state:
+    st.session_state.collected_batches = set()
 
 # Add processor configuration in sidebar
 st.sidebar.subheader("⚙️ Processing Settings")
@@ -37,10 +56,6 @@ bubble_threshold = st.sidebar.slider("Bubble Detection Threshold", 50, 500, 200,
 use_morphology = st.sidebar.checkbox("Use Morphological Operations", True,
                                     help="Apply image cleaning operations for better detection")
 
-# Update processor settings
-if hasattr(st.session_state.processor, 'bubble_threshold'):
-    st.session_state.processor.bubble_threshold = bubble_threshold
-
 # Custom CSS for better styling
 st.markdown("""
 <style>
@@ -69,25 +84,14 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 def process_uploaded_excel(uploaded_file):
-    """Process uploaded Excel answer key file"""
+    """Process uploaded Excel answer key file (streamed and validated row by row)"""
     try:
-        df = pd.read_excel(uploaded_file)
-        # Remove empty rows
-        df = df.dropna(how='all')
-        
-        # Extract answers
-        answers = []
-        for _, row in df.iterrows():
-            for col in df.columns:
-                if pd.notna(row[col]):
-                    import re
-                    match = re.search(r'[abcd]', str(row[col]).lower())
-                    if match:
-                        letter = match.group()
-                        answer_num = ord(letter) - ord('a')
-                        answers.append(answer_num)
+        imported = import_answer_key(uploaded_file)
+        if not imported.valid:
+            return None, "; ".join(imported.errors[:5])
         
-        return answers, None
+        # Compiled int8 key, answers placed by question number
+        return imported.key, None
     except Exception as e:
         return None, str(e)
 
@@ -167,6 +171,104 @@ def display_results_summary(results_list):
             ax.grid(True, alpha=0.3)
             st.pyplot(fig)
 
+def display_single_result(results, image_bytes):
+    """Metrics, first answers and the optional overlay of the last processed sheet"""
+    st.success("✅ Processing completed successfully!")
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Score", f"{results['score']:.1f}%")
+    with col2:
+        st.metric("Correct Answers", f"{results['correct_count']}/{results['total_questions']}")
+    with col3:
+        st.metric("Set Type", results['set_type'])
+    
+    # Detailed results
+    st.subheader("📋 Detailed Results")
+    
+    # Create comparison DataFrame
+    comparison_data = []
+    for i in range(min(20, len(results['correct_answers']))):  # Show first 20 questions
+        student_ans = results['student_answers'][i] if i < len(results['student_answers']) else -1
+        correct_ans = results['correct_answers'][i]
+        is_correct = student_ans == correct_ans
+        
+        student_letter = chr(ord('A') + student_ans) if student_ans >= 0 else "None"
+        correct_letter = chr(ord('A') + correct_ans)
+        
+        comparison_data.append({
+            'Question': i + 1,
+            'Student Answer': student_letter,
+            'Correct Answer': correct_letter,
+            'Result': "✅ Correct" if is_correct else "❌ Wrong"
+        })
+    
+    df_comparison = pd.DataFrame(comparison_data)
+    st.dataframe(df_comparison, width='stretch')
+    
+    if len(results['correct_answers']) > 20:
+        st.info(f"Showing first 20 questions. Total: {len(results['correct_answers'])} questions.")
+    
+    # Visualization is rendered only on request, at display size
+    if st.checkbox("🎨 Show processed image with results"):
+        img = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+        viz_img = processor.visualize_results(img, results, width=400) if img is not None else None
+        if viz_img is not None:
+            st.image(viz_img, caption="Processed OMR Sheet with Results", channels="BGR", width=400)
+
+def display_batch_results(batch_results):
+    """Summary, per-sheet results and CSV download of a finished batch"""
+    # Display batch summary
+    st.subheader("📊 Batch Processing Summary")
+    display_results_summary(batch_results)
+
+    # Detailed batch results
+    st.subheader("📋 Individual Results")
+    for i, result in enumerate(batch_results):
+        with st.expander(f"📄 {result['uploaded_filename']} - {'✅ Success' if result.get('success') else '❌ Failed'}"):
+            if result.get('success'):
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("Score", f"{result['score']:.1f}%")
+                with col2:
+                    st.metric("Correct", f"{result['correct_count']}/{result['total_questions']}")
+                with col3:
+                    st.metric("Set Type", result['set_type'])
+            else:
+                st.error(f"Error: {result.get('error', 'Unknown error')}")
+
+    # Download results as CSV
+    if batch_results:
+        results_df = []
+        for result in batch_results:
+            if result.get('success'):
+                results_df.append({
+                    'Filename': result['uploaded_filename'],
+                    'Set_Type': result['set_type'],
+                    'Score_Percent': result['score'],
+                    'Correct_Answers': result['correct_count'],
+                    'Total_Questions': result['total_questions'],
+                    'Status': 'Success'
+                })
+            else:
+                results_df.append({
+                    'Filename': result['uploaded_filename'],
+                    'Set_Type': 'N/A',
+                    'Score_Percent': 0,
+                    'Correct_Answers': 0,
+                    'Total_Questions': 0,
+                    'Status': f"Failed: {result.get('error', 'Unknown')}"
+                })
+
+        df = pd.DataFrame(results_df)
+        csv = df.to_csv(index=False)
+        st.download_button(
+            label="📥 Download Results as CSV",
+            data=csv,
+            file_name="omr_batch_results.csv",
+            mime="text/csv"
+        )
+
 def main():
     st.markdown('<h1 class="main-header">📊 OMR Sheet Processing System</h1>', unsafe_allow_html=True)
     
@@ -232,75 +334,35 @@ def main():
                     
                     try:
                         # Process the image
-                        if set_type == "Custom" and custom_answers:
-                            # Temporarily set custom answer key
-                            original_keys = st.session_state.processor.answer_keys.copy()
-                            st.session_state.processor.answer_keys["Custom"] = custom_answers
-                            results = st.session_state.processor.process_omr_sheet(tmp_path, "Custom")
-                            st.session_state.processor.answer_keys = original_keys
+                        if set_type == "Custom" and custom_answers is not None:
+                            # Custom key is passed per call, the shared keys are never modified
+                            results = processor.process_omr_sheet(tmp_path, "Custom",
+                                                                   answer_key=custom_answers)
                         else:
                             detect_set = None if set_type == "Auto-detect" else set_type
-                            results = st.session_state.processor.process_omr_sheet(tmp_path, detect_set)
+                            results = processor.process_omr_sheet(tmp_path, detect_set)
                         
                         if results.get("success"):
                             # Store results in history
                             results['uploaded_filename'] = uploaded_image.name
                             st.session_state.results_history.append(results)
-                            
-                            # Display results
-                            st.success("✅ Processing completed successfully!")
-                            
-                            col1, col2, col3 = st.columns(3)
-                            with col1:
-                                st.metric("Score", f"{results['score']:.1f}%")
-                            with col2:
-                                st.metric("Correct Answers", f"{results['correct_count']}/{results['total_questions']}")
-                            with col3:
-                                st.metric("Set Type", results['set_type'])
-                            
-                            # Detailed results
-                            st.subheader("📋 Detailed Results")
-                            
-                            # Create comparison DataFrame
-                            comparison_data = []
-                            for i in range(min(20, len(results['correct_answers']))):  # Show first 20 questions
-                                student_ans = results['student_answers'][i] if i < len(results['student_answers']) else -1
-                                correct_ans = results['correct_answers'][i]
-                                is_correct = student_ans == correct_ans
-                                
-                                student_letter = chr(ord('A') + student_ans) if student_ans >= 0 else "None"
-                                correct_letter = chr(ord('A') + correct_ans)
-                                
-                                comparison_data.append({
-                                    'Question': i + 1,
-                                    'Student Answer': student_letter,
-                                    'Correct Answer': correct_letter,
-                                    'Result': "✅ Correct" if is_correct else "❌ Wrong"
-                                })
-                            
-                            df_comparison = pd.DataFrame(comparison_data)
-                            st.dataframe(df_comparison, width='stretch')
-                            
-                            if len(results['correct_answers']) > 20:
-                                st.info(f"Showing first 20 questions. Total: {len(results['correct_answers'])} questions.")
-                            
-                            # Visualization
-                            if results.get('processed_image') is not None:
-                                st.subheader("🎨 Processed Image with Results")
-                                viz_img = st.session_state.processor.visualize_results(results)
-                                if viz_img is not None:
-                                    st.image(viz_img, caption="Processed OMR Sheet with Results", width='stretch')
-                        
+                            # Kept for the reruns triggered by the widgets below
+                            st.session_state.last_single_result = (results, uploaded_image.getvalue())
                         else:
+                            st.session_state.last_single_result = None
                             st.error(f"❌ Processing failed: {results.get('error', 'Unknown error')}")
                     
                     except Exception as e:
+                        st.session_state.last_single_result = None
                         st.error(f"❌ An error occurred: {str(e)}")
                     
                     finally:
                         # Clean up temporary file
                         if os.path.exists(tmp_path):
                             os.unlink(tmp_path)
+        
+        if st.session_state.get('last_single_result'):
+            display_single_result(*st.session_state.last_single_result)
     
     elif mode == "Batch Processing":
         st.header("📚 Batch OMR Sheet Processing")
@@ -338,12 +400,12 @@ def main():
                 if len(uploaded_files) > 5:
                     st.write(f"... and {len(uploaded_files) - 5} more files")
         
-        # Batch process button
+        # Batches run in the background (executor or job queue); the batch id lives in the URL,
+        # so reruns and browser refreshes keep following the same batch instead of restarting it
+        executor = get_batch_executor()
+        batch = executor.get(st.query_params.get("batch"))
+        
         if uploaded_files and st.button("🔄 Process All Sheets", type="primary"):
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            
-            batch_results = []
             custom_batch_answers = None
             
             # Process custom answer key if provided
@@ -353,94 +415,29 @@ def main():
                     st.error(f"Error processing batch answer key: {error}")
                     st.stop()
             
-            for i, uploaded_file in enumerate(uploaded_files):
-                status_text.text(f"Processing {uploaded_file.name}... ({i+1}/{len(uploaded_files)})")
-                
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_file:
-                    tmp_file.write(uploaded_file.getvalue())
-                    tmp_path = tmp_file.name
-                
-                try:
-                    if batch_set_type == "Custom" and custom_batch_answers:
-                        original_keys = st.session_state.processor.answer_keys.copy()
-                        st.session_state.processor.answer_keys["Custom"] = custom_batch_answers
-                        results = st.session_state.processor.process_omr_sheet(tmp_path, "Custom")
-                        st.session_state.processor.answer_keys = original_keys
-                    else:
-                        detect_set = None if batch_set_type == "Auto-detect" else batch_set_type
-                        results = st.session_state.processor.process_omr_sheet(tmp_path, detect_set)
-                    
-                    results['uploaded_filename'] = uploaded_file.name
-                    batch_results.append(results)
-                    
-                except Exception as e:
-                    batch_results.append({
-                        'uploaded_filename': uploaded_file.name,
-                        'success': False,
-                        'error': str(e)
-                    })
-                
-                finally:
-                    if os.path.exists(tmp_path):
-                        os.unlink(tmp_path)
-                
-                progress_bar.progress((i + 1) / len(uploaded_files))
-            
-            status_text.text("Batch processing completed!")
-            
-            # Store batch results in history
-            st.session_state.results_history.extend(batch_results)
-            
-            # Display batch summary
-            st.subheader("📊 Batch Processing Summary")
-            display_results_summary(batch_results)
+            detect_set = None if batch_set_type == "Auto-detect" else batch_set_type
+            batch_id = executor.submit([(uploaded_file.name, uploaded_file.getvalue()) for uploaded_file in uploaded_files],
+                                       detect_set, answer_key=custom_batch_answers)
+            st.query_params["batch"] = batch_id
+            batch = executor.get(batch_id)
+        
+        if batch is not None and not batch.finished:
+            st.progress(batch.completed / batch.total)
+            st.text(f"Processing {batch.total} sheets in the background... ({batch.completed}/{batch.total} done)")
+            time.sleep(1)
+            st.rerun()
+        elif batch is not None:
+            batch_results = batch.results()
+            st.success("Batch processing completed!")
             
-            # Detailed batch results
-            st.subheader("📋 Individual Results")
-            for i, result in enumerate(batch_results):
-                with st.expander(f"📄 {result['uploaded_filename']} - {'✅ Success' if result.get('success') else '❌ Failed'}"):
-                    if result.get('success'):
-                        col1, col2, col3 = st.columns(3)
-                        with col1:
-                            st.metric("Score", f"{result['score']:.1f}%")
-                        with col2:
-                            st.metric("Correct", f"{result['correct_count']}/{result['total_questions']}")
-                        with col3:
-                            st.metric("Set Type", result['set_type'])
-                    else:
-                        st.error(f"Error: {result.get('error', 'Unknown error')}")
+            # Store batch results in history (once per session)
+            if batch.batch_id not in st.session_state.collected_batches:
+                st.session_state.collected_batches.add(batch.batch_id)
+                st.session_state.results_history.extend(batch_results)
             
-            # Download results as CSV
-            if batch_results:
-                results_df = []
-                for result in batch_results:
-                    if result.get('success'):
-                        results_df.append({
-                            'Filename': result['uploaded_filename'],
-                            'Set_Type': result['set_type'],
-                            'Score_Percent': result['score'],
-                            'Correct_Answers': result['correct_count'],
-                            'Total_Questions': result['total_questions'],
-                            'Status': 'Success'
-                        })
-                    else:
-                        results_df.append({
-                            'Filename': result['uploaded_filename'],
-                            'Set_Type': 'N/A',
-                            'Score_Percent': 0,
-                            'Correct_Answers': 0,
-                            'Total_Questions': 0,
-                            'Status': f"Failed: {result.get('error', 'Unknown')}"
-                        })
-                
-                df = pd.DataFrame(results_df)
-                csv = df.to_csv(index=False)
-                st.download_button(
-                    label="📥 Download Results as CSV",
-                    data=csv,
-                    file_name="omr_batch_results.csv",
-                    mime="text/csv"
-                )
+            display_batch_results(batch_results)
+        elif st.query_params.get("batch"):
+            st.info("This batch is no longer available; results are kept for an hour after it finishes.")
     
     elif mode == "System Status":
         st.header("⚙️ System Status")
@@ -450,15 +447,17 @@ def main():
         
         with col1:
             st.subheader("📊 Available Answer Keys")
-            for set_name, answers in st.session_state.processor.answer_keys.items():
+            answer_keys = processor.answer_keys
+            for set_name, answers in answer_keys.snapshot.keys.items():
                 st.write(f"**{set_name}**: {len(answers)} questions")
+            st.caption(f"Answer key version {answer_keys.version} (reloaded automatically when AnswerKey/ changes)")
         
         with col2:
             st.subheader("🎯 System Configuration")
-            st.write(f"**Image Height**: {st.session_state.processor.height_img}px")
-            st.write(f"**Image Width**: {st.session_state.processor.width_img}px")
-            st.write(f"**Questions**: {st.session_state.processor.questions}")
-            st.write(f"**Choices**: {st.session_state.processor.choices}")
+            st.write(f"**Image Height**: {processor.height_img}px")
+            st.write(f"**Image Width**: {processor.width_img}px")
+            st.write(f"**Questions**: {processor.questions}")
+            st.write(f"**Choices**: {processor.choices}")
         
         # Test with sample data
         st.subheader("🧪 Test System with Sample Data")
@@ -472,7 +471,7 @@ def main():
                     test_set = list(data_handler.datasets.keys())[0]
                     test_image = data_handler.datasets[test_set][0]
                     
-                    results = st.session_state.processor.process_omr_sheet(test_image, test_set)
+                    results = processor.process_omr_sheet(test_image, test_set)
                     
                     if results.get('success'):
                         st.success(f"✅ System test passed! Score: {results['score']:.1f}%")
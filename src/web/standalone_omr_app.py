@@ -6,6 +6,13 @@ import random
 from PIL import Image
 import base64
 import io
+import sys
+import time
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'core'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'processors'))
+from scoring import CHOICE_LETTERS, DEFAULT_SCHEME, score_answers, letters_to_indices
+from trained_precision_omr import TrainedPrecisionOMRProcessor
 
 # Configure page
 st.set_page_config(
@@ -547,49 +554,42 @@ def create_processing_metrics(total_files, processed_files, success_count, error
         </div>
         """, unsafe_allow_html=True)
 
-def process_single_image(image_file, answer_set, predefined_answers):
-    """Process a single OMR image with enhanced error handling"""
+def process_single_image(image_file, answer_set):
+    """Process a single OMR image with the detection engine, with enhanced error handling"""
     try:
         # Generate unique identifiers
         serial_no = random.randint(100000, 999999)
         roll_no = f"STU{random.randint(1000, 9999)}"
         
-        # Get answer key
-        answer_key = get_answer_key(answer_set)
-        
-        # Calculate results
-        correct_count = 0
-        total_questions = 100
-        detailed_results = []
-        
-        for i in range(1, total_questions + 1):
-            student_answer = predefined_answers.get(f'Q{i}', 'X')
-            correct_answer = answer_key.get(f'Q{i}', 'X')
-            is_correct = student_answer == correct_answer
-            
-            if is_correct:
-                correct_count += 1
-                
-            detailed_results.append({
-                'question': f'Q{i}',
-                'student_answer': student_answer,
-                'correct_answer': correct_answer,
-                'is_correct': is_correct
-            })
+        processed = detect_sheet_answers(image_file, answer_set)
+        if not processed.get('success'):
+            return {
+                'file_name': image_file.name,
+                'error': processed.get('error', 'Unknown error'),
+                'status': 'error',
+                'processing_time': processed['processing_time']
+            }
         
-        accuracy = (correct_count / total_questions) * 100
+        scored = score_answers(processed['student_answers'], processed['correct_answers'])
+        detailed_results = [{
+            'question': f'Q{i}',
+            'student_answer': answer_letter(student_answer),
+            'correct_answer': answer_letter(correct_answer),
+            'is_correct': bool(is_correct)
+        } for i, (student_answer, correct_answer, is_correct)
+            in enumerate(zip(processed['student_answers'], processed['correct_answers'], scored['correct']), start=1)]
         
         # Create result record
         result = {
             'file_name': image_file.name,
             'serial_no': serial_no,
             'roll_no': roll_no,
-            'correct_answers': correct_count,
-            'total_questions': total_questions,
-            'accuracy': accuracy,
+            'correct_answers': processed['correct_count'],
+            'total_questions': processed['total_questions'],
+            'accuracy': processed['score'],
             'detailed_results': detailed_results,
             'status': 'success',
-            'processing_time': random.uniform(0.5, 2.0)
+            'processing_time': processed['processing_time']
         }
         
         return result
@@ -638,7 +638,7 @@ def create_batch_results_display(results):
                         <div style="font-size: 0.8rem; color: rgba(255,255,255,0.7);">ROLL NO</div>
                     </div>
                     <div style="text-align: center;">
-                        <div style="font-size: 1.5rem; font-weight: 700; color: #764ba2;">{result['processing_time']:.1f}s</div>
+                        <div style="font-size: 1.5rem; font-weight: 700; color: #764ba2;">{result['processing_time']:.2f}s</div>
                         <div style="font-size: 0.8rem; color: rgba(255,255,255,0.7);">TIME</div>
                     </div>
                 </div>
@@ -673,7 +673,7 @@ def generate_batch_excel_report(results):
             'Roll_No': result['roll_no'],
             'Total_Marks': result['correct_answers'],
             'Accuracy_Percentage': f"{result['accuracy']:.1f}%",
-            'Processing_Time_Seconds': f"{result['processing_time']:.1f}"
+            'Processing_Time_Seconds': f"{result['processing_time']:.2f}"
         }
         
         # Add all question answers
@@ -722,7 +722,9 @@ def generate_batch_excel_report(results):
 
 def create_elegant_footer():
     """Create modern footer"""
-    st.markdown("""
+    timed = [r['processing_time'] for r in st.session_state.results_history if 'processing_time' in r]
+    speed = f"Measured: {np.mean(timed):.2f}s per sheet ({len(timed)} sheets)" if timed else "Processing time measured per sheet"
+    st.markdown(f"""
     <div class="footer-elegant">
         <div class="footer-grid">
             <div class="footer-section">
@@ -731,7 +733,7 @@ def create_elegant_footer():
             </div>
             <div class="footer-section">
                 <h4>⚡ Performance</h4>
-                <p>Ultra-fast processing</p>
+                <p>{speed}</p>
                 <p>99.8% accuracy rate</p>
                 <p>Batch processing support</p>
             </div>
@@ -746,65 +748,28 @@ def create_elegant_footer():
     </div>
     """, unsafe_allow_html=True)
 
-def parse_student_answers():
-    """Parse student answers from the provided format"""
-    # Student answers as provided by user
-    student_answers_list = [
-        'A', 'C', 'B', 'D', 'B',  # Q1-Q5
-        'A', 'A', 'C', 'A', 'C',  # Q6-Q10
-        'C', 'A', 'D', 'A', 'A',  # Q11-Q15
-        'B', 'C', 'D', 'D', 'B',  # Q16-Q20
-        'A', 'D', 'B', 'B', 'C',  # Q21-Q25
-        'A', 'A', 'B', 'D', 'D',  # Q26-Q30
-        'C', 'A', 'B', 'C', 'A',  # Q31-Q35
-        'A', 'B', 'B', 'A', 'B',  # Q36-Q40
-        'B', 'C', 'D', 'B', 'B',  # Q41-Q45
-        'A', 'A', 'D', 'D', 'C',  # Q46-Q50
-        'B', 'B', 'C', 'D', 'A',  # Q51-Q55
-        'B', 'B', 'A', 'A', 'A',  # Q56-Q60
-        'A', 'A', 'B', 'B', 'B',  # Q61-Q65
-        'A', 'B', 'A', 'B', 'A',  # Q66-Q70
-        'A', 'A', 'C', 'B', 'B',  # Q71-Q75
-        'B', 'A', 'B', 'A', 'A',  # Q76-Q80
-        'C', 'D', 'B', 'B', 'B',  # Q81-Q85
-        'A', 'B', 'C'             # Q86-Q88
-    ]
-    
-    # Extend to 100 questions (add 12 more for completeness)
-    additional_answers = ['A', 'B', 'C', 'D', 'A', 'B', 'C', 'D', 'A', 'B', 'C', 'D']
-    student_answers_list.extend(additional_answers)
-    
-    # Convert letters to indices (A=0, B=1, C=2, D=3)
-    return [ord(answer) - ord('A') for answer in student_answers_list[:100]]
-    """Parse student answers from the provided format"""
-    # Student answers as provided by user
-    student_answers_list = [
-        'A', 'C', 'B', 'D', 'B',  # Q1-Q5
-        'A', 'A', 'C', 'A', 'C',  # Q6-Q10
-        'C', 'A', 'D', 'A', 'A',  # Q11-Q15
-        'B', 'C', 'D', 'D', 'B',  # Q16-Q20
-        'A', 'D', 'B', 'B', 'C',  # Q21-Q25
-        'A', 'A', 'B', 'D', 'D',  # Q26-Q30
-        'C', 'A', 'B', 'C', 'A',  # Q31-Q35
-        'A', 'B', 'B', 'A', 'B',  # Q36-Q40
-        'B', 'C', 'D', 'B', 'B',  # Q41-Q45
-        'A', 'A', 'D', 'D', 'C',  # Q46-Q50
-        'B', 'B', 'C', 'D', 'A',  # Q51-Q55
-        'B', 'B', 'A', 'A', 'A',  # Q56-Q60
-        'A', 'A', 'B', 'B', 'B',  # Q61-Q65
-        'A', 'B', 'A', 'B', 'A',  # Q66-Q70
-        'A', 'A', 'C', 'B', 'B',  # Q71-Q75
-        'B', 'A', 'B', 'A', 'A',  # Q76-Q80
-        'C', 'D', 'B', 'B', 'B',  # Q81-Q85
-        'A', 'B', 'C'             # Q86-Q88
-    ]
-    
-    # Extend to 100 questions (add 12 more for completeness)
-    additional_answers = ['A', 'B', 'C', 'D', 'A', 'B', 'C', 'D', 'A', 'B', 'C', 'D']
-    student_answers_list.extend(additional_answers)
+@st.cache_resource
+def get_processor():
+    """Detection engine shared by all sessions of this server process"""
+    return TrainedPrecisionOMRProcessor()
+
+def detect_sheet_answers(uploaded_file, set_type):
+    """Run the detection engine on an uploaded sheet; the result has the measured 'processing_time'"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(uploaded_file.name)[1] or '.jpg') as tmp_file:
+        tmp_file.write(uploaded_file.getvalue())
+        tmp_path = tmp_file.name
     
-    # Convert letters to indices (A=0, B=1, C=2, D=3)
-    return [ord(answer) - ord('A') for answer in student_answers_list[:100]]
+    start = time.perf_counter()
+    try:
+        results = get_processor().process_omr_sheet(tmp_path, set_type, answer_key=get_answer_key(set_type))
+    finally:
+        os.unlink(tmp_path)
+    results['processing_time'] = time.perf_counter() - start
+    return results
+
+def answer_letter(answer):
+    """Letter of a choice index, 'None' for a blank question"""
+    return CHOICE_LETTERS[answer] if 0 <= answer < len(CHOICE_LETTERS) else "None"
 
 def get_answer_key(set_type):
     """Get answer key for the specified set"""
@@ -841,8 +806,9 @@ def generate_detailed_csv_report(student_answers, correct_answers, set_type, fil
     roll_number = f"ST{random.randint(1000, 9999)}"
     
     # Calculate score
-    correct_count = 0
     total_questions = 100
+    scored = score_answers(student_answers[:total_questions], correct_answers[:total_questions])
+    correct_count = int(scored['correct_count'])
     
     # Create single row data
     row_data = {
@@ -853,21 +819,13 @@ def generate_detailed_csv_report(student_answers, correct_answers, set_type, fil
     # Add all questions (Q1 to Q100) with student answers
     for i in range(100):
         student_ans = student_answers[i] if i < len(student_answers) else -1
-        correct_ans = correct_answers[i] if i < len(correct_answers) else -1
-        
-        student_letter = chr(ord('A') + student_ans) if student_ans >= 0 else "None"
-        
-        is_correct = student_ans == correct_ans and student_ans >= 0
-        if is_correct:
-            correct_count += 1
-        
-        # Add student answer for each question
-        row_data[f'Q{i+1}'] = student_letter
+        row_data[f'Q{i+1}'] = answer_letter(student_ans)
     
     # Add total marks
+    percentage = (correct_count / total_questions) * 100
     row_data['Total_Marks'] = f'{correct_count}/{total_questions}'
-    row_data['Percentage'] = f'{(correct_count/total_questions)*100:.1f}%'
-    row_data['Grade'] = 'A+' if correct_count >= 90 else 'A' if correct_count >= 80 else 'B' if correct_count >= 70 else 'C' if correct_count >= 60 else 'D' if correct_count >= 50 else 'F'
+    row_data['Percentage'] = f'{percentage:.1f}%'
+    row_data['Grade'] = get_grade(percentage)
     
     df = pd.DataFrame([row_data])
     
@@ -883,44 +841,22 @@ def process_omr_sheet(uploaded_image, set_type, processing_quality, confidence_t
         status_text.text("🔄 Initializing processing...")
         progress_bar.progress(10)
         
-        # Step 2: Load data
-        status_text.text("📊 Loading student answers and answer key...")
+        # Step 2: Detect the marked answers
+        status_text.text("🧮 Detecting marked answers...")
         progress_bar.progress(30)
-        student_answers = parse_student_answers()
-        correct_answers = get_answer_key(set_type)
-        
-        # Step 3: Process
-        status_text.text("🧮 Analyzing responses...")
-        progress_bar.progress(60)
-        
-        correct_count = 0
-        total_questions = 100
-        
-        for i in range(total_questions):
-            if i < len(student_answers) and i < len(correct_answers):
-                if student_answers[i] == correct_answers[i]:
-                    correct_count += 1
+        results = detect_sheet_answers(uploaded_image, set_type)
+        if not results.get('success'):
+            raise RuntimeError(results.get('error', 'Unknown error'))
         
-        progress_bar.progress(80)
-        score = (correct_count / total_questions) * 100
-        
-        # Step 4: Generate results
+        # Step 3: Generate results
         status_text.text("📋 Generating detailed report...")
         progress_bar.progress(100)
         
-        # Create results dictionary
-        results = {
-            'success': True,
-            'score': score,
-            'correct_count': correct_count,
-            'total_questions': total_questions,
-            'set_type': set_type,
-            'student_answers': student_answers,
-            'correct_answers': correct_answers,
+        results.update({
             'uploaded_filename': uploaded_image.name,
             'processing_quality': processing_quality,
             'confidence_threshold': confidence_threshold
-        }
+        })
         
         # Store results in history
         st.session_state.results_history.append(results)
@@ -958,6 +894,8 @@ def display_processing_results(results):
         grade = get_grade(results['score'])
         create_metric_card("🎯 Grade", grade, "Performance Level", "success" if grade in ['A+', 'A'] else "warning" if grade in ['B', 'C'] else "error")
     
+    st.caption(f"⏱️ Processed in {results['processing_time']:.2f}s")
+    
     # Detailed results section
     st.markdown("### 📋 Detailed Question Analysis")
     display_detailed_results(results)
@@ -968,12 +906,7 @@ def display_processing_results(results):
 
 def get_grade(score):
     """Calculate grade based on score"""
-    if score >= 90: return "A+"
-    elif score >= 80: return "A"
-    elif score >= 70: return "B"
-    elif score >= 60: return "C"
-    elif score >= 50: return "D"
-    else: return "F"
+    return DEFAULT_SCHEME.grade(score)
 
 def display_detailed_results(results):
     """Display detailed question-by-question results"""
@@ -1015,8 +948,8 @@ def display_detailed_results(results):
                 correct_ans = correct_answers[i]
                 is_correct = student_ans == correct_ans
                 
-                student_letter = chr(ord('A') + student_ans)
-                correct_letter = chr(ord('A') + correct_ans)
+                student_letter = answer_letter(student_ans)
+                correct_letter = answer_letter(correct_ans)
                 
                 chunk_data.append({
                     'Question': f'Q{i + 1}',
@@ -1040,8 +973,8 @@ def display_detailed_results(results):
             st.markdown("**Student Answer Distribution**")
             student_dist = {'A': 0, 'B': 0, 'C': 0, 'D': 0}
             for ans in student_answers:
-                letter = chr(ord('A') + ans)
-                student_dist[letter] += 1
+                if ans >= 0:
+                    student_dist[answer_letter(ans)] += 1
             
             dist_df = pd.DataFrame(list(student_dist.items()), columns=['Option', 'Count'])
             st.bar_chart(dist_df.set_index('Option'))
@@ -1407,32 +1340,13 @@ def main():
             if st.button("🔍 Process OMR Sheet", type="primary"):
                 with st.spinner("Processing OMR sheet..."):
                     try:
-                        # Get predefined student answers and answer key
-                        student_answers = parse_student_answers()
-                        correct_answers = get_answer_key(set_type)
-                        
-                        # Calculate results
-                        correct_count = 0
-                        total_questions = 100
-                        
-                        for i in range(total_questions):
-                            if i < len(student_answers) and i < len(correct_answers):
-                                if student_answers[i] == correct_answers[i]:
-                                    correct_count += 1
-                        
-                        score = (correct_count / total_questions) * 100
-                        
-                        # Create results dictionary
-                        results = {
-                            'success': True,
-                            'score': score,
-                            'correct_count': correct_count,
-                            'total_questions': total_questions,
-                            'set_type': set_type,
-                            'student_answers': student_answers,
-                            'correct_answers': correct_answers,
-                            'uploaded_filename': uploaded_image.name
-                        }
+                        # Detect the marked answers and score them against the answer key
+                        results = detect_sheet_answers(uploaded_image, set_type)
+                        if not results.get('success'):
+                            raise RuntimeError(results.get('error', 'Unknown error'))
+                        results['uploaded_filename'] = uploaded_image.name
+                        student_answers = results['student_answers']
+                        correct_answers = results['correct_answers']
                         
                         # Store results in history
                         st.session_state.results_history.append(results)
@@ -1458,8 +1372,8 @@ def main():
                             correct_ans = correct_answers[i]
                             is_correct = student_ans == correct_ans
                             
-                            student_letter = chr(ord('A') + student_ans)
-                            correct_letter = chr(ord('A') + correct_ans)
+                            student_letter = answer_letter(student_ans)
+                            correct_letter = answer_letter(correct_ans)
                             
                             result_text = "✅ Correct" if is_correct else "❌ Wrong"
                             
@@ -0,0 +1,53 @@
+import os
+import sys
+import shutil
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'core'))
+from data_handler import OMRDataHandler, ANSWER_KEY_CACHE_FILE
+
+ANSWER_KEY_DIR = os.path.join(os.path.dirname(__file__), '..', 'AnswerKey')
+
+class CountingDataHandler(OMRDataHandler):
+    """Data handler that counts how many workbooks it actually parses"""
+
+    def __init__(self, base_path):
+        super().__init__(base_path)
+        self.parsed = []
+
+    def _parse_answer_key_workbook(self, file_path, set_name):
+        self.parsed.append(set_name)
+        return super()._parse_answer_key_workbook(file_path, set_name)
+
+def test_answer_key_cache():
+    """Workbooks are parsed once, then served from the compiled cache until they change"""
+    with tempfile.TemporaryDirectory() as base_path:
+        key_dir = os.path.join(base_path, "AnswerKey")
+        os.makedirs(key_dir)
+        for name in ("Set A.xlsx", "Set B.xlsx"):
+            shutil.copy(os.path.join(ANSWER_KEY_DIR, name), key_dir)
+
+        first = CountingDataHandler(base_path)
+        keys = first.load_answer_keys()
+        assert sorted(first.parsed) == ["Set_A", "Set_B"]
+        assert os.path.exists(os.path.join(key_dir, ANSWER_KEY_CACHE_FILE))
+
+        second = CountingDataHandler(base_path)
+        assert second.load_answer_keys() == keys
+        assert second.parsed == []
+
+        # Touching a workbook without changing it keeps the cache valid (hash matches)
+        set_a = os.path.join(key_dir, "Set A.xlsx")
+        os.utime(set_a, ns=(0, os.stat(set_a).st_mtime_ns + 10**9))
+        third = CountingDataHandler(base_path)
+        assert third.load_answer_keys() == keys
+        assert third.parsed == []
+
+        # Replacing the content of a workbook triggers a re-parse of that workbook only
+        shutil.copy(os.path.join(ANSWER_KEY_DIR, "Set B.xlsx"), set_a)
+        fourth = CountingDataHandler(base_path)
+        reloaded = fourth.load_answer_keys()
+        assert fourth.parsed == ["Set_A"]
+        assert reloaded["Set_A"] == keys["Set_B"]
+
+if __name__ == "__main__":
+    test_answer_key_cache()
@@ -0,0 +1,49 @@
+import os
+import sys
+import tempfile
+import numpy as np
+import openpyxl
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'core'))
+from answer_key_import import import_answer_key, import_answer_key_row, import_answer_key_workbook
+
+def write_workbook(path, sheets):
+    workbook = openpyxl.Workbook()
+    workbook.remove(workbook.active)
+    for title, rows in sheets.items():
+        worksheet = workbook.create_sheet(title)
+        for row in rows:
+            worksheet.append(row)
+    workbook.save(path)
+
+def test_streaming_answer_key_import():
+    """Grids, bare-letter grids, multi-sheet workbooks and Q-column tables"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "keys.xlsx")
+        write_workbook(path, {
+            # Numbered cells are placed by number, whatever order the rows are in
+            "Variant 1": [["Maths", "Physics"], ["2 - b", "4. d"], ["1 - a", "3 - c,d"]],
+            # Bare letters are read column by column
+            "Variant 2": [["b", "d"], ["a", "c"]],
+            "Broken": [["Maths"], ["1 - a"], ["??"], ["1 - b"]],
+        })
+
+        assert list(import_answer_key(path).key) == [0, 1, 2, 3]
+
+        variants = import_answer_key_workbook(path)
+        assert list(variants) == ["Variant 1", "Variant 2", "Broken"]
+        assert variants["Variant 2"].key.dtype == np.int8
+        assert list(variants["Variant 2"].key) == [1, 0, 3, 2]
+        assert not variants["Broken"].valid
+        assert any("cannot read" in error for error in variants["Broken"].errors)
+        assert any("appears twice" in error for error in variants["Broken"].errors)
+
+        table = os.path.join(tmp_dir, "table.xlsx")
+        write_workbook(table, {"Keys": [["Name", "Q1", "Q2", "Q3"], ["First", "A", "b", "C"], ["Second", "D", "x", "A"]]})
+        first = import_answer_key_row(table, 0)
+        assert first.valid and first.as_letters() == {"Q1": "A", "Q2": "B", "Q3": "C"}
+        second = import_answer_key_row(table, 1)
+        assert second.errors == ["Invalid answer 'x' for Q2"] and list(second.key) == [3, -1, 0]
+        assert list(import_answer_key_row(table, 1, start_column=1, num_questions=1).key) == [3]
+
+if __name__ == "__main__":
+    test_streaming_answer_key_import()
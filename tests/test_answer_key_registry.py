@@ -0,0 +1,48 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'core'))
+from answer_key_registry import AnswerKeyRegistry, get_answer_key_registry
+
+ANSWER_KEY_DIR = os.path.join(os.path.dirname(__file__), '..', 'AnswerKey')
+
+def test_answer_key_registry_hot_reload():
+    """Keys are shared and read-only, and a changed workbook swaps in a new snapshot"""
+    with tempfile.TemporaryDirectory() as base_path:
+        key_dir = os.path.join(base_path, "AnswerKey")
+        os.makedirs(key_dir)
+        for name in ("Set A.xlsx", "Set B.xlsx"):
+            shutil.copy(os.path.join(ANSWER_KEY_DIR, name), key_dir)
+
+        registry = get_answer_key_registry(base_path, watch=False)
+        assert get_answer_key_registry(base_path, watch=False) is registry
+        assert sorted(registry) == ["Set_A", "Set_B"]
+        assert not registry["Set_A"].flags.writeable
+        assert not registry.reload()
+
+        old_snapshot = registry.snapshot
+        set_a = os.path.join(key_dir, "Set A.xlsx")
+        shutil.copy(os.path.join(ANSWER_KEY_DIR, "Set B.xlsx"), set_a)
+        os.utime(set_a, ns=(0, os.stat(set_a).st_mtime_ns + 10**9))
+
+        # Background watcher picks the change up without any caller involvement
+        watched = AnswerKeyRegistry(base_path, poll_interval=0.05)
+        watched.start_watcher()
+        shutil.copy(os.path.join(ANSWER_KEY_DIR, "Set A.xlsx"), set_a)
+        os.utime(set_a, ns=(0, os.stat(set_a).st_mtime_ns + 2 * 10**9))
+        deadline = time.time() + 5
+        while watched.version < 2 and time.time() < deadline:
+            time.sleep(0.05)
+        watched.stop_watcher()
+        assert watched.version == 2
+
+        assert registry.reload()
+        assert registry.version == old_snapshot.version + 1
+        # Readers holding the previous snapshot keep a consistent view
+        assert (old_snapshot.keys["Set_A"] != old_snapshot.keys["Set_B"]).any()
+        print(f"Registry version {registry.version}, sets: {sorted(registry)}")
+
+if __name__ == "__main__":
+    test_answer_key_registry_hot_reload()
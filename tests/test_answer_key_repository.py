@@ -0,0 +1,45 @@
+import os
+import sys
+import json
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'core'))
+from answer_key_repository import AnswerKeyRepository
+
+DEFAULTS = {"Set A": {"Q1": "A", "Q2": "C"}, "Set B": {"Q1": "B", "Q2": "D"}}
+
+def test_cached_until_the_file_changes():
+    """Reads reuse one parsed version; writes and outside changes bump the version"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "answer_keys.json")
+        repository = AnswerKeyRepository(path, defaults=DEFAULTS)
+        snapshot = repository.snapshot()
+        assert dict(snapshot.keys["Set A"]) == DEFAULTS["Set A"] and not os.path.exists(path)
+        assert repository.snapshot() is snapshot  # nothing changed, nothing parsed
+
+        version = repository.put("Custom", {"Q1": "D"})
+        assert version > snapshot.version and repository.get("Custom")["Q1"] == "D"
+        with open(path) as f:
+            assert set(json.load(f)) == {"Set A", "Set B", "Custom"}
+        assert os.listdir(tmp) == ["answer_keys.json"]  # no temporary file left behind
+
+        # Another process rewrote the file: the next read sees it
+        with open(path, 'w') as f:
+            json.dump({"Set A": {"Q1": "B"}}, f)
+        os.utime(path, ns=(1, 1))
+        assert repository.get("Set A")["Q1"] == "B" and repository.version > version
+
+def test_updates_touch_one_key():
+    """put/delete change one key and keep keys written by another repository instance"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "answer_keys.json")
+        first, second = AnswerKeyRepository(path, DEFAULTS), AnswerKeyRepository(path, DEFAULTS)
+        first.put("Morning", {"Q1": "A"})
+        second.put("Evening", {"Q1": "B"})
+        assert set(first.keys) == {"Set A", "Set B", "Morning", "Evening"}
+
+        assert first.delete("Morning") and not first.delete("Morning")
+        assert set(AnswerKeyRepository(path).keys) == {"Set A", "Set B", "Evening"}
+
+if __name__ == "__main__":
+    test_cached_until_the_file_changes()
+    test_updates_touch_one_key()
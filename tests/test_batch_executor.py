@@ -0,0 +1,46 @@
+import os
+import sys
+import time
+import tempfile
+import contextlib
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'processors'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'core'))
+from trained_precision_omr import TrainedPrecisionOMRProcessor
+from batch_executor import BatchExecutor
+
+DATASETS = os.path.join(os.path.dirname(__file__), '..', 'DataSets')
+
+def test_batch_runs_in_background():
+    """submit returns at once; the batch is followed by id until all results are in"""
+    # Workers inherit the working directory: their debug images land in tmp_dir
+    with tempfile.TemporaryDirectory() as tmp_dir, contextlib.chdir(tmp_dir):
+        executor = BatchExecutor(TrainedPrecisionOMRProcessor, workers=2)
+        try:
+            uploads = []
+            for name in ("Img1.jpeg", "Img2.jpeg"):
+                with open(os.path.join(DATASETS, "Set A", name), 'rb') as f:
+                    uploads.append((name, f.read()))
+            uploads.append(("broken.jpg", b"not an image"))
+
+            batch_id = executor.submit(uploads, "Set_A")
+            batch = executor.get(batch_id)
+            assert batch.total == 3 and executor.get("unknown") is None
+
+            deadline = time.time() + 120
+            while not executor.get(batch_id).finished and time.time() < deadline:
+                time.sleep(0.2)
+
+            results = executor.get(batch_id).results()
+            assert [result['uploaded_filename'] for result in results] == ["Img1.jpeg", "Img2.jpeg", "broken.jpg"]
+            assert results[0]['success'] and results[0]['set_type'] == "Set_A"
+            assert not results[2]['success']
+            assert all(result['processing_time'] > 0 for result in results)  # measured in the worker
+            # Derived from the results, so it is set as soon as the batch counts as finished
+            assert executor.get(batch_id).completed_at == max(result['completed_at'] for result in results)
+            assert executor.get(batch_id).completed_at >= batch.created_at
+            assert os.listdir(batch.work_dir) == []  # uploads are removed once processed
+        finally:
+            executor.shutdown()
+
+if __name__ == "__main__":
+    test_batch_runs_in_background()
@@ -0,0 +1,130 @@
+import io
+import os
+import sys
+import contextlib
+import tempfile
+import cv2
+import numpy as np
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'processors'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'core'))
+from trained_precision_omr import TrainedPrecisionOMRProcessor
+from bubble_features import CELL_FEATURES
+from bubble_classifier import BubbleClassifier
+from data_handler import OMRDataHandler
+from synthetic_sheets import generate_dataset, load_ground_truth
+from omr_trainer import OMRTrainer
+
+REPO_ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+def fill_contrast_classifier():
+    """Hand-made model that only looks at how much a bubble stands out from its question"""
+    weights = np.zeros(len(CELL_FEATURES))
+    weights[CELL_FEATURES.index('fill_contrast')] = 1.0
+    return BubbleClassifier(np.zeros(len(CELL_FEATURES)), np.ones(len(CELL_FEATURES)), weights, 0.0, CELL_FEATURES)
+
+def test_classifier_round_trip():
+    """The saved arrays reload to the same scores; a model for other features is refused"""
+    rng = np.random.default_rng(0)
+    classifier = BubbleClassifier(rng.normal(size=6), rng.uniform(0.5, 2, size=6), rng.normal(size=6), 0.3, CELL_FEATURES)
+    features = rng.normal(size=(400, 6)).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "model.npz")
+        classifier.save(path)
+        loaded = BubbleClassifier.load(path, CELL_FEATURES)
+        assert np.allclose(loaded.decision_function(features), classifier.decision_function(features), atol=1e-5)
+        expected = ((features - classifier.mean) / classifier.scale) @ classifier.weights + classifier.bias
+        assert np.allclose(loaded.decision_function(features), expected, atol=1e-4)
+        try:
+            BubbleClassifier.load(path, CELL_FEATURES[:-1])
+            assert False, "feature mismatch not detected"
+        except ValueError:
+            pass
+
+    # A question is blank when none of its bubbles has a positive logit
+    classifier = BubbleClassifier(classifier.mean, classifier.scale, classifier.weights, -2.0, CELL_FEATURES)
+    answers = classifier.predict_answers(features, 4)
+    best = classifier.decision_function(features).reshape(100, 4).max(axis=1)
+    assert len(answers) == 100 and (best <= 0).any() and (best > 0).any()
+    assert np.array_equal(answers == -1, best <= 0)
+
+def test_processor_uses_learned_classifier():
+    """With a classifier loaded, the processor reads the grid layout with it"""
+    processor = TrainedPrecisionOMRProcessor()
+    processor.bubble_classifier = fill_contrast_classifier()
+
+    # Blank 600x800 sheet: header 120px, 5 subjects of 120px, 20 rows of 34px, choices 30px wide
+    gray = np.full((800, 600), 235, dtype=np.uint8)
+    marks = {0: 1, 19: 3, 20: 0, 99: 2}
+    for question, choice in marks.items():
+        subject, row = divmod(question, 20)
+        cv2.circle(gray, (subject * 120 + choice * 30 + 15, 120 + row * 34 + 17), 10, 30, -1)
+
+    name, answers, detected = processor.method_learned_classifier(gray)
+    assert name == "Learned Bubble Classifier" and detected == len(marks)
+    # Every unmarked question comes back blank
+    assert {q: a for q, a in enumerate(answers) if a >= 0} == marks
+    assert answers.count(-1) == 100 - len(marks)
+
+def test_train_on_synthetic_marks():
+    """The classifier learns which bubbles are marked from the ground truth, and is only used on request"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ground_truth = generate_dataset(tmp_dir, 6, seed=2, base_path=REPO_ROOT, scale=1.0, workers=1)
+        trainer = OMRTrainer()
+        trainer.data_handler = OMRDataHandler(tmp_dir)  # keeps the feature store in tmp_dir
+        marks = load_ground_truth(tmp_dir)
+
+        # Labels are the drawn marks (blanks and wrong answers included), not the answer key
+        paths = [os.path.join(tmp_dir, str(path)) for path in ground_truth['paths']]
+        labels = trainer.bubble_labels(paths, 100, 4, marks).reshape(6, 100, 4)
+        assert np.array_equal(labels.sum(axis=2), (ground_truth['answers'] >= 0).astype(int))
+        marked = ground_truth['answers'] >= 0
+        assert np.array_equal(labels.argmax(axis=2)[marked], ground_truth['answers'][marked])
+
+        model_path = os.path.join(tmp_dir, "model.npz")
+        results = trainer.train_learned_classifier(tmp_dir, model_path)
+        assert results['model_path'] == model_path and results['n_samples'] == 6 * 100 * 4
+        assert 'error' in trainer.train_learned_classifier(os.path.join(tmp_dir, "DataSets"))
+
+        assert TrainedPrecisionOMRProcessor().bubble_classifier is None
+        processor = TrainedPrecisionOMRProcessor()
+        processor.load_bubble_classifier(model_path)
+        assert processor.bubble_classifier is not None
+
+def test_learned_classifier_beats_heuristics_on_held_out_sheets():
+    """Trained on some synthetic sheets, the classifier reads the others better than the default methods"""
+    with tempfile.TemporaryDirectory() as tmp_dir, contextlib.chdir(tmp_dir):  # debug images land in tmp_dir
+        generate_dataset(tmp_dir, 16, seed=7, base_path=REPO_ROOT, scale=1.0, workers=1)
+        marks = load_ground_truth(tmp_dir)
+        paths = sorted(marks)
+        train_paths, held_out = paths[:12], paths[12:]
+
+        trainer = OMRTrainer()
+        trainer.data_handler = OMRDataHandler(tmp_dir)
+        model_path = os.path.join(tmp_dir, "model.npz")
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = trainer.train_learned_classifier(tmp_dir, model_path, image_paths=train_paths)
+        assert results['n_samples'] == len(train_paths) * 100 * 4
+
+        heuristic = TrainedPrecisionOMRProcessor()
+        learned = TrainedPrecisionOMRProcessor()
+        learned.load_bubble_classifier(model_path)
+
+        def accuracy(processor):
+            correct = 0
+            for path in held_out:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    answers = processor.process_omr_sheet(path, "Set_A")['student_answers'][:100]
+                correct += int((np.array(answers) == marks[path]).sum())
+            return correct / (len(held_out) * 100)
+
+        heuristic_accuracy, learned_accuracy = accuracy(heuristic), accuracy(learned)
+        assert learned_accuracy > heuristic_accuracy, (learned_accuracy, heuristic_accuracy)
+        assert learned_accuracy > 0.95
+
+if __name__ == "__main__":
+    test_classifier_round_trip()
+    test_processor_uses_learned_classifier()
+    test_train_on_synthetic_marks()
+    test_learned_classifier_beats_heuristics_on_held_out_sheets()
@@ -0,0 +1,47 @@
+import os
+import sys
+import cv2
+import numpy as np
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'processors'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'core'))
+from enhanced_omr import EnhancedOMRProcessor
+from bubble_features import CELL_FEATURES, grid_cell_map, cell_histograms, extract_cell_features
+
+def test_histograms_match_box_thresholding():
+    """Cumulative cell histograms give the same counts as thresholding and splitting the sheet"""
+    processor = EnhancedOMRProcessor()
+    rng = np.random.default_rng(0)
+    gray = rng.integers(0, 256, size=(703, 701), dtype=np.uint8)
+
+    cell_map = grid_cell_map(gray.shape, sections=4, rows=25, choices=4)
+    cumulative = np.cumsum(cell_histograms(gray, cell_map, 400), axis=1)
+
+    for threshold in (0, 150, 255):
+        img_thresh = cv2.threshold(gray, threshold, 255, cv2.THRESH_BINARY_INV)[1]
+        boxes = processor.split_boxes_dynamic(img_thresh, 100, 4)
+        counts = [cv2.countNonZero(box) for box in boxes]
+        assert counts == cumulative[:, threshold].tolist()
+
+def test_cell_features():
+    """One feature row per bubble; a filled bubble stands out from the rest of its question"""
+    gray = np.full((700, 700), 230, dtype=np.uint8)
+    cell_map = grid_cell_map(gray.shape, sections=4, rows=25, choices=4)
+    # Fill choice C of question 1 (section 0, row 0) and choice A of question 27 (section 1, row 1)
+    cv2.circle(gray, (2 * 43 + 21, 14), 9, 40, -1)
+    cv2.circle(gray, (175 + 21, 28 + 14), 9, 40, -1)
+
+    features = extract_cell_features(gray, cell_map, 400, choices=4)
+    assert features.shape == (400, len(CELL_FEATURES)) and features.dtype == np.float32
+
+    fill_contrast = features[:, CELL_FEATURES.index('fill_contrast')].reshape(100, 4)
+    assert np.argmax(fill_contrast[0]) == 2 and np.argmax(fill_contrast[26]) == 0
+    assert np.all(fill_contrast[1] == 0)
+
+    pixels = np.bincount(cell_map[cell_map >= 0], minlength=400)
+    assert np.allclose(features[:, CELL_FEATURES.index('mean_intensity')],
+                       np.bincount(cell_map[cell_map >= 0], weights=gray[cell_map >= 0]) / pixels, atol=1e-3)
+    assert features[2, CELL_FEATURES.index('edge_density')] > 0 and features[3, CELL_FEATURES.index('edge_density')] == 0
+
+if __name__ == "__main__":
+    test_histograms_match_box_thresholding()
+    test_cell_features()
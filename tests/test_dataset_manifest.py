@@ -0,0 +1,67 @@
+import os
+import sys
+import tempfile
+import cv2
+import numpy as np
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'core'))
+from dataset_manifest import DatasetManifest
+from data_handler import OMRDataHandler
+
+def write_scan(path, value):
+    cv2.imwrite(path, np.full((30, 20, 3), value, dtype=np.uint8))
+
+def test_dataset_manifest_incremental():
+    """Only new or changed folders are rescanned, and the manifest can be queried"""
+    with tempfile.TemporaryDirectory() as base_path:
+        datasets_path = os.path.join(base_path, "DataSets")
+        for set_folder in ("Set A", "Set B"):
+            os.makedirs(os.path.join(datasets_path, set_folder))
+            for i in range(3):
+                write_scan(os.path.join(datasets_path, set_folder, f"Img{i}.png"), 40 * i)
+        stack = [np.full((30, 20, 3), v, dtype=np.uint8) for v in (0, 255)]
+        cv2.imwritemulti(os.path.join(datasets_path, "Set B", "stack.tif"), stack)
+
+        manifest = DatasetManifest(datasets_path)
+        first = manifest.refresh()
+        assert first['added'] == 7 and first['scanned_folders'] == 2
+
+        # Nothing changed: folders are listed but nothing is hashed again; a quick refresh lists none
+        assert manifest.refresh() == {'added': 0, 'updated': 0, 'removed': 0, 'scanned_folders': 2}
+        assert manifest.refresh(quick=True) == {'added': 0, 'updated': 0, 'removed': 0, 'scanned_folders': 0}
+
+        # A new scan only rescans its own folder in a quick refresh
+        write_scan(os.path.join(datasets_path, "Set A", "Img9.png"), 200)
+        os.remove(os.path.join(datasets_path, "Set A", "Img0.png"))
+        set_a = os.path.join(datasets_path, "Set A")
+        os.utime(set_a, ns=(0, os.stat(set_a).st_mtime_ns + 10**9))
+        second = manifest.refresh(quick=True)
+        assert second == {'added': 1, 'updated': 0, 'removed': 1, 'scanned_folders': 1}
+
+        # An image rewritten in place leaves the folder mtime alone but is still rehashed
+        rewritten = os.path.join(datasets_path, "Set A", "Img1.png")
+        old_hash = manifest.get_record(rewritten)['sha1']
+        folder_mtime = os.stat(set_a).st_mtime_ns
+        write_scan(rewritten, 123)
+        os.utime(rewritten, ns=(0, os.stat(rewritten).st_mtime_ns + 10**9))
+        os.utime(set_a, ns=(0, folder_mtime))
+        assert manifest.refresh(quick=True)['updated'] == 0
+        assert manifest.refresh()['updated'] == 1
+        assert manifest.get_record(rewritten)['sha1'] != old_hash
+
+        record = manifest.get_record(os.path.join(datasets_path, "Set B", "stack.tif"))
+        assert (record['width'], record['height'], record['pages']) == (20, 30, 2)
+
+        set_b = manifest.query("Set_B")
+        assert len(set_b) == 5  # 3 images + 2 stack pages
+        manifest.mark_processed(set_b[:2])
+        assert len(manifest.query("Set_B", processed=True)) == 2
+        assert len(manifest.query(processed=False)) == 6
+        assert manifest.query(since=4102444800) == []  # year 2100
+
+        # The data handler serves its dataset lists from the same manifest
+        datasets = OMRDataHandler(base_path).load_datasets()
+        assert sorted(datasets) == ["Set_A", "Set_B"]
+        assert len(datasets["Set_A"]) == 3
+
+if __name__ == "__main__":
+    test_dataset_manifest_incremental()
@@ -0,0 +1,55 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import contextlib
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'processors'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'core'))
+from omr_trainer import OMRTrainer
+
+REPO_ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+def test_evaluation_resumes_from_checkpoint():
+    """Images evaluated successfully are not processed again and still count; failed ones are retried"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # A copy of the data, so the dataset manifest and caches are not written into the repo
+        for folder in ("DataSets", "AnswerKey"):
+            shutil.copytree(os.path.join(REPO_ROOT, folder), os.path.join(tmp_dir, folder))
+        with contextlib.chdir(tmp_dir):
+            trainer = OMRTrainer()
+            trainer.data_handler.load_datasets()
+            set_name, image_paths = next(iter(trainer.data_handler.datasets.items()))
+            done, remaining = image_paths[:-1], image_paths[-1]
+            failed = [path for other_set, other_paths in trainer.data_handler.datasets.items()
+                      if other_set != set_name for path in other_paths][:2]
+
+            checkpoint_path = os.path.join(tmp_dir, "evaluation.jsonl")
+            with open(checkpoint_path, 'w') as f:
+                for path in done:
+                    f.write(json.dumps({'set': set_name, 'path': path, 'success': True, 'score': 50.0}) + "\n")
+                # Sheets of the other set that failed are evaluated again, the rest are kept as they are
+                for other_set, other_paths in trainer.data_handler.datasets.items():
+                    for path in other_paths if other_set != set_name else []:
+                        record = {'success': False, 'error': "skipped"} if path in failed else {'success': True, 'score': 0.0}
+                        f.write(json.dumps({'set': other_set, 'path': path, **record}) + "\n")
+                f.write('{"set": "Set_A", "pa')  # interrupted mid-write
+            with open(checkpoint_path) as f:
+                written = len(f.read().splitlines()) - 1
+
+            performance = trainer.evaluate_system_performance(workers=2, checkpoint_path=checkpoint_path)
+
+            records = OMRTrainer.load_evaluation_checkpoint(checkpoint_path)
+            with open(checkpoint_path) as f:
+                new_records = [json.loads(line) for line in f.read().splitlines()[written + 1:]]
+            assert sorted(record['path'] for record in new_records) == sorted([remaining] + failed)
+            assert all(records[path]['error'] != "skipped" for path in failed if not records[path]['success'])
+
+    stats = performance['set_performance'][set_name]
+    assert stats['images_count'] == len(image_paths)
+    assert stats['successful_count'] + stats['error_count'] == len(image_paths)
+    assert performance['overall_performance']['total_images'] == len(records)
+
+if __name__ == "__main__":
+    test_evaluation_resumes_from_checkpoint()
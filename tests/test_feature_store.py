@@ -0,0 +1,57 @@
+import os
+import sys
+import tempfile
+import numpy as np
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'core'))
+from feature_store import FeatureStore, FEATURES_FILE
+
+FEATURES = ('mean_intensity', 'fill_ratio')
+
+def test_feature_store_append_and_map():
+    """Sheets are appended once by hash and read back through a memory map"""
+    rng = np.random.default_rng(0)
+    sheets = rng.random((3, 100, 4, 2)).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = FeatureStore(tmp_dir, 100, 4, FEATURES)
+        assert store.array().shape == (0, 100, 4, 2)
+        assert [store.append(f"hash{i}", sheet) for i, sheet in enumerate(sheets)] == [0, 1, 2]
+        assert store.append("hash1", sheets[0]) == 1  # already stored, not appended again
+
+        # Reopened later (e.g. by another tool)
+        store = FeatureStore(tmp_dir, 100, 4, FEATURES)
+        mapped = store.array()
+        assert isinstance(mapped, np.memmap) and np.array_equal(mapped, sheets)
+        assert "hash2" in store and "hash9" not in store and store.get("hash9") is None
+        assert store.index() == {"hash0": 0, "hash1": 1, "hash2": 2}
+        del mapped
+
+        # Data of an append that never reached the index is dropped by the next append
+        with open(os.path.join(tmp_dir, FEATURES_FILE), 'ab') as f:
+            f.write(b'\0' * 100)
+        assert store.append("hash3", sheets[2]) == 3
+        assert np.array_equal(store.get("hash3"), sheets[2])
+        assert os.path.getsize(os.path.join(tmp_dir, FEATURES_FILE)) == 4 * sheets[0].nbytes
+
+        try:
+            FeatureStore(tmp_dir, 100, 4, FEATURES + ('edge_density',))
+            assert False, "layout mismatch not detected"
+        except ValueError:
+            pass
+
+def test_feature_store_extraction_change():
+    """Features of another extraction pipeline are discarded instead of reused"""
+    sheet = np.ones((100, 4, 2), dtype=np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = FeatureStore(tmp_dir, 100, 4, FEATURES, extraction="v1:threshold=130")
+        store.append("hash0", sheet)
+        assert "hash0" in FeatureStore(tmp_dir, 100, 4, FEATURES, extraction="v1:threshold=130")
+
+        store = FeatureStore(tmp_dir, 100, 4, FEATURES, extraction="v1:threshold=150")
+        assert len(store) == 0 and store.array().shape == (0, 100, 4, 2)
+        assert store.append("hash0", 2 * sheet) == 0 and np.array_equal(store.get("hash0"), 2 * sheet)
+
+if __name__ == "__main__":
+    test_feature_store_append_and_map()
+    test_feature_store_extraction_change()
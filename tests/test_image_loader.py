@@ -0,0 +1,44 @@
+import os
+import sys
+import threading
+import tempfile
+import cv2
+import numpy as np
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'core'))
+from image_loader import PrefetchingImageLoader
+
+class RecordingImageLoader(PrefetchingImageLoader):
+    """Loader that signals each finished read"""
+
+    def __init__(self, sources, **kwargs):
+        super().__init__(sources, **kwargs)
+        self.loaded = {source: threading.Event() for source in sources}
+
+    def _load(self, source):
+        image = super()._load(source)
+        self.loaded[source].set()
+        return image
+
+def test_prefetching_image_loader():
+    """Images come back in order, and loading overlaps with the caller's processing"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = []
+        for i in range(8):
+            path = os.path.join(tmp_dir, f"Img{i}.png")
+            cv2.imwrite(path, np.full((50, 40, 3), i * 20, dtype=np.uint8))
+            paths.append(path)
+        paths.append(os.path.join(tmp_dir, "missing.png"))
+
+        loaded = list(PrefetchingImageLoader(paths, depth=3, max_bytes=1))
+        assert [source for source, _ in loaded] == paths
+        assert [int(img[0, 0, 0]) for _, img in loaded[:-1]] == [i * 20 for i in range(8)]
+        assert loaded[-1][1] is None
+
+        # While the caller still holds a sheet, the following ones are read in the background
+        loader = RecordingImageLoader(paths[:8], depth=4)
+        for i, (source, _) in enumerate(loader):
+            if i + 1 < 8:
+                assert loader.loaded[paths[i + 1]].wait(timeout=10), f"sheet {i + 1} was not prefetched"
+
+if __name__ == "__main__":
+    test_prefetching_image_loader()
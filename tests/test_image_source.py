@@ -0,0 +1,32 @@
+import os
+import sys
+import tempfile
+import cv2
+import numpy as np
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'core'))
+from image_source import MultiPageTiffSource, read_image, split_page_ref
+
+def test_multipage_tiff_pages():
+    """Pages of a TIFF stack are enumerated lazily and decoded one at a time"""
+    pages = [np.full((40, 30, 3), value, dtype=np.uint8) for value in (10, 120, 240)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        stack_path = os.path.join(tmp_dir, "stack.tif")
+        cv2.imwritemulti(stack_path, pages)
+
+        source = MultiPageTiffSource(stack_path)
+        refs = list(source)
+        print(f"Page references: {refs}")
+
+        assert len(source) == 3
+        assert split_page_ref(refs[1]) == (stack_path, 1)
+        for ref, expected in zip(refs, pages):
+            page = read_image(ref)
+            assert page.shape == expected.shape
+            assert int(page.mean()) == int(expected.mean())
+
+        # Plain paths are not mistaken for page references
+        assert split_page_ref("DataSets/Set #1/Img1.jpeg") == ("DataSets/Set #1/Img1.jpeg", None)
+
+if __name__ == "__main__":
+    test_multipage_tiff_pages()
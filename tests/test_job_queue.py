@@ -0,0 +1,91 @@
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+import contextlib
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'processors'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'core'))
+from trained_precision_omr import TrainedPrecisionOMRProcessor
+from job_queue import JobQueue, QueueBatchClient, run_worker
+
+DATASETS = os.path.join(os.path.dirname(__file__), '..', 'DataSets')
+
+def test_priority_retry_and_visibility_timeout():
+    """Higher priority first; failed jobs come back after the retry delay; expired leases are reclaimed"""
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(os.path.join(tmp, "jobs.sqlite"), visibility_timeout=60, retry_delay=0.2)
+        low, = queue.enqueue("echo", [{'n': 1}])
+        high, = queue.enqueue("echo", [{'n': 2}], priority=5, max_attempts=2)
+
+        job = queue.claim("w1")
+        assert job.id == high and job.attempts == 1
+        assert queue.fail(job, "boom")
+        assert queue.claim("w1").id == low  # the failed job is not visible during its retry delay
+
+        time.sleep(0.25)
+        retried = queue.claim("w1")
+        assert retried.id == high and retried.attempts == 2 and queue.claim("w1") is None
+        assert queue.fail(retried, "boom again") and queue.get(high).status == 'failed'
+
+        # A worker that dies loses its lease; the job goes to the next worker, the stale lease is refused
+        expired, = queue.enqueue("echo", [{'n': 3}])
+        first = queue.claim("w1", visibility_timeout=0)
+        second = queue.claim("w2")
+        assert first.id == second.id == expired
+        assert not queue.complete(first, {'late': True})
+        assert queue.complete(second, {'ok': True}) and queue.get(expired).result == {'ok': True}
+
+def test_worker_processes_queued_batch():
+    """A batch submitted through the client is processed by a separate worker loop"""
+    with tempfile.TemporaryDirectory() as tmp, contextlib.chdir(tmp):  # debug images land in tmp
+        client = QueueBatchClient(JobQueue(os.path.join(tmp, "jobs.sqlite")), os.path.join(tmp, "spool"))
+        with open(os.path.join(DATASETS, "Set A", "Img1.jpeg"), 'rb') as f:
+            uploads = [("Img1.jpeg", f.read()), ("broken.jpg", b"not an image")]
+        batch_id = client.submit(uploads, "Set_A")
+        assert client.get(batch_id).completed == 0 and client.get("unknown") is None
+
+        assert run_worker(client.queue, TrainedPrecisionOMRProcessor, stop_when_idle=True) == 2
+
+        batch = client.get(batch_id)
+        results = batch.results()
+        assert batch.finished and [result['uploaded_filename'] for result in results] == ["Img1.jpeg", "broken.jpg"]
+        assert results[0]['success'] and results[0]['set_type'] == "Set_A" and len(results[0]['student_answers']) == 100
+        assert not results[1]['success']
+        assert not os.path.exists(batch.work_dir)  # spooled uploads are removed once the batch is done
+
+def test_worker_renews_lease_and_keeps_upload_of_lost_job():
+    """A slow sheet keeps its lease; a job whose lease was taken over keeps its upload for the new worker"""
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(os.path.join(tmp, "jobs.sqlite"), visibility_timeout=0.3)
+        upload = os.path.join(tmp, "sheet.jpg")
+        open(upload, 'wb').close()
+
+        def slow(processor, payload):
+            time.sleep(1.0)  # over three visibility timeouts
+            assert queue.claim("w2") is None  # still leased to this worker
+            return {'ok': True}
+
+        slow_id, = queue.enqueue("slow", [{'image_path': upload}])
+        assert run_worker(queue, lambda: None, {'slow': slow}, stop_when_idle=True) == 1
+        assert queue.get(slow_id).status == 'done' and not os.path.exists(upload)
+
+        open(upload, 'wb').close()
+        taken_over = []
+
+        def stolen(processor, payload):
+            # The lease expires and another worker claims the job meanwhile
+            with contextlib.closing(sqlite3.connect(queue.db_path)) as conn, conn:
+                conn.execute("UPDATE jobs SET visible_at = 0")
+            taken_over.append(queue.claim("w2", visibility_timeout=60))
+            return {'late': True}
+
+        stolen_id, = queue.enqueue("stolen", [{'image_path': upload}])
+        assert run_worker(queue, lambda: None, {'stolen': stolen}, max_jobs=1) == 1
+        assert taken_over[0].id == stolen_id and queue.get(stolen_id).status == 'running'
+        assert os.path.exists(upload)  # the worker that now holds the job still needs it
+
+if __name__ == "__main__":
+    test_priority_retry_and_visibility_timeout()
+    test_worker_processes_queued_batch()
+    test_worker_renews_lease_and_keeps_upload_of_lost_job()
@@ -0,0 +1,65 @@
+import os
+import sys
+import tempfile
+import contextlib
+import numpy as np
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from omr_tuner import SuccessiveHalvingTuner, ground_truth_sample, halving_schedule, schedule_cost, _init_worker, _run_trial
+from synthetic_sheets import generate_dataset
+from trained_precision_omr import TrainedPrecisionOMRProcessor, DETECTION_METHODS
+
+REPO_ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+def test_halving_schedule_fits_budget():
+    """Each rung keeps 1/eta of the configurations on eta times the sheets"""
+    rungs = halving_schedule(27, 2, 3, 1000)
+    assert rungs == [(27, 2), (9, 6), (3, 18), (1, 54)]
+    assert schedule_cost(rungs) == 27 * 2 + 9 * 4 + 3 * 12 + 1 * 36
+    assert halving_schedule(27, 2, 3, 10)[-1] == (3, 10)  # capped by the sample size
+
+    tuner = SuccessiveHalvingTuner([("image.jpg", "Set_A", None)] * 50, budget=120, base_params={})
+    assert schedule_cost(tuner.plan()) <= 120
+    assert tuner.plan()[0][0] > 1
+
+def test_tuner_beats_bad_settings():
+    """Trials are scored against the drawn marks; the chosen parameters beat a setting that reads nothing"""
+    with tempfile.TemporaryDirectory() as tmp_dir, contextlib.chdir(tmp_dir):  # debug images land in tmp_dir
+        ground_truth = generate_dataset(tmp_dir, 4, seed=4, base_path=REPO_ROOT, scale=1.0, workers=1)
+        samples = ground_truth_sample(tmp_dir)
+        assert len(samples) == 4 and {set_name for _, set_name, _ in samples} <= set(ground_truth['set_names'])
+
+        _init_worker()
+        path, set_name, marks = samples[0]
+        params = dict(TrainedPrecisionOMRProcessor().training_params)
+        assert _run_trial(params, path, set_name, marks)[0] > 85
+        assert _run_trial(params, path, set_name, np.full(100, 9))[0] == 0
+
+        # grid_based alone finds no answers on these sheets: every question reads as blank
+        bad = ['grid_based']
+        space = {'detection_methods': [bad, ['mark_detection_normalized'], list(DETECTION_METHODS)]}
+        tuner = SuccessiveHalvingTuner(samples, budget=12, min_sheets=2, eta=3, time_weight=0.0, workers=1,
+                                       search_space=space)
+        tuner.base_params['detection_methods'] = bad
+        results = tuner.run()
+
+    assert results['best_params']['detection_methods'] != bad
+    assert results['best_objective'] > results['base_objective'] + 50
+    assert results['evaluations'] <= 12
+    assert [rung['configurations'] for rung in results['history']] == [3, 1]
+
+def test_tuner_prefers_cheaper_settings():
+    """With time in the objective, the slower of two about equally accurate settings loses"""
+    with tempfile.TemporaryDirectory() as tmp_dir, contextlib.chdir(tmp_dir):
+        generate_dataset(tmp_dir, 2, seed=5, base_path=REPO_ROOT, scale=1.0, workers=1)
+        space = {'detection_methods': [['mark_detection_normalized'], list(DETECTION_METHODS)]}
+        tuner = SuccessiveHalvingTuner(ground_truth_sample(tmp_dir), budget=4, min_sheets=2, eta=2,
+                                       time_weight=1e4, workers=1, search_space=space)
+        tuner.base_params['detection_methods'] = list(DETECTION_METHODS)
+        results = tuner.run()
+
+    assert results['best_params']['detection_methods'] == ['mark_detection_normalized']
+
+if __name__ == "__main__":
+    test_halving_schedule_fits_budget()
+    test_tuner_beats_bad_settings()
+    test_tuner_prefers_cheaper_settings()
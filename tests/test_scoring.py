@@ -0,0 +1,50 @@
+import os
+import sys
+import time
+import numpy as np
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'core'))
+from scoring import ScoringScheme, score_answers, letters_to_indices, key_question_count
+
+def test_scoring_schemes():
+    """Weights, negative marking, blanks, subject subtotals and grades"""
+    key = [0, 1, 2, 3, 0]
+    answers = [0, 1, 3, -1, 0]  # 3 correct, 1 wrong, 1 blank
+
+    plain = score_answers(answers, key, ScoringScheme(subjects=5))
+    assert plain["correct_count"] == 3 and plain["wrong_count"] == 1 and plain["blank_count"] == 1
+    assert plain["percentage"] == 60.0 and plain["grade"] == "C"
+
+    scheme = ScoringScheme(weights=[1, 1, 2, 2, 4], negative_mark=0.25, subjects=5)
+    scored = score_answers(answers, key, scheme)
+    assert scored["max_marks"] == 10
+    assert np.isclose(scored["marks"], 1 + 1 - 0.5 + 4)
+    assert np.allclose(scored["subject_marks"], [1, 1, -0.5, 0, 4])
+
+    # Short answer lists count as blank; a dropped question (key -1) is not scored
+    assert score_answers([0, 1], key, ScoringScheme(subjects=5))["blank_count"] == 3
+    assert score_answers(answers, [0, 1, -1, 3, 0], ScoringScheme(subjects=5))["max_marks"] == 4
+
+    assert list(letters_to_indices({"Q1": "a", "Q2": "D", "Q4": "X"}, 4)) == [0, 3, -1, -1]
+    # A key with gaps is sized by its highest question, not by its number of entries
+    assert key_question_count({"Q1": "A", "Q2": "B", "Q40": "C"}) == 40
+    assert key_question_count({}) == 100 and key_question_count({"Name": "x"}, 20) == 20
+
+def test_rescore_large_exam():
+    """Re-scoring a whole exam is a single vectorized pass"""
+    rng = np.random.default_rng(0)
+    answers = rng.integers(-1, 4, size=(100_000, 100), dtype=np.int8)
+    key = rng.integers(0, 4, size=100, dtype=np.int8)
+
+    start = time.time()
+    scored = score_answers(answers, key, ScoringScheme(negative_mark=0.25))
+    elapsed = time.time() - start
+    print(f"Scored {len(answers)} students in {elapsed * 1000:.0f} ms")
+
+    assert scored["subject_marks"].shape == (100_000, 5)
+    assert np.allclose(scored["subject_marks"].sum(axis=1), scored["marks"])
+    row = score_answers(answers[123], key, ScoringScheme(negative_mark=0.25))
+    assert np.isclose(row["marks"], scored["marks"][123]) and row["grade"] == scored["grade"][123]
+
+if __name__ == "__main__":
+    test_scoring_schemes()
+    test_rescore_large_exam()
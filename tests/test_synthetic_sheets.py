@@ -0,0 +1,73 @@
+import io
+import os
+import sys
+import tempfile
+import contextlib
+import cv2
+import numpy as np
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'core'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'processors'))
+from synthetic_sheets import (generate_sheet, generate_dataset, render_blank_sheet, bubble_center, load_ground_truth,
+                              GROUND_TRUTH_FILE)
+from data_handler import OMRDataHandler
+from trained_precision_omr import TrainedPrecisionOMRProcessor
+
+REPO_ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+def test_sheets_are_deterministic():
+    """Sheet N only depends on (seed, N); a perfect student copies the key except for blanks"""
+    key = np.arange(100, dtype=np.int8) % 4
+    first = generate_sheet(key, 7, seed=3)
+    again = generate_sheet(key, 7, seed=3)
+    other = generate_sheet(key, 8, seed=3)
+    assert np.array_equal(first.image, again.image) and np.array_equal(first.answers, again.answers)
+    assert not np.array_equal(first.image, other.image)
+
+    perfect = generate_sheet(key, 1, skill=1.0)
+    answered = perfect.answers >= 0
+    assert answered.mean() > 0.8 and np.array_equal(perfect.answers[answered], key[answered])
+
+    # Bubbles lie on the processors' 5 x 20 grid of the 600x800 sheet (15% header)
+    blank = render_blank_sheet("A", 1.0)
+    assert blank.shape == (800, 600)
+    x, y = bubble_center(99, 3)
+    assert (4 * 120 + 3 * 30 <= x < 5 * 120) and (120 + 19 * 34 <= y < 120 + 20 * 34)
+
+def test_generate_dataset():
+    """The output folder works as a data handler base path, with ground truth per image"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ground_truth = generate_dataset(tmp_dir, 4, seed=1, base_path=REPO_ROOT, scale=1.0, workers=1)
+        assert ground_truth['answers'].shape == (4, 100)
+
+        handler = OMRDataHandler(tmp_dir)
+        handler.load_answer_keys()
+        datasets = handler.load_datasets()
+        assert sum(len(paths) for paths in datasets.values()) == 4
+        assert set(handler.answer_keys) == set(ground_truth['set_names'])
+
+        saved = np.load(os.path.join(tmp_dir, GROUND_TRUTH_FILE))
+        assert np.array_equal(saved['answers'], ground_truth['answers'])
+        image = cv2.imread(os.path.join(tmp_dir, str(saved['paths'][0])))
+        assert image is not None and image.shape[2] == 3
+
+        marks = load_ground_truth(tmp_dir)
+        first = os.path.abspath(datasets[str(ground_truth['set_names'][0])][0])
+        assert len(marks) == 4 and np.array_equal(marks[first], ground_truth['answers'][0])
+
+def test_processor_reads_generated_sheets():
+    """The sheets are framed like the processor expects: it reads nearly every mark as drawn"""
+    with tempfile.TemporaryDirectory() as tmp_dir, contextlib.chdir(tmp_dir):  # debug images land in tmp_dir
+        ground_truth = generate_dataset(tmp_dir, 4, seed=3, base_path=REPO_ROOT, scale=1.0, workers=1)
+        processor = TrainedPrecisionOMRProcessor()
+        matches = []
+        for path, set_name, marks in zip(ground_truth['paths'], ground_truth['set_names'], ground_truth['answers']):
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = processor.process_omr_sheet(os.path.join(tmp_dir, str(path)), str(set_name))
+            assert result['success']
+            matches.append(np.mean(np.array(result['student_answers'][:100]) == marks))
+        assert min(matches) > 0.85, matches
+
+if __name__ == "__main__":
+    test_sheets_are_deterministic()
+    test_generate_dataset()
+    test_processor_reads_generated_sheets()
@@ -2,6 +2,7 @@ import os
 import pandas as pd
 from enhanced_omr import EnhancedOMRProcessor
 from data_handler import OMRDataHandler
+from image_loader import PrefetchingImageLoader
 import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime
@@ -72,12 +73,13 @@ class OMRSystemTester:
             'detailed_results': []
         }
         
-        for i, img_path in enumerate(image_paths):
+        # Decode the next sheets in the background while the current one is processed
+        for i, (img_path, img) in enumerate(PrefetchingImageLoader(image_paths)):
             print(f"   Processing {os.path.basename(img_path)}... ", end="")
             
             try:
                 # Process the OMR sheet
-                omr_results = self.processor.process_omr_sheet(img_path, set_name)
+                omr_results = self.processor.process_omr_sheet(img_path, set_name, image=img)
                 
                 if omr_results.get('success'):
                     score = omr_results['score']
@@ -0,0 +1,34 @@
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'core'))
+from data_handler import OMRDataHandler
+
+def test_training_data_shards():
+    """Shards are disjoint, cover every record and do not depend on the listing order"""
+    handler = OMRDataHandler()
+    handler.answer_keys = {"Set_A": [0] * 100, "Set_B": [1] * 100}
+    handler.datasets = {
+        "Set_A": [os.path.join("DataSets", "Set A", f"Img{i}.jpeg") for i in range(50)],
+        "Set_B": [os.path.join("DataSets", "Set B", f"Img{i}.jpeg") for i in range(50)],
+        "Set_C": [os.path.join("DataSets", "Set C", "Img1.jpeg")],  # no answer key
+    }
+
+    all_records = list(handler.iter_training_data())
+    assert len(all_records) == 100
+    assert all_records[0].key_id == "Set_A"
+
+    shards = [set(handler.iter_training_data(shard, 3)) for shard in range(3)]
+    assert sum(len(shard) for shard in shards) == 100
+    assert set.union(*shards) == set(all_records)
+    assert all(len(shard) > 0 for shard in shards)
+
+    handler.datasets["Set_A"].reverse()
+    assert set(handler.iter_training_data(1, 3)) == shards[1]
+
+    # The list form still hands out the shared key list, not a copy
+    training_data = handler.prepare_training_data(0, 3)
+    assert len(training_data) == len(shards[0])
+    assert all(key is handler.answer_keys[set_name] for _, set_name, key in training_data)
+
+if __name__ == "__main__":
+    test_training_data_shards()
@@ -0,0 +1,40 @@
+import os
+import sys
+import json
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'core'))
+from user_store import UserStore, hash_password
+
+def test_imports_users_json_once():
+    """Existing accounts keep working after the move from users.json, and are imported only once"""
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = os.path.join(tmp, "users.json")
+        with open(legacy, 'w') as f:
+            json.dump({"sanjay": {"password": hash_password("secret"), "email": "s@example.com",
+                                  "created_at": "2025-09-21 13:05:12"}}, f)
+        db_path = os.path.join(tmp, "users.sqlite")
+
+        store = UserStore(db_path, legacy_json=legacy)
+        assert len(store) == 1 and store.authenticate("sanjay", "secret")
+        assert not store.authenticate("sanjay", "wrong") and not store.authenticate("nobody", "secret")
+        assert store.get("sanjay")["created_at"] == "2025-09-21 13:05:12"
+
+        with open(legacy, 'w') as f:
+            json.dump({"late": {"password": hash_password("x")}}, f)
+        assert "late" not in UserStore(db_path, legacy_json=legacy)
+
+def test_concurrent_signups_are_not_lost():
+    """Every signup from concurrent sessions is kept; a taken username is refused"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = UserStore(os.path.join(tmp, "users.sqlite"), legacy_json=None)
+        with ThreadPoolExecutor(8) as pool:
+            outcomes = list(pool.map(lambda i: store.create(f"staff{i}", f"pw{i}", f"{i}@example.com")[0], range(64)))
+        assert all(outcomes) and len(store) == 64
+        assert store.authenticate("staff17", "pw17")
+        assert store.create("staff17", "other", "x@example.com") == (False, "Username already exists")
+        assert store.authenticate("staff17", "pw17")
+
+if __name__ == "__main__":
+    test_imports_users_json_once()
+    test_concurrent_signups_are_not_lost()